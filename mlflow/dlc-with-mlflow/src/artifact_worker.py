@@ -0,0 +1,272 @@
+"""
+Background plot rendering and artifact upload for train.py.
+
+ArtifactWorker runs this file as a separate process and sends it data
+snapshots over a pipe. The child renders the figures with matplotlib and
+uploads each artifact to MLflow exactly once, using a thread pool for parallel
+transfers. The training process only enqueues messages and never waits on
+matplotlib or artifact I/O.
+
+A plain subprocess is used rather than multiprocessing because train.py is a
+script without a __main__ guard, which spawn-started children would re-run.
+"""
+
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+
+
+class ArtifactWorker:
+    """Client side: queue plot snapshots and uploads for the worker process."""
+
+    def __init__(self, plots_dir, upload_threads=4):
+        self.process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), plots_dir, str(upload_threads)],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.outbox = queue.Queue()
+        self.condition = threading.Condition()
+        self.rendered = set()
+        self.uploaded = set()
+        self.errors = []
+        self.callbacks = []
+        self.closed = False
+
+        # Writes happen on a sender thread so a large snapshot never blocks the
+        # caller on a full pipe while the child is busy rendering
+        self.sender = threading.Thread(target=self._send_loop, name='artifact-sender', daemon=True)
+        self.receiver = threading.Thread(target=self._receive_loop, name='artifact-receiver', daemon=True)
+        self.sender.start()
+        self.receiver.start()
+
+    def plot(self, filename, renderer, **snapshot):
+        """Render plots_dir/filename with the named renderer from a data snapshot."""
+        self.outbox.put(('plot', filename, renderer, snapshot))
+
+    def set_run(self, tracking_uri, run_id):
+        """Start uploading to an MLflow run; earlier uploads are held until then."""
+        self.outbox.put(('run', tracking_uri, run_id))
+
+    def upload(self, path, artifact_path=None):
+        """Upload a file once; repeated requests for the same file are ignored."""
+        self.outbox.put(('upload', os.path.abspath(path), artifact_path))
+
+    def when_rendered(self, filenames, callback):
+        """Call callback once the given plots exist, without waiting for them.
+
+        The callback runs on the receiver thread, or right away if the plots
+        are already rendered. It is dropped if a plot fails to render.
+        """
+        with self.condition:
+            if not set(filenames) <= self.rendered:
+                self.callbacks.append((set(filenames), callback))
+                return
+        self._run_callback(callback)
+
+    def close(self, timeout=None):
+        """Finish outstanding renders and uploads and stop the worker process."""
+        if self.closed:
+            return
+        self.closed = True
+        self.outbox.put(('close',))
+        self.sender.join(timeout)
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            print("Artifact worker did not finish in time; terminating it")
+            self.process.kill()
+        self.receiver.join(timeout)
+
+    def _send_loop(self):
+        while True:
+            message = self.outbox.get()
+            try:
+                pickle.dump(message, self.process.stdin, protocol=pickle.HIGHEST_PROTOCOL)
+                self.process.stdin.flush()
+            except (BrokenPipeError, OSError) as e:
+                self.errors.append(f"artifact worker pipe closed: {e}")
+                return
+            if message[0] == 'close':
+                self.process.stdin.close()
+                return
+
+    def _receive_loop(self):
+        while True:
+            try:
+                event = pickle.load(self.process.stdout)
+            except (EOFError, OSError):
+                break
+            ready = []
+            with self.condition:
+                if event[0] == 'rendered':
+                    self.rendered.add(event[1])
+                    ready = [callback for filenames, callback in self.callbacks if filenames <= self.rendered]
+                    self.callbacks = [item for item in self.callbacks if not item[0] <= self.rendered]
+                elif event[0] == 'uploaded':
+                    self.uploaded.add(event[1])
+                elif event[0] == 'error':
+                    self.errors.append(event[1])
+                    print(f"Artifact worker error: {event[1]}")
+                self.condition.notify_all()
+            for callback in ready:
+                self._run_callback(callback)
+        with self.condition:
+            self.condition.notify_all()
+
+    def _run_callback(self, callback):
+        try:
+            callback()
+        except Exception as e:
+            self.errors.append(f"rendered-plot callback failed: {e}")
+            print(f"Artifact worker error: {self.errors[-1]}")
+
+
+def render_rings_distribution(path, rings):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(10, 6))
+    sns.histplot(rings, kde=True)
+    plt.title('Distribution of Abalone Rings (Age)')
+    plt.xlabel('Rings')
+    plt.ylabel('Count')
+    plt.savefig(path)
+    plt.close()
+
+
+def render_correlation_matrix(path, correlation):
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    plt.figure(figsize=(12, 10))
+    sns.heatmap(correlation, annot=True, cmap='coolwarm', fmt=".2f")
+    plt.title('Correlation Matrix')
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def render_training_history(path, history):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(12, 4))
+
+    # Plot training & validation loss values
+    plt.subplot(1, 2, 1)
+    plt.plot(history['loss'])
+    plt.plot(history['val_loss'])
+    plt.title('Model Loss')
+    plt.ylabel('Loss (MSE)')
+    plt.xlabel('Epoch')
+    plt.legend(['Train', 'Validation'], loc='upper right')
+
+    # Plot training & validation metrics
+    plt.subplot(1, 2, 2)
+    plt.plot(history['mae'])
+    plt.plot(history['val_mae'])
+    plt.title('Model Mean Absolute Error')
+    plt.ylabel('MAE')
+    plt.xlabel('Epoch')
+    plt.legend(['Train', 'Validation'], loc='upper right')
+
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+def render_predictions(path, y_true, y_pred):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(10, 6))
+    plt.scatter(y_true, y_pred, alpha=0.5)
+    plt.plot([min(y_true), max(y_true)], [min(y_true), max(y_true)], 'r--')
+    plt.xlabel('Actual Rings')
+    plt.ylabel('Predicted Rings')
+    plt.title('Predicted vs Actual Abalone Rings')
+    plt.savefig(path)
+    plt.close()
+
+
+RENDERERS = {
+    'rings_distribution': render_rings_distribution,
+    'correlation_matrix': render_correlation_matrix,
+    'training_history': render_training_history,
+    'predictions': render_predictions,
+}
+
+
+def worker_main(plots_dir, upload_threads):
+    """Child process: render plots and upload artifacts until told to close."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    import matplotlib
+    matplotlib.use('Agg')
+
+    inbox = sys.stdin.buffer
+    events = sys.stdout.buffer
+    # stdout carries pickled events, so anything printed goes to stderr
+    sys.stdout = sys.stderr
+    emit_lock = threading.Lock()
+
+    def emit(*event):
+        with emit_lock:
+            pickle.dump(event, events)
+            events.flush()
+
+    executor = ThreadPoolExecutor(max_workers=upload_threads)
+    client = None
+    run_id = None
+    held = []
+    requested = set()
+
+    def upload(path, artifact_path):
+        try:
+            client.log_artifact(run_id, path, artifact_path)
+            emit('uploaded', path)
+        except Exception as e:
+            emit('error', f"upload of {path} failed: {e}")
+
+    while True:
+        try:
+            message = pickle.load(inbox)
+        except EOFError:
+            break
+        kind = message[0]
+
+        if kind == 'plot':
+            _, filename, renderer, snapshot = message
+            path = os.path.join(plots_dir, filename)
+            try:
+                RENDERERS[renderer](path, **snapshot)
+                emit('rendered', filename)
+            except Exception as e:
+                emit('error', f"rendering {filename} failed: {e}")
+        elif kind == 'run':
+            import mlflow
+            from mlflow.tracking import MlflowClient
+
+            _, tracking_uri, run_id = message
+            mlflow.set_tracking_uri(tracking_uri)
+            client = MlflowClient()
+            for item in held:
+                executor.submit(upload, *item)
+            held = []
+        elif kind == 'upload':
+            _, path, artifact_path = message
+            if (path, artifact_path) in requested:
+                continue
+            requested.add((path, artifact_path))
+            if client is None:
+                held.append((path, artifact_path))
+            else:
+                executor.submit(upload, path, artifact_path)
+        elif kind == 'close':
+            break
+
+    executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    worker_main(sys.argv[1], int(sys.argv[2]))
@@ -0,0 +1,236 @@
+"""
+Asynchronous checkpointing with retention and resume for Keras training.
+
+AsyncCheckpointCallback copies the model and optimizer weights into memory at
+the end of an epoch and hands the copy to a background thread, which writes
+it to disk and prunes old checkpoints. Only the last N and the best K
+checkpoints are kept. A checkpoint is a .npz weights file and a .json
+manifest written after it; a checkpoint counts as valid only when the
+manifest exists and the weights file matches it. After a spot interruption,
+latest_checkpoint and restore resume training from the newest valid
+checkpoint.
+"""
+
+import glob
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+import numpy as np
+import tensorflow as tf
+
+CHECKPOINT_PATTERN = re.compile(r'checkpoint-(\d+)\.json$')
+
+
+def _checkpoint_paths(directory, epoch):
+    base = os.path.join(directory, f'checkpoint-{epoch:04d}')
+    return base + '.npz', base + '.json'
+
+
+def _read_manifest(manifest_path):
+    """Return the manifest of a valid checkpoint, or None."""
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        weights_path = os.path.join(os.path.dirname(manifest_path), manifest['weights_file'])
+        if os.path.getsize(weights_path) != manifest['bytes']:
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+    manifest['weights_path'] = weights_path
+    return manifest
+
+
+def list_checkpoints(directory):
+    """Manifests of all valid checkpoints in directory, oldest first."""
+    manifests = []
+    for path in glob.glob(os.path.join(directory, 'checkpoint-*.json')):
+        if CHECKPOINT_PATTERN.search(path):
+            manifest = _read_manifest(path)
+            if manifest is not None:
+                manifests.append(manifest)
+    return sorted(manifests, key=lambda m: m['epoch'])
+
+
+def rank_checkpoints(checkpoints, monitor):
+    """Checkpoints with a monitored value, best first."""
+    scored = [c for c in checkpoints if c.get('value') is not None]
+    reverse = 'acc' in monitor or 'auc' in monitor
+    return sorted(scored, key=lambda c: c['value'], reverse=reverse)
+
+
+def best_checkpoint(directory, monitor='val_loss'):
+    """Manifest of the valid checkpoint with the best monitored value, or None."""
+    ranked = rank_checkpoints([m for m in list_checkpoints(directory) if m.get('monitor') == monitor], monitor)
+    return ranked[0] if ranked else None
+
+
+def latest_checkpoint(directory):
+    """Manifest of the newest checkpoint whose weights load, or None."""
+    for manifest in reversed(list_checkpoints(directory)):
+        try:
+            with np.load(manifest['weights_path']) as data:
+                if len(data.files) != manifest['num_weights'] + manifest['num_optimizer_variables']:
+                    raise ValueError("checkpoint is missing arrays")
+            return manifest
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable checkpoint {manifest['weights_path']}: {e}")
+    return None
+
+
+def restore(model, manifest):
+    """Load a checkpoint into a compiled model; returns the epoch to resume from."""
+    with np.load(manifest['weights_path']) as data:
+        model.set_weights([data[f'weight_{i}'] for i in range(manifest['num_weights'])])
+        optimizer_values = [data[f'optimizer_{i}'] for i in range(manifest['num_optimizer_variables'])]
+
+    # Slot variables only exist once the optimizer is built
+    optimizer = model.optimizer
+    if optimizer_values:
+        if not optimizer.variables:
+            optimizer.build(model.trainable_variables)
+        if len(optimizer.variables) == len(optimizer_values):
+            for variable, value in zip(optimizer.variables, optimizer_values):
+                variable.assign(value)
+        else:
+            print("Optimizer layout changed since the checkpoint; restoring model weights only")
+    return manifest['epoch']
+
+
+class AsyncCheckpointCallback(tf.keras.callbacks.Callback):
+    """Snapshot weights every epoch and write them on a background thread."""
+
+    def __init__(self, directory, monitor='val_loss', keep_last=2, keep_best=1, logger=None):
+        super().__init__()
+        self.directory = directory
+        self.monitor = monitor
+        self.keep_last = keep_last
+        self.keep_best = keep_best
+        self.logger = logger
+
+        # At most one snapshot waits while another is written, so memory use
+        # stays bounded if the disk is slower than an epoch
+        self.queue = queue.Queue(maxsize=1)
+        self.thread = None
+        self.checkpoints = []
+        self.stats = {
+            'checkpoints_written': 0,
+            'checkpoints_deleted': 0,
+            'snapshot_seconds': 0.0,
+            'write_seconds': 0.0,
+            'bytes_written': 0,
+            'errors': 0,
+        }
+
+    def on_train_begin(self, logs=None):
+        os.makedirs(self.directory, exist_ok=True)
+        # Checkpoints left by an interrupted run take part in retention
+        self.checkpoints = [{'epoch': m['epoch'], 'value': m.get('value')}
+                            for m in list_checkpoints(self.directory)]
+        self.thread = threading.Thread(target=self._run, name='checkpoint-writer', daemon=True)
+        self.thread.start()
+
+    def on_epoch_end(self, epoch, logs=None):
+        start = time.perf_counter()
+        weights = self.model.get_weights()
+        optimizer_values = [np.array(v) for v in self.model.optimizer.variables]
+        self.stats['snapshot_seconds'] += time.perf_counter() - start
+
+        value = (logs or {}).get(self.monitor)
+        # Keras epochs are 0-based; the checkpoint records completed epochs so
+        # it can be passed straight to fit(initial_epoch=...)
+        self.queue.put({
+            'epoch': epoch + 1,
+            'monitor': self.monitor,
+            'value': float(value) if value is not None else None,
+            'weights': weights,
+            'optimizer': optimizer_values,
+        })
+
+    def on_train_end(self, logs=None):
+        self.close()
+        stats = self.stats
+        print(f"Checkpoints: {stats['checkpoints_written']} written ({stats['bytes_written'] / 1024:,.1f} KiB), "
+              f"{stats['checkpoints_deleted']} pruned; {stats['snapshot_seconds']:.3f}s snapshotting, "
+              f"{stats['write_seconds']:.2f}s writing in background, {stats['errors']} error(s)")
+
+        if self.logger is not None:
+            for key in ('checkpoints_written', 'snapshot_seconds', 'write_seconds', 'bytes_written'):
+                self.logger.log_metric(f"checkpoint_{key}", stats[key])
+
+    def close(self):
+        """Wait for pending writes and stop the writer thread."""
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def _run(self):
+        while True:
+            snapshot = self.queue.get()
+            if snapshot is None:
+                return
+            start = time.perf_counter()
+            try:
+                self._write(snapshot)
+                self._prune()
+            except Exception as e:
+                # A failed checkpoint must never interrupt training
+                self.stats['errors'] += 1
+                print(f"Checkpoint for epoch {snapshot['epoch']} failed: {e}")
+            self.stats['write_seconds'] += time.perf_counter() - start
+
+    def _write(self, snapshot):
+        weights_path, manifest_path = _checkpoint_paths(self.directory, snapshot['epoch'])
+        arrays = {f'weight_{i}': w for i, w in enumerate(snapshot['weights'])}
+        arrays.update({f'optimizer_{i}': v for i, v in enumerate(snapshot['optimizer'])})
+
+        # Write to temporary names and rename, weights before manifest, so an
+        # interruption never leaves a checkpoint that looks valid but is not
+        tmp_weights = weights_path + '.tmp'
+        with open(tmp_weights, 'wb') as f:
+            np.savez(f, **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_weights, weights_path)
+
+        manifest = {
+            'epoch': snapshot['epoch'],
+            'monitor': snapshot['monitor'],
+            'value': snapshot['value'],
+            'weights_file': os.path.basename(weights_path),
+            'bytes': os.path.getsize(weights_path),
+            'num_weights': len(snapshot['weights']),
+            'num_optimizer_variables': len(snapshot['optimizer']),
+            'created': time.time(),
+        }
+        tmp_manifest = manifest_path + '.tmp'
+        with open(tmp_manifest, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_manifest, manifest_path)
+
+        self.checkpoints = [c for c in self.checkpoints if c['epoch'] != snapshot['epoch']]
+        self.checkpoints.append({'epoch': snapshot['epoch'], 'value': snapshot['value']})
+        self.stats['checkpoints_written'] += 1
+        self.stats['bytes_written'] += manifest['bytes']
+
+    def _prune(self):
+        by_epoch = sorted(self.checkpoints, key=lambda c: c['epoch'])
+        keep = {c['epoch'] for c in by_epoch[-self.keep_last:]} if self.keep_last > 0 else set()
+        keep.update(c['epoch'] for c in rank_checkpoints(self.checkpoints, self.monitor)[:self.keep_best])
+
+        for checkpoint in by_epoch:
+            if checkpoint['epoch'] in keep:
+                continue
+            # Remove the manifest first so a half-deleted checkpoint is never
+            # picked up as valid
+            weights_path, manifest_path = _checkpoint_paths(self.directory, checkpoint['epoch'])
+            for path in (manifest_path, weights_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.checkpoints.remove(checkpoint)
+            self.stats['checkpoints_deleted'] += 1
@@ -0,0 +1,278 @@
+"""
+Data-parallel training with tf.distribute, and a local scaling benchmark.
+
+create_strategy returns the strategy train.py builds and compiles the model
+under:
+
+    none          the default single-replica strategy
+    mirrored      MirroredStrategy over --cpu-devices logical CPU devices in
+                  one process
+    multi-worker  MultiWorkerMirroredStrategy across processes or hosts. The
+                  cluster comes from TF_CONFIG, or is built from SageMaker's
+                  SM_HOSTS and SM_CURRENT_HOST when TF_CONFIG is not set
+
+Run as a script, it measures scaling efficiency on one machine. For each
+worker count it starts that many local train.py processes in multi-worker
+mode, each pinned to its own cores, and compares training samples/sec with
+the smallest worker count:
+
+    python src/distributed.py --workers 1,2,4 --threads-per-worker 2 --epochs 5 -- --batch-size 64
+"""
+
+import argparse
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+TRAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'train.py')
+DEFAULT_PORT = 2222
+
+
+def tf_config_from_sagemaker(port=DEFAULT_PORT):
+    """Build a TF_CONFIG dict from SM_HOSTS/SM_CURRENT_HOST, or return None."""
+    hosts = json.loads(os.environ.get('SM_HOSTS', '[]'))
+    current_host = os.environ.get('SM_CURRENT_HOST')
+    if len(hosts) < 2 or current_host not in hosts:
+        return None
+    hosts = sorted(hosts)
+    return {
+        'cluster': {'worker': [f'{host}:{port}' for host in hosts]},
+        'task': {'type': 'worker', 'index': hosts.index(current_host)},
+    }
+
+
+def create_strategy(mode, cpu_devices=2):
+    """Create the distribution strategy; returns (strategy, worker info)."""
+    import tensorflow as tf
+
+    worker = {'task_index': 0, 'num_workers': 1, 'is_chief': True}
+
+    if mode == 'none':
+        return tf.distribute.get_strategy(), worker
+
+    if mode == 'mirrored':
+        # Split the host CPU into logical devices, one replica each; this has
+        # to happen before TensorFlow initializes its devices
+        cpus = tf.config.list_physical_devices('CPU')
+        tf.config.set_logical_device_configuration(
+            cpus[0], [tf.config.LogicalDeviceConfiguration() for _ in range(cpu_devices)])
+        devices = [device.name for device in tf.config.list_logical_devices('CPU')]
+        strategy = tf.distribute.MirroredStrategy(devices, cross_device_ops=tf.distribute.ReductionToOneDevice())
+        print(f"MirroredStrategy over {len(devices)} CPU devices")
+        return strategy, worker
+
+    if mode == 'multi-worker':
+        if 'TF_CONFIG' not in os.environ:
+            tf_config = tf_config_from_sagemaker()
+            if tf_config is not None:
+                os.environ['TF_CONFIG'] = json.dumps(tf_config)
+        communication = tf.distribute.experimental.CommunicationOptions(
+            implementation=tf.distribute.experimental.CommunicationImplementation.RING)
+        strategy = tf.distribute.MultiWorkerMirroredStrategy(communication_options=communication)
+
+        resolver = strategy.cluster_resolver
+        cluster = resolver.cluster_spec().as_dict()
+        task_type, task_index = resolver.task_type, resolver.task_id or 0
+        worker = {
+            'task_index': task_index,
+            'num_workers': max(1, len(cluster.get('worker', [])) + len(cluster.get('chief', []))),
+            # Without a dedicated chief, worker 0 acts as chief
+            'is_chief': task_type in (None, 'chief') or (task_type == 'worker' and task_index == 0
+                                                        and 'chief' not in cluster),
+        }
+        print(f"MultiWorkerMirroredStrategy: worker {task_index} of {worker['num_workers']}"
+              f"{' (chief)' if worker['is_chief'] else ''}")
+        return strategy, worker
+
+    raise ValueError(f"Unknown distribution mode: {mode}")
+
+
+def worker_model_dir(model_dir, worker):
+    """The chief writes to model_dir; other workers write to a throwaway directory.
+
+    Every worker has to take part in saving a multi-worker model, but only the
+    chief's output is kept.
+    """
+    if worker['is_chief']:
+        return model_dir
+    return tempfile.mkdtemp(prefix=f"worker-{worker['task_index']}-")
+
+
+def cleanup_worker_dir(model_dir, worker):
+    if not worker['is_chief']:
+        shutil.rmtree(model_dir, ignore_errors=True)
+
+
+def shard(dataset, num_files=None, num_workers=1):
+    """Shard by file when each worker gets at least one file, otherwise by element."""
+    import tensorflow as tf
+
+    options = tf.data.Options()
+    if num_files is not None and num_files >= num_workers:
+        options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.FILE
+    else:
+        options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.DATA
+    return dataset.with_options(options)
+
+
+def array_datasets(X, y, batch_size, validation_split=0.2, seed=42):
+    """tf.data equivalents of fit(X, y, validation_split=..., shuffle=True).
+
+    Like Keras, the validation rows are the last validation_split of the
+    arrays, taken before shuffling.
+    """
+    import tensorflow as tf
+
+    split = int(len(X) * (1 - validation_split))
+    train = (tf.data.Dataset.from_tensor_slices((X[:split], y[:split]))
+             .shuffle(split, seed=seed, reshuffle_each_iteration=True)
+             .batch(batch_size)
+             .prefetch(tf.data.AUTOTUNE))
+    validation = (tf.data.Dataset.from_tensor_slices((X[split:], y[split:]))
+                  .batch(batch_size)
+                  .prefetch(tf.data.AUTOTUNE))
+    return shard(train), shard(validation)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure multi-worker scaling efficiency on one machine")
+    parser.add_argument('--workers', type=str, default='1,2,4', help="Comma-separated worker counts to run")
+    parser.add_argument('--threads-per-worker', type=int, default=1, help="CPU cores and TF threads per worker")
+    parser.add_argument('--epochs', type=int, default=5, help="Epochs per run")
+    parser.add_argument('--output-dir', type=str,
+                        default=os.path.join(os.environ.get('SM_MODEL_DIR', '/opt/ml/model'), 'scaling'))
+    parser.add_argument('--timeout', type=float, default=3600, help="Seconds to wait for each run")
+    # Anything after "--" is passed through to every train.py worker
+    argv = sys.argv[1:]
+    passthrough = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, passthrough = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+    args.train_args = passthrough
+    return args
+
+
+def _free_ports(count):
+    sockets = [socket.socket() for _ in range(count)]
+    try:
+        for sock in sockets:
+            sock.bind(('127.0.0.1', 0))
+        return [sock.getsockname()[1] for sock in sockets]
+    finally:
+        for sock in sockets:
+            sock.close()
+
+
+def run_local_cluster(num_workers, threads_per_worker, epochs, output_dir, train_args, timeout):
+    """Train with num_workers local processes; returns the chief's final progress record."""
+    from sweep import cpu_slots
+
+    run_dir = os.path.join(output_dir, f'workers-{num_workers}')
+    os.makedirs(run_dir, exist_ok=True)
+    slots = cpu_slots(threads_per_worker)
+    if len(slots) < num_workers:
+        print(f"Only {len(slots)} core set(s) of {threads_per_worker} available; workers will share cores")
+    cluster = {'worker': [f'localhost:{port}' for port in _free_ports(num_workers)]}
+
+    processes = []
+    for index in range(num_workers):
+        slot = slots[index % len(slots)]
+        progress_path = os.path.join(run_dir, f'progress-{index}.jsonl')
+        if os.path.exists(progress_path):
+            os.remove(progress_path)
+        env = dict(os.environ,
+                   TF_CONFIG=json.dumps({'cluster': cluster, 'task': {'type': 'worker', 'index': index}}),
+                   SM_MODEL_DIR=run_dir,
+                   OMP_NUM_THREADS=str(len(slot)),
+                   TF_NUM_INTRAOP_THREADS=str(len(slot)),
+                   TF_NUM_INTEROP_THREADS='1')
+        cmd = [sys.executable, TRAIN_SCRIPT,
+               '--distribute', 'multi-worker',
+               '--epochs', str(epochs),
+               '--threads', str(len(slot)),
+               '--run-name', f'scaling-{num_workers}-workers',
+               '--register-model', 'false',
+               '--progress-file', progress_path] + list(train_args)
+
+        def pin(slot=slot):
+            if hasattr(os, 'sched_setaffinity'):
+                os.sched_setaffinity(0, slot)
+
+        log_file = open(os.path.join(run_dir, f'worker-{index}.log'), 'w')
+        processes.append((subprocess.Popen(cmd, env=env, stdout=log_file, stderr=subprocess.STDOUT,
+                                           preexec_fn=pin), log_file))
+
+    # Collective ops block until every worker joins, so one failed worker
+    # would hang the others; stop them all if any exits with an error
+    deadline = time.monotonic() + timeout
+    failed = False
+    while any(process.poll() is None for process, _ in processes):
+        if time.monotonic() > deadline or any(process.poll() not in (None, 0) for process, _ in processes):
+            failed = True
+            for process, _ in processes:
+                if process.poll() is None:
+                    process.kill()
+            break
+        time.sleep(1)
+    for process, log_file in processes:
+        process.wait()
+        log_file.close()
+    if failed:
+        print(f"Run with {num_workers} worker(s) failed; see the worker logs in {run_dir}")
+        return None
+
+    with open(os.path.join(run_dir, 'progress-0.jsonl')) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return next((record['final'] for record in records if 'final' in record), None)
+
+
+def main():
+    args = parse_args()
+    worker_counts = [int(count) for count in args.workers.split(',')]
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    results = []
+    for num_workers in worker_counts:
+        print(f"\nTraining with {num_workers} worker(s)...")
+        final = run_local_cluster(num_workers, args.threads_per_worker, args.epochs, args.output_dir,
+                                  args.train_args, args.timeout)
+        if final is None or 'samples_per_sec' not in final:
+            continue
+        results.append({
+            'workers': num_workers,
+            'samples_per_sec': final['samples_per_sec'],
+            'training_time_seconds': final['training_time_seconds'],
+            'test_mae': final['test_mae'],
+        })
+        print(f"{num_workers} worker(s): {final['samples_per_sec']:,.0f} samples/sec")
+
+    if not results:
+        print("No run completed")
+        return
+
+    # Efficiency is throughput per worker relative to the smallest run
+    base = results[0]
+    for result in results:
+        ideal = base['samples_per_sec'] * result['workers'] / base['workers']
+        result['speedup'] = result['samples_per_sec'] / base['samples_per_sec']
+        result['efficiency'] = result['samples_per_sec'] / ideal
+
+    print(f"\n{'workers':>8} {'samples/s':>12} {'speedup':>8} {'efficiency':>11} {'test MAE':>9}")
+    for result in results:
+        print(f"{result['workers']:>8} {result['samples_per_sec']:>12,.0f} {result['speedup']:>7.2f}x "
+              f"{result['efficiency']:>10.0%} {result['test_mae']:>9.4f}")
+
+    report_path = os.path.join(args.output_dir, 'scaling.json')
+    with open(report_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {report_path}")
+
+
+if __name__ == "__main__":
+    main()
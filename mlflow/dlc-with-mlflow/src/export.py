@@ -0,0 +1,67 @@
+"""
+Timed model export for train.py.
+
+The native Keras file, the TensorFlow SavedModel and the MLflow model are
+written one after another on the calling thread. Each is a separate
+serialization of the in-memory model: saving one Keras model from several
+threads at once is not thread-safe, MLflow keeps the active run per thread,
+and its TensorFlow flavor cannot be built from an existing file. Only the
+preprocessor, which does not touch the model, is written concurrently on a
+worker thread. The time taken and size on disk of each format are returned
+as a report.
+"""
+
+import concurrent.futures
+import os
+import time
+
+import joblib
+import tensorflow as tf
+
+
+def path_size(path):
+    """Size in bytes of a file, or of all files under a directory."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def export_model(model, preprocessor, keras_path, saved_model_path, preprocessor_path, log_mlflow_model=None):
+    """Write all export formats and return a per-format report.
+
+    log_mlflow_model is an optional callable that logs the model to MLflow; it
+    runs on the calling thread after the local model exports.
+    """
+    model_tasks = {
+        'keras': (keras_path, model.save),
+        'saved_model': (saved_model_path, lambda path: tf.saved_model.save(model, path)),
+    }
+
+    report = {}
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='export') as executor:
+        preprocessor_future = executor.submit(_timed, lambda path: joblib.dump(preprocessor, path), preprocessor_path)
+
+        for name, (path, fn) in model_tasks.items():
+            report[name] = {'path': path, 'seconds': _timed(fn, path), 'bytes': path_size(path)}
+
+        if log_mlflow_model is not None:
+            # Only the time is known here; the files are written by MLflow to
+            # a temporary directory and uploaded
+            report['mlflow'] = {'path': None, 'seconds': _timed(log_mlflow_model), 'bytes': None}
+
+        report['preprocessor'] = {'path': preprocessor_path, 'seconds': preprocessor_future.result(),
+                                  'bytes': path_size(preprocessor_path)}
+
+    report['total_seconds'] = time.perf_counter() - start
+    return report
@@ -0,0 +1,118 @@
+"""
+Content-addressed cache for preprocessed feature matrices.
+
+Entries are keyed by the SHA-256 of the input file plus the preprocessing spec
+and hold the fitted preprocessor and the float32 train/test arrays as .npy
+files. Arrays are memory-mapped on load, so repeated runs on the same channel
+data skip parsing and preprocessing and read the matrices without copying.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import joblib
+import numpy as np
+import sklearn
+
+ARRAY_NAMES = ('X_train', 'X_test', 'y_train', 'y_test')
+PREPROCESSOR_FILE = 'preprocessor.pkl'
+META_FILE = 'meta.json'
+PLOTS_DIR = 'plots'
+
+
+def file_digest(path, block_size=1 << 20):
+    """Return the SHA-256 hex digest of a file, read in fixed-size blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(data_file, spec):
+    """Derive the cache key from the input file content and preprocessing spec."""
+    # Library versions are part of the key because the pickled preprocessor
+    # and the numerical output may change between releases
+    spec = dict(spec, numpy=np.__version__, sklearn=sklearn.__version__)
+    digest = hashlib.sha256()
+    digest.update(file_digest(data_file).encode())
+    digest.update(json.dumps(spec, sort_keys=True).encode())
+    return digest.hexdigest()[:32]
+
+
+def load(cache_dir, key):
+    """Return the cached entry for key with memory-mapped arrays, or None on a miss."""
+    entry_dir = os.path.join(cache_dir, key)
+    meta_path = os.path.join(entry_dir, META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        entry = {name: np.load(os.path.join(entry_dir, f'{name}.npy'), mmap_mode='r') for name in ARRAY_NAMES}
+        entry['preprocessor'] = joblib.load(os.path.join(entry_dir, PREPROCESSOR_FILE))
+    except Exception as e:
+        print(f"Ignoring unreadable feature cache entry {entry_dir}: {e}")
+        return None
+
+    entry['dir'] = entry_dir
+    entry['meta'] = meta
+    return entry
+
+
+def save(cache_dir, key, preprocessor, arrays, meta, plot_files=()):
+    """Write a cache entry, publishing it atomically once every file is complete."""
+    entry_dir = os.path.join(cache_dir, key)
+    os.makedirs(cache_dir, exist_ok=True)
+    staging_dir = tempfile.mkdtemp(prefix=f'.{key}-', dir=cache_dir)
+
+    try:
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(staging_dir, f'{name}.npy'), np.ascontiguousarray(arrays[name], dtype=np.float32))
+        joblib.dump(preprocessor, os.path.join(staging_dir, PREPROCESSOR_FILE))
+
+        if plot_files:
+            os.makedirs(os.path.join(staging_dir, PLOTS_DIR))
+            for path in plot_files:
+                shutil.copy2(path, os.path.join(staging_dir, PLOTS_DIR, os.path.basename(path)))
+
+        # meta.json marks a complete entry, so it is written last
+        with open(os.path.join(staging_dir, META_FILE), 'w') as f:
+            json.dump(dict(meta, key=key, created=time.time()), f, indent=2)
+
+        os.rename(staging_dir, entry_dir)
+    except OSError:
+        # Another run may have published the same entry first
+        shutil.rmtree(staging_dir, ignore_errors=True)
+        if not os.path.exists(os.path.join(entry_dir, META_FILE)):
+            raise
+    return entry_dir
+
+
+def add_plots(entry_dir, plot_files):
+    """Store plots with a published entry; each file appears complete or not at all."""
+    target_dir = os.path.join(entry_dir, PLOTS_DIR)
+    os.makedirs(target_dir, exist_ok=True)
+    for path in plot_files:
+        target = os.path.join(target_dir, os.path.basename(path))
+        staging = f'{target}.tmp.{os.getpid()}'
+        shutil.copy2(path, staging)
+        os.replace(staging, target)
+
+
+def restore_plots(entry, plots_dir):
+    """Copy the exploratory plots stored with a cache entry into plots_dir."""
+    cached_plots = os.path.join(entry['dir'], PLOTS_DIR)
+    if not os.path.isdir(cached_plots):
+        return []
+    restored = []
+    for name in sorted(os.listdir(cached_plots)):
+        if '.tmp.' in name:
+            continue
+        restored.append(shutil.copy2(os.path.join(cached_plots, name), os.path.join(plots_dir, name)))
+    return restored
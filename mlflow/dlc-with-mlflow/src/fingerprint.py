@@ -0,0 +1,153 @@
+"""
+Constant-time dataset fingerprints for mlflow.log_input.
+
+mlflow.data.from_pandas hashes and profiles the whole DataFrame, so its cost
+grows with the dataset. A fingerprint is computed from file metadata instead:
+the size of each file, a SHA-256 of a fixed number of blocks sampled evenly
+through it (always including the first and last block), and the column
+schema. Reading a fixed number of blocks per file makes the cost independent
+of file size; small files are hashed in full.
+
+Per-file results are cached in a .dataset_fingerprint.json sidecar next to
+the data and reused while a file's size and modification time are unchanged.
+Re-registering an unchanged dataset therefore reads no data at all, while an
+appended, truncated, rewritten or touched file is re-sampled. Modification
+times are not part of the digest, so a copy of the same data gets the same
+digest.
+
+With full=True every byte of every file is hashed and the sidecar is not
+used, for data that cannot be loaded into one DataFrame, such as streamed
+shards.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+SIDECAR_NAME = '.dataset_fingerprint.json'
+FINGERPRINT_VERSION = 1
+
+# pandas dtype names and the MLflow column types they are registered as
+MLFLOW_TYPES = {
+    'float64': 'double',
+    'float32': 'float',
+    'int64': 'long',
+    'int32': 'integer',
+    'bool': 'boolean',
+    'object': 'string',
+}
+
+
+def full_digest(path, size, block_size):
+    """SHA-256 of the whole file, read in fixed-size blocks."""
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sampled_digest(path, size, block_size, num_blocks):
+    """SHA-256 of num_blocks evenly spaced blocks, or of the whole file if it is small."""
+    if size <= block_size * num_blocks:
+        return full_digest(path, size, block_size)
+    digest = hashlib.sha256(str(size).encode())
+    step = (size - block_size) / (num_blocks - 1)
+    with open(path, 'rb') as f:
+        for i in range(num_blocks):
+            offset = int(round(i * step))
+            f.seek(offset)
+            digest.update(offset.to_bytes(8, 'little'))
+            digest.update(f.read(block_size))
+    return digest.hexdigest()
+
+
+def _load_sidecar(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_sidecar(path, data):
+    # The data directory may be read-only; the fingerprint is then simply
+    # recomputed next time
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def fingerprint(paths, schema=None, block_size=64 * 1024, num_blocks=16, full=False):
+    """Fingerprint a set of data files.
+
+    schema is a list of [column, dtype] pairs; when None, the schema cached
+    with a previous fingerprint is used. With full=True every file is hashed
+    in full, ignoring and leaving the sidecar untouched. Returns a dict with
+    the digest, file and byte counts, the schema, how many files had to be
+    re-sampled and the time taken.
+    """
+    start = time.perf_counter()
+    directory = os.path.dirname(os.path.abspath(paths[0]))
+    sidecar_path = os.path.join(directory, SIDECAR_NAME)
+    params = {'version': FINGERPRINT_VERSION, 'block_size': block_size, 'num_blocks': num_blocks}
+
+    cached = {} if full else _load_sidecar(sidecar_path)
+    cached_files = cached.get('files', {}) if cached.get('params') == params else {}
+
+    files = {}
+    rehashed = 0
+    for path in sorted(os.path.abspath(p) for p in paths):
+        stat = os.stat(path)
+        name = os.path.relpath(path, directory)
+        entry = cached_files.get(name)
+        if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            entry = {
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+                'digest': (full_digest(path, stat.st_size, block_size) if full
+                           else sampled_digest(path, stat.st_size, block_size, num_blocks)),
+            }
+            rehashed += 1
+        files[name] = entry
+
+    if schema is None:
+        schema = cached.get('schema')
+
+    content = {name: [entry['size'], entry['digest']] for name, entry in files.items()}
+    digest = hashlib.sha256(json.dumps({'files': content, 'schema': schema}, sort_keys=True).encode())
+
+    if not full and (rehashed or schema != cached.get('schema') or set(files) != set(cached_files)):
+        _save_sidecar(sidecar_path, {'params': params, 'files': files, 'schema': schema})
+
+    return {
+        'digest': digest.hexdigest()[:16],
+        'num_files': len(files),
+        'bytes': sum(entry['size'] for entry in files.values()),
+        'schema': schema,
+        'rehashed_files': rehashed,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def dataframe_schema(df):
+    """[column, dtype] pairs of a DataFrame, without touching its rows."""
+    return [[str(column), str(dtype)] for column, dtype in df.dtypes.items()]
+
+
+def mlflow_dataset(result, source, name):
+    """An MLflow dataset carrying the fingerprint digest, with no data or profile."""
+    from mlflow.data.dataset_source_registry import resolve_dataset_source
+    from mlflow.data.meta_dataset import MetaDataset
+    from mlflow.types import ColSpec, Schema
+
+    schema = None
+    if result['schema']:
+        schema = Schema([ColSpec(MLFLOW_TYPES.get(dtype, 'string'), column) for column, dtype in result['schema']])
+    return MetaDataset(source=resolve_dataset_source(source), name=name, digest=result['digest'], schema=schema)
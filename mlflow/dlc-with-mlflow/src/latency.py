@@ -0,0 +1,28 @@
+"""
+Latency percentiles shared by the step profiler, the inference server and the
+load generator.
+
+Only the standard library is used, so loadgen.py can report the same
+summary on a client machine without TensorFlow or NumPy.
+"""
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_values, q):
+    """Linearly interpolated percentile of an already sorted, non-empty list."""
+    rank = (len(sorted_values) - 1) * q / 100.0
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def latency_summary(seconds):
+    """Return mean and p50/p90/p95/p99 of a list of durations, in milliseconds."""
+    if not seconds:
+        return {}
+    ms = sorted(float(value) * 1000.0 for value in seconds)
+    summary = {'mean_ms': sum(ms) / len(ms)}
+    for q in PERCENTILES:
+        summary[f'p{q}_ms'] = percentile(ms, q)
+    return summary
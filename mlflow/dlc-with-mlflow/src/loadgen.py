@@ -0,0 +1,225 @@
+"""
+Load generator for serve.py.
+
+Sends POST /invocations requests from concurrent client threads over
+keep-alive connections and reports requests/sec, rows/sec and client-side
+p50/p95/p99 latency, together with the server's own /metrics. With --compare
+it starts serve.py twice, once with micro-batching and once with per-request
+model.predict, runs the same load against each and prints both results.
+Only the standard library is needed, so the client can run on a machine
+without TensorFlow or NumPy.
+
+Examples:
+    python src/loadgen.py --url http://127.0.0.1:8080 --concurrency 32 --requests 5000
+    python src/loadgen.py --compare --model-dir /opt/ml/model --concurrency 32 --requests 2000
+"""
+
+import argparse
+import csv
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+from latency import latency_summary
+
+SERVE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'serve.py')
+NUM_FEATURES = 8
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Load generator for the abalone inference server")
+    parser.add_argument('--url', type=str, default='http://127.0.0.1:8080', help="Server to load")
+    parser.add_argument('--compare', action='store_true',
+                        help="Start serve.py with and without micro-batching and load both")
+    parser.add_argument('--model-dir', type=str, default='/opt/ml/model', help="Model directory for --compare")
+    parser.add_argument('--max-batch-size', type=int, default=64, help="Server batch size for --compare")
+    parser.add_argument('--max-latency-ms', type=float, default=5.0, help="Server latency budget for --compare")
+    parser.add_argument('--concurrency', type=int, default=32, help="Number of concurrent client threads")
+    parser.add_argument('--requests', type=int, default=2000, help="Total number of requests to send")
+    parser.add_argument('--rows-per-request', type=int, default=1, help="Instances per request")
+    parser.add_argument('--warmup', type=int, default=100, help="Requests sent before measuring")
+    parser.add_argument('--data', type=str, default=None,
+                        help="abalone.data file to sample rows from (default: synthetic rows)")
+    parser.add_argument('--output', type=str, default=None, help="Write the results as JSON")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for the request rows")
+    args = parser.parse_args()
+    if args.rows_per_request < 1:
+        parser.error("--rows-per-request must be at least 1")
+    return args
+
+
+def load_rows(path, seed, count=1000):
+    """Feature rows from abalone.data, or synthetic rows in the same ranges."""
+    rng = random.Random(seed)
+    if path:
+        with open(path) as f:
+            rows = [[r[0]] + [float(v) for v in r[1:NUM_FEATURES]] for r in csv.reader(f) if r]
+        return [rng.choice(rows) for _ in range(count)]
+    return [[rng.choice('MFI'), rng.uniform(0.1, 0.8), rng.uniform(0.1, 0.6), rng.uniform(0.0, 0.25),
+             rng.uniform(0.01, 2.5), rng.uniform(0.005, 1.2), rng.uniform(0.001, 0.6), rng.uniform(0.002, 1.0)]
+            for _ in range(count)]
+
+
+def _get_json(url, path):
+    parsed = urllib.parse.urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=10)
+    try:
+        conn.request('GET', path)
+        return json.loads(conn.getresponse().read())
+    finally:
+        conn.close()
+
+
+def run_load(url, rows, concurrency, num_requests, rows_per_request, warmup=0):
+    """Send num_requests requests from concurrency threads; return client-side results."""
+    parsed = urllib.parse.urlparse(url)
+    bodies = [json.dumps({'instances': rows[i:i + rows_per_request]}).encode('utf-8')
+              for i in range(0, len(rows) - rows_per_request + 1, rows_per_request)]
+    if not bodies:
+        raise ValueError(f"{len(rows)} sampled rows are fewer than {rows_per_request} rows per request")
+    headers = {'Content-Type': 'application/json'}
+
+    lock = threading.Lock()
+    counter = {'next': 0}
+    latencies = []
+    errors = []
+
+    def worker(total):
+        conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=60)
+        local = []
+        while True:
+            with lock:
+                index = counter['next']
+                if index >= total:
+                    break
+                counter['next'] += 1
+            start = time.perf_counter()
+            try:
+                conn.request('POST', '/invocations', body=bodies[index % len(bodies)], headers=headers)
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    errors.append(response.status)
+            except (OSError, http.client.HTTPException) as e:
+                errors.append(str(e))
+                conn.close()
+                conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=60)
+                continue
+            local.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    def run(total):
+        counter['next'] = 0
+        threads = [threading.Thread(target=worker, args=(total,)) for _ in range(concurrency)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - start
+
+    if warmup:
+        run(warmup)
+        latencies.clear()
+        errors.clear()
+
+    elapsed = run(num_requests)
+    return {
+        'requests': len(latencies),
+        'errors': len(errors),
+        'seconds': elapsed,
+        'requests_per_sec': len(latencies) / elapsed if elapsed > 0 else 0.0,
+        'rows_per_sec': len(latencies) * rows_per_request / elapsed if elapsed > 0 else 0.0,
+        'latency': latency_summary(latencies),
+    }
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(model_dir, extra_args, timeout=120):
+    """Start serve.py on a free port and wait until /ping answers."""
+    port = _free_port()
+    process = subprocess.Popen([sys.executable, SERVE_SCRIPT, '--model-dir', model_dir,
+                                '--port', str(port)] + extra_args)
+    url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"serve.py exited with code {process.returncode}")
+        try:
+            _get_json(url, '/ping')
+            return process, url
+        except OSError:
+            time.sleep(0.5)
+    process.kill()
+    raise RuntimeError(f"serve.py did not start within {timeout}s")
+
+
+def print_result(name, result):
+    latency = result['latency']
+    print(f"{name:<26} {result['requests_per_sec']:>10,.0f} {result['rows_per_sec']:>10,.0f} "
+          f"{latency.get('p50_ms', 0):>9.2f} {latency.get('p99_ms', 0):>9.2f} "
+          f"{result.get('server', {}).get('mean_batch_size', 0):>10.1f} {result['errors']:>7}")
+
+
+def main():
+    args = parse_args()
+    # Sample enough rows for at least one request body
+    rows = load_rows(args.data, args.seed, max(1000, args.rows_per_request))
+
+    if args.compare:
+        modes = {
+            'micro-batching': ['--max-batch-size', str(args.max_batch_size),
+                               '--max-latency-ms', str(args.max_latency_ms)],
+            'per-request predict': ['--no-batching'],
+        }
+    else:
+        modes = {args.url: None}
+
+    results = {}
+    for name, server_args in modes.items():
+        process = None
+        url = args.url
+        if server_args is not None:
+            process, url = start_server(args.model_dir, server_args)
+        try:
+            print(f"Loading {name}: {args.requests} requests, concurrency {args.concurrency}, "
+                  f"{args.rows_per_request} row(s) per request")
+            result = run_load(url, rows, args.concurrency, args.requests, args.rows_per_request, args.warmup)
+            result['server'] = _get_json(url, '/metrics')
+            results[name] = result
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    print(f"\n{'server':<26} {'req/s':>10} {'rows/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'avg batch':>10} {'errors':>7}")
+    for name, result in results.items():
+        print_result(name, result)
+    if args.compare:
+        batched = results['micro-batching']['requests_per_sec']
+        baseline = results['per-request predict']['requests_per_sec']
+        if baseline > 0:
+            print(f"\nMicro-batching throughput: {batched / baseline:.1f}x per-request model.predict")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Asynchronous, batched MLflow logging.
+
+Metrics, params and tags are buffered on a background thread and sent with
+MlflowClient.log_batch once a size or time threshold is reached, and artifact
+uploads run on the same thread. The training loop only pays for enqueueing
+onto a bounded queue instead of one HTTP round-trip per value.
+"""
+
+import queue
+import threading
+import time
+
+from mlflow.entities import Metric, Param, RunTag
+from mlflow.tracking import MlflowClient
+
+# Per-request limits of the MLflow log_batch API
+MAX_BATCH_METRICS = 1000
+MAX_BATCH_PARAMS = 100
+MAX_BATCH_TAGS = 100
+MAX_BATCH_ENTITIES = 1000
+
+
+class AsyncMLflowLogger:
+    """Buffer MLflow calls on a background thread and flush them with log_batch."""
+
+    def __init__(self, run_id, batch_size=200, flush_interval=5.0, max_queue_size=10000, client=None):
+        self.run_id = run_id
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.client = client or MlflowClient()
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.stats = {
+            'enqueue_wait_seconds': 0.0,
+            'logging_seconds': 0.0,
+            'batches_sent': 0,
+            'metrics_logged': 0,
+            'params_logged': 0,
+            'tags_logged': 0,
+            'artifacts_logged': 0,
+            'errors': 0,
+        }
+        self.closed = False
+        self.thread = threading.Thread(target=self._run, name='mlflow-logger', daemon=True)
+        self.thread.start()
+
+    def log_metric(self, key, value, step=None):
+        timestamp = int(time.time() * 1000)
+        self._put('metric', Metric(key, float(value), timestamp, step or 0))
+
+    def log_metrics(self, metrics, step=None):
+        for key, value in metrics.items():
+            self.log_metric(key, value, step=step)
+
+    def log_param(self, key, value):
+        self._put('param', Param(key, str(value)))
+
+    def set_tag(self, key, value):
+        self._put('tag', RunTag(key, str(value)))
+
+    def log_artifact(self, local_path, artifact_path=None):
+        self._put('artifact', (local_path, artifact_path))
+
+    def flush(self, timeout=None):
+        """Block until everything enqueued so far has been sent."""
+        done = threading.Event()
+        self._put('flush', done)
+        return done.wait(timeout)
+
+    def close(self, timeout=None):
+        """Flush outstanding work and stop the background thread."""
+        if self.closed:
+            return
+        self.flush(timeout)
+        self._put('stop', None)
+        self.thread.join(timeout)
+        self.closed = True
+
+    def _put(self, kind, payload):
+        if self.closed:
+            raise RuntimeError("AsyncMLflowLogger is closed")
+        # A full queue blocks the caller; that wait is the only logging cost
+        # the training loop sees, so it is tracked separately
+        start = time.perf_counter()
+        self.queue.put((kind, payload))
+        self.stats['enqueue_wait_seconds'] += time.perf_counter() - start
+
+    def _run(self):
+        metrics, params, tags = [], [], []
+        last_flush = time.monotonic()
+
+        while True:
+            timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                kind, payload = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                kind, payload = 'tick', None
+
+            if kind == 'metric':
+                metrics.append(payload)
+            elif kind == 'param':
+                params.append(payload)
+            elif kind == 'tag':
+                tags.append(payload)
+            elif kind == 'artifact':
+                # Send buffered values first so the run stays in call order
+                self._send(metrics, params, tags)
+                self._upload(*payload)
+
+            pending = len(metrics) + len(params) + len(tags)
+            if (kind in ('flush', 'stop') or pending >= self.batch_size
+                    or time.monotonic() - last_flush >= self.flush_interval):
+                self._send(metrics, params, tags)
+                last_flush = time.monotonic()
+
+            if kind == 'flush':
+                payload.set()
+            elif kind == 'stop':
+                return
+
+    def _send(self, metrics, params, tags):
+        """Send buffered values in log_batch sized requests and clear the buffers."""
+        while metrics or params or tags:
+            batch_params, params[:] = params[:MAX_BATCH_PARAMS], params[MAX_BATCH_PARAMS:]
+            batch_tags, tags[:] = tags[:MAX_BATCH_TAGS], tags[MAX_BATCH_TAGS:]
+            metric_room = min(MAX_BATCH_METRICS, MAX_BATCH_ENTITIES - len(batch_params) - len(batch_tags))
+            batch_metrics, metrics[:] = metrics[:metric_room], metrics[metric_room:]
+
+            start = time.perf_counter()
+            try:
+                self.client.log_batch(self.run_id, metrics=batch_metrics, params=batch_params, tags=batch_tags)
+                self.stats['batches_sent'] += 1
+                self.stats['metrics_logged'] += len(batch_metrics)
+                self.stats['params_logged'] += len(batch_params)
+                self.stats['tags_logged'] += len(batch_tags)
+            except Exception as e:
+                # Logging failures must never interrupt training
+                self.stats['errors'] += 1
+                print(f"MLflow log_batch failed: {e}")
+            self.stats['logging_seconds'] += time.perf_counter() - start
+
+    def _upload(self, local_path, artifact_path):
+        start = time.perf_counter()
+        try:
+            self.client.log_artifact(self.run_id, local_path, artifact_path)
+            self.stats['artifacts_logged'] += 1
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"MLflow artifact upload failed for {local_path}: {e}")
+        self.stats['logging_seconds'] += time.perf_counter() - start
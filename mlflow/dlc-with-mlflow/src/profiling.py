@@ -0,0 +1,244 @@
+"""
+Per-step throughput and latency profiling for Keras training.
+
+StepProfilerCallback records the wall time of every training step, samples/sec
+and p50/p95/p99 step latency, splits step time into data wait and compute, and
+can capture a tf.profiler trace for a window of steps. Results are written to a
+local JSON file and, when an MLflow logger is given, logged as metrics.
+
+ThroughputCallback is a lighter per-epoch samples/sec report, used by the
+streaming and distributed modes.
+"""
+
+import json
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from latency import latency_summary
+
+# A run is reported as input-bound when waiting on data takes at least this
+# share of the average step
+INPUT_BOUND_THRESHOLD = 0.5
+
+
+def parse_step_range(value):
+    """Parse a "start,end" step range such as "10,20", or return None."""
+    if not value:
+        return None
+    start, end = (int(part) for part in value.split(','))
+    if start < 0 or end < start:
+        raise ValueError(f"Invalid profiler step range: {value}")
+    return start, end
+
+
+class StepProfilerCallback(tf.keras.callbacks.Callback):
+    """Record per-step timing and report whether training is input- or compute-bound.
+
+    Keras fetches each batch inside the compiled train step, so a callback
+    cannot observe the data wait directly. With prefetching, input work also
+    overlaps compute, so the time to produce a batch is not the time a step
+    waits for it. Instead, at the start of training the forward and backward
+    pass is timed for probe_batches on one batch of input_dataset cached in
+    memory, where no step waits on input. Whatever a real step takes beyond
+    that compute time is counted as data wait.
+
+    With time_input, the input pipeline is also timed on its own; this is
+    reported for reference but not used for the split.
+    """
+
+    def __init__(self, batch_size, output_path, input_dataset=None, probe_batches=50,
+                 trace_steps=None, trace_dir=None, logger=None, time_input=True):
+        super().__init__()
+        self.batch_size = batch_size
+        self.output_path = output_path
+        self.input_dataset = input_dataset
+        self.probe_batches = probe_batches
+        self.time_input = time_input
+        self.trace_steps = trace_steps
+        self.trace_dir = trace_dir
+        self.logger = logger
+
+        self.step_times = []
+        self.host_gaps = []
+        self.epochs = []
+        self.global_step = 0
+        self.input_seconds_per_batch = None
+        self.compute_seconds_per_batch = None
+        self.tracing = False
+        self.last_batch_end = None
+
+    def on_train_begin(self, logs=None):
+        if self.input_dataset is not None and self.probe_batches > 0:
+            if self.time_input:
+                self.input_seconds_per_batch = self._probe_input()
+            self.compute_seconds_per_batch = self._probe_compute()
+        if self.input_seconds_per_batch:
+            print(f"Input pipeline alone: {self.input_seconds_per_batch * 1000:.2f} ms/batch "
+                  f"({self.batch_size / self.input_seconds_per_batch:,.0f} samples/sec)")
+        if self.compute_seconds_per_batch:
+            print(f"Compute on a cached batch: {self.compute_seconds_per_batch * 1000:.2f} ms/batch "
+                  f"({self.batch_size / self.compute_seconds_per_batch:,.0f} samples/sec)")
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch_first_step = len(self.step_times)
+        self.last_batch_end = None
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self.trace_steps and self.global_step == self.trace_steps[0] and not self.tracing:
+            tf.profiler.experimental.start(self.trace_dir)
+            self.tracing = True
+            print(f"Started tf.profiler trace at step {self.global_step}")
+
+        now = time.perf_counter()
+        if self.last_batch_end is not None:
+            self.host_gaps.append(now - self.last_batch_end)
+        self.batch_start = now
+
+    def on_train_batch_end(self, batch, logs=None):
+        now = time.perf_counter()
+        self.step_times.append(now - self.batch_start)
+        self.last_batch_end = now
+
+        if self.tracing and self.global_step >= self.trace_steps[1]:
+            self._stop_trace()
+        self.global_step += 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        epoch_steps = self.step_times[self.epoch_first_step:]
+        summary = self._summarize(epoch_steps)
+        summary['epoch'] = epoch
+        self.epochs.append(summary)
+
+        print(f"  step time p50/p95/p99: {summary.get('p50_ms', 0):.2f}/{summary.get('p95_ms', 0):.2f}/"
+              f"{summary.get('p99_ms', 0):.2f} ms, {summary['samples_per_sec']:,.0f} samples/sec")
+
+        if self.logger is not None:
+            for key in ('p50_ms', 'p95_ms', 'p99_ms', 'samples_per_sec', 'data_wait_fraction'):
+                if key in summary:
+                    self.logger.log_metric(f"step_{key}", summary[key], step=epoch)
+
+    def on_train_end(self, logs=None):
+        if self.tracing:
+            self._stop_trace()
+
+        report = self._summarize(self.step_times)
+        report['host_gap'] = latency_summary(self.host_gaps)
+        report['input_seconds_per_batch'] = self.input_seconds_per_batch
+        report['compute_seconds_per_batch'] = self.compute_seconds_per_batch
+        report['trace_steps'] = list(self.trace_steps) if self.trace_steps else None
+        report['trace_dir'] = self.trace_dir if self.trace_steps else None
+        report['epochs'] = self.epochs
+
+        with open(self.output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        bound = report.get('bound', 'unknown')
+        print(f"Step profile: {report['steps']} steps, p50 {report.get('p50_ms', 0):.2f} ms, "
+              f"p99 {report.get('p99_ms', 0):.2f} ms, {report['samples_per_sec']:,.0f} samples/sec, "
+              f"{bound}-bound. Written to {self.output_path}")
+
+        if self.logger is not None:
+            for key in ('mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'samples_per_sec',
+                        'data_wait_fraction', 'compute_fraction'):
+                if key in report:
+                    self.logger.log_metric(f"profile_step_{key}", report[key])
+            self.logger.set_tag("profile_bound", bound)
+            self.logger.log_artifact(self.output_path)
+
+    def _summarize(self, step_times):
+        total = sum(step_times)
+        summary = {
+            'steps': len(step_times),
+            'total_step_seconds': total,
+            'samples_per_sec': len(step_times) * self.batch_size / total if total > 0 else 0.0,
+        }
+        summary.update(latency_summary(step_times))
+
+        if self.compute_seconds_per_batch is not None and step_times:
+            # Time beyond the input-free compute time is spent stalled on data
+            data_wait = float(np.sum(np.maximum(np.asarray(step_times) - self.compute_seconds_per_batch, 0.0)))
+            summary['data_wait_seconds'] = data_wait
+            summary['compute_seconds'] = total - data_wait
+            summary['data_wait_fraction'] = data_wait / total if total > 0 else 0.0
+            summary['compute_fraction'] = 1.0 - summary['data_wait_fraction']
+            summary['bound'] = 'input' if summary['data_wait_fraction'] >= INPUT_BOUND_THRESHOLD else 'compute'
+        return summary
+
+    def _probe_input(self):
+        """Time the input pipeline alone, excluding the first batch's startup cost."""
+        iterator = iter(self.input_dataset)
+        if next(iterator, None) is None:
+            return None
+        count = 0
+        start = time.perf_counter()
+        for _ in range(self.probe_batches):
+            try:
+                next(iterator)
+            except StopIteration:
+                break
+            count += 1
+        elapsed = time.perf_counter() - start
+        return elapsed / count if count else None
+
+    def _probe_compute(self):
+        """Time the forward and backward pass on one batch held in memory.
+
+        Gradients are computed but not applied, and the batch normalization
+        statistics updated by the forward pass are restored afterwards, so
+        training is unaffected.
+        """
+        batch = next(iter(self.input_dataset.take(1)), None)
+        if batch is None:
+            return None
+        x, y = batch[0], batch[1]
+        model = self.model
+        loss_fn = tf.keras.losses.get(model.loss)
+
+        @tf.function
+        def step():
+            with tf.GradientTape() as tape:
+                y_pred = model(x, training=True)
+                loss = tf.reduce_mean(loss_fn(tf.reshape(tf.cast(y, y_pred.dtype), tf.shape(y_pred)), y_pred))
+            return tape.gradient(loss, model.trainable_variables)
+
+        saved = [variable.numpy() for variable in model.non_trainable_variables]
+        # The first call traces the function
+        tf.nest.map_structure(lambda t: t.numpy(), step())
+        start = time.perf_counter()
+        for _ in range(self.probe_batches):
+            gradients = step()
+        tf.nest.map_structure(lambda t: t.numpy(), gradients)
+        elapsed = time.perf_counter() - start
+        for variable, value in zip(model.non_trainable_variables, saved):
+            variable.assign(value)
+        return elapsed / self.probe_batches
+
+    def _stop_trace(self):
+        tf.profiler.experimental.stop()
+        self.tracing = False
+        print(f"Stopped tf.profiler trace at step {self.global_step}; trace written to {self.trace_dir}")
+
+
+class ThroughputCallback(tf.keras.callbacks.Callback):
+    """Report training throughput in samples/sec for every epoch."""
+
+    def __init__(self, batch_size):
+        super().__init__()
+        self.batch_size = batch_size
+        self.samples_per_sec = []
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.epoch_start_time = time.time()
+        self.steps = 0
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.steps += 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        elapsed = time.time() - self.epoch_start_time
+        # The final batch of an epoch may be partial, so this is exact to within one batch
+        throughput = self.steps * self.batch_size / elapsed if elapsed > 0 else 0.0
+        self.samples_per_sec.append(throughput)
+        print(f"  throughput: {throughput:,.0f} samples/sec")
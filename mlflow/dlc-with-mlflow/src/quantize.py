@@ -0,0 +1,197 @@
+"""
+Quantized TFLite/ONNX export and CPU accuracy-vs-latency benchmark.
+
+Converts the SavedModel written by train.py into smaller CPU artifacts and
+compares each one against the float32 Keras model on the test set: MAE and its
+delta from the Keras model, single-row latency, batched throughput and size on
+disk. The fastest artifact whose MAE delta stays within the tolerance is
+reported as the recommended one.
+
+Formats:
+    tflite-dynamic  TFLite with dynamic-range (int8 weight) quantization
+    tflite-int8     TFLite with full int8 quantization, calibrated on a sample
+                    of the training features; inputs and outputs stay float32
+    onnx-dynamic    ONNX with dynamic int8 quantization (needs tf2onnx and
+                    onnxruntime)
+"""
+
+import csv
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from export import path_size
+
+FORMATS = ('tflite-dynamic', 'tflite-int8', 'onnx-dynamic')
+
+
+def parse_formats(value):
+    """Parse a comma-separated list of formats such as "tflite-dynamic,onnx-dynamic"."""
+    formats = [f.strip() for f in value.split(',') if f.strip()] if value else []
+    unknown = [f for f in formats if f not in FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown quantization format(s) {unknown}; choose from {list(FORMATS)}")
+    return formats
+
+
+def convert_tflite(saved_model_path, output_path, calibration=None):
+    """Write a dynamic-range TFLite model, or a full int8 one if calibration data is given."""
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_path)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if calibration is not None:
+        def representative_dataset():
+            for row in calibration:
+                yield [row.reshape(1, -1).astype(np.float32)]
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+
+
+def convert_onnx(saved_model_path, output_path):
+    """Write a dynamically int8-quantized ONNX model."""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    float_path = output_path.replace('.onnx', '-float32.onnx')
+    subprocess.run([sys.executable, '-m', 'tf2onnx.convert', '--saved-model', saved_model_path,
+                    '--output', float_path, '--opset', '13'],
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    quantize_dynamic(float_path, output_path, weight_type=QuantType.QInt8)
+    os.remove(float_path)
+
+
+class TFLitePredictor:
+    def __init__(self, path):
+        self.interpreter = tf.lite.Interpreter(model_path=path)
+        self.input_index = self.interpreter.get_input_details()[0]['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.batch_size = None
+
+    def __call__(self, X):
+        # Resizing reallocates the tensors, so only do it when the batch changes
+        if X.shape[0] != self.batch_size:
+            self.interpreter.resize_tensor_input(self.input_index, X.shape)
+            self.interpreter.allocate_tensors()
+            self.batch_size = X.shape[0]
+        self.interpreter.set_tensor(self.input_index, X)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index).reshape(-1)
+
+
+class ONNXPredictor:
+    def __init__(self, path):
+        import onnxruntime as ort
+
+        self.session = ort.InferenceSession(path, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, X):
+        return self.session.run(None, {self.input_name: X})[0].reshape(-1)
+
+
+def _median_seconds(fn, X, repeats):
+    fn(X)  # warm-up
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        times.append(time.perf_counter() - start)
+    return float(np.median(times))
+
+
+def benchmark(name, predict, X_eval, y_eval, size, baseline_mae=None, batch_size=1024,
+              single_repeats=200, batch_repeats=20):
+    """Accuracy, latency and size of one predictor on the evaluation set."""
+    predictions = np.concatenate([predict(X_eval[i:i + batch_size])
+                                  for i in range(0, len(X_eval), batch_size)])
+    mae = float(np.mean(np.abs(y_eval - predictions)))
+
+    batch = X_eval[:batch_size]
+    single_seconds = _median_seconds(predict, X_eval[:1], single_repeats)
+    batch_seconds = _median_seconds(predict, batch, batch_repeats)
+    return {
+        'format': name,
+        'mae': mae,
+        'mae_delta': mae - baseline_mae if baseline_mae is not None else 0.0,
+        'single_row_ms': single_seconds * 1000.0,
+        'batch_rows': len(batch),
+        'batch_ms': batch_seconds * 1000.0,
+        'batch_rows_per_sec': len(batch) / batch_seconds if batch_seconds > 0 else 0.0,
+        'bytes': size,
+    }
+
+
+def export_and_benchmark(model, keras_path, saved_model_path, output_dir, formats,
+                         X_calibration, X_eval, y_eval, tolerance=0.05):
+    """Convert the requested formats and benchmark them against the Keras model.
+
+    Returns (rows, recommended) where rows is the comparison table, starting
+    with the float32 Keras baseline, and recommended is the format with the
+    lowest single-row latency whose MAE delta is within tolerance. The
+    baseline is recommended when no artifact qualifies.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    X_eval = np.ascontiguousarray(X_eval, dtype=np.float32)
+    y_eval = np.asarray(y_eval, dtype=np.float32).reshape(-1)
+
+    def keras_predict(X):
+        return np.asarray(model(X, training=False)).reshape(-1)
+
+    baseline = benchmark('keras-float32', keras_predict, X_eval, y_eval, path_size(keras_path))
+    rows = [baseline]
+
+    for name in formats:
+        extension = '.onnx' if name.startswith('onnx') else '.tflite'
+        path = os.path.join(output_dir, f'abalone_model-{name}{extension}')
+        start = time.perf_counter()
+        try:
+            if name == 'tflite-dynamic':
+                convert_tflite(saved_model_path, path)
+                predictor = TFLitePredictor(path)
+            elif name == 'tflite-int8':
+                convert_tflite(saved_model_path, path, calibration=np.asarray(X_calibration, dtype=np.float32))
+                predictor = TFLitePredictor(path)
+            else:
+                convert_onnx(saved_model_path, path)
+                predictor = ONNXPredictor(path)
+        except ImportError as e:
+            print(f"Skipping {name}: {e}. Install tf2onnx and onnxruntime to enable it.")
+            continue
+        except (subprocess.CalledProcessError, RuntimeError, ValueError) as e:
+            print(f"Skipping {name}: conversion failed: {e}")
+            continue
+        convert_seconds = time.perf_counter() - start
+
+        row = benchmark(name, predictor, X_eval, y_eval, path_size(path), baseline_mae=baseline['mae'])
+        row['convert_seconds'] = convert_seconds
+        row['path'] = path
+        rows.append(row)
+
+    # Only an increase in error counts against an artifact
+    within = [row for row in rows if row['mae_delta'] <= tolerance] or [baseline]
+    recommended = min(within, key=lambda row: row['single_row_ms'])['format']
+    return rows, recommended
+
+
+def format_table(rows):
+    """Render the comparison table as fixed-width text."""
+    lines = [f"{'format':<16} {'MAE':>8} {'delta':>8} {'1-row ms':>9} {'batch ms':>9} "
+             f"{'rows/s':>11} {'KiB':>9}"]
+    for row in rows:
+        lines.append(f"{row['format']:<16} {row['mae']:>8.4f} {row['mae_delta']:>+8.4f} "
+                     f"{row['single_row_ms']:>9.3f} {row['batch_ms']:>9.3f} "
+                     f"{row['batch_rows_per_sec']:>11,.0f} {row['bytes'] / 1024:>9,.1f}")
+    return '\n'.join(lines)
+
+
+def write_csv(rows, path):
+    fields = ['format', 'mae', 'mae_delta', 'single_row_ms', 'batch_rows', 'batch_ms',
+              'batch_rows_per_sec', 'bytes', 'convert_seconds', 'path']
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
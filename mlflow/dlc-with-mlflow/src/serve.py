@@ -0,0 +1,359 @@
+"""
+Micro-batching HTTP inference server for the abalone model.
+
+Loads preprocessor.pkl and abalone_model.keras once from the model directory
+written by train.py. Concurrent requests are queued and coalesced into one
+micro-batch until either --max-batch-size rows are waiting or the oldest
+request has waited --max-latency-ms; each batch is preprocessed with a single
+vectorized transform and scored with a single model call. With --no-batching
+every request is scored on its own with model.predict, as a baseline.
+
+Endpoints:
+    POST /invocations  {"instances": [{"Sex": "M", "Length": 0.455, ...}, ...]}
+                       or {"instances": [["M", 0.455, ...], ...]} in column order
+    GET  /ping         health check
+    GET  /metrics      request latency p50/p95/p99, batch-size histogram
+
+Example:
+    python src/serve.py --model-dir /opt/ml/model --port 8080 --max-batch-size 64 --max-latency-ms 5
+"""
+
+import argparse
+import collections
+import json
+import math
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import joblib
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+from latency import latency_summary
+
+FEATURE_COLUMNS = ["Sex", "Length", "Diameter", "Height", "Whole_weight",
+                   "Shucked_weight", "Viscera_weight", "Shell_weight"]
+CATEGORICAL_COLUMNS = ["Sex"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Micro-batching inference server for the abalone regressor")
+    parser.add_argument('--model-dir', type=str, default=os.environ.get('SM_MODEL_DIR', '/opt/ml/model'),
+                        help="Directory containing abalone_model.keras and preprocessor.pkl")
+    parser.add_argument('--host', type=str, default='127.0.0.1', help="Address to listen on")
+    parser.add_argument('--port', type=int, default=8080, help="Port to listen on")
+    parser.add_argument('--max-batch-size', type=int, default=64, help="Maximum rows per micro-batch")
+    parser.add_argument('--max-latency-ms', type=float, default=5.0,
+                        help="Longest time the oldest queued request waits for a batch to fill")
+    parser.add_argument('--no-batching', action='store_true',
+                        help="Score every request separately with model.predict (baseline)")
+    parser.add_argument('--window', type=int, default=10000,
+                        help="Number of most recent requests used for latency percentiles")
+    return parser.parse_args()
+
+
+def rows_to_frame(rows):
+    """Build a DataFrame in training column order from dicts or lists."""
+    if rows and isinstance(rows[0], dict):
+        return pd.DataFrame.from_records(rows, columns=FEATURE_COLUMNS)
+    return pd.DataFrame(rows, columns=FEATURE_COLUMNS)
+
+
+def known_categories(preprocessor):
+    """Categories each encoded column was fitted on, keyed by column name."""
+    categories = {}
+    for _, transformer, columns in getattr(preprocessor, 'transformers_', []):
+        if hasattr(transformer, 'categories_'):
+            for column, values in zip(columns, transformer.categories_):
+                categories[column] = set(values.tolist())
+    return categories
+
+
+def validate_rows(rows, categories=None):
+    """Reject malformed rows up front so one bad request cannot fail a whole batch.
+
+    Numeric features must be finite numbers, and categorical features must be
+    one of the categories in categories (the encoder rejects unseen ones).
+    """
+    if not isinstance(rows, list) or not rows:
+        raise ValueError("Expected a non-empty list of instances")
+    categories = categories or {}
+    for row in rows:
+        if isinstance(row, dict):
+            missing = [column for column in FEATURE_COLUMNS if column not in row]
+            if missing:
+                raise ValueError(f"Instance is missing {missing}")
+            values = [row[column] for column in FEATURE_COLUMNS]
+        elif not isinstance(row, list) or len(row) != len(FEATURE_COLUMNS):
+            raise ValueError(f"Instances must be objects or lists of {len(FEATURE_COLUMNS)} values")
+        else:
+            values = row
+        for column, value in zip(FEATURE_COLUMNS, values):
+            if column in CATEGORICAL_COLUMNS:
+                if column in categories and value not in categories[column]:
+                    raise ValueError(f"Unknown {column} {value!r}; expected one of {sorted(categories[column])}")
+            elif isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise ValueError(f"{column} must be a finite number, got {value!r}")
+
+
+def load_model(model_dir):
+    """Load the preprocessor and Keras model written by train.py."""
+    preprocessor = joblib.load(os.path.join(model_dir, 'preprocessor.pkl'))
+    model = tf.keras.models.load_model(os.path.join(model_dir, 'abalone_model.keras'))
+    return preprocessor, model
+
+
+def make_batch_predict(preprocessor, model):
+    """Score a list of rows with one transform and one direct model call."""
+    def predict(rows):
+        features = np.asarray(preprocessor.transform(rows_to_frame(rows)), dtype=np.float32)
+        return np.asarray(model(features, training=False)).reshape(-1)
+    return predict
+
+
+def make_single_predict(preprocessor, model):
+    """Score one request with model.predict, the way a naive handler would."""
+    def predict(rows):
+        features = preprocessor.transform(rows_to_frame(rows))
+        return model.predict(features, verbose=0).reshape(-1)
+    return predict
+
+
+class ServerStats:
+    """Thread-safe request latency window and batch-size histogram."""
+
+    def __init__(self, window=10000):
+        self.lock = threading.Lock()
+        self.latencies = collections.deque(maxlen=window)
+        self.batch_sizes = collections.Counter()
+        self.batch_seconds = 0.0
+        self.batched_rows = 0
+        self.requests = 0
+        self.rows = 0
+        self.errors = 0
+        self.started = time.monotonic()
+
+    def record_request(self, seconds, rows, ok=True):
+        with self.lock:
+            self.latencies.append(seconds)
+            self.requests += 1
+            self.rows += rows
+            if not ok:
+                self.errors += 1
+
+    def record_batch(self, rows, seconds):
+        with self.lock:
+            # Power-of-two buckets keyed by their upper bound
+            self.batch_sizes[2 ** math.ceil(math.log2(max(rows, 1)))] += 1
+            self.batch_seconds += seconds
+            self.batched_rows += rows
+
+    def snapshot(self):
+        with self.lock:
+            batches = sum(self.batch_sizes.values())
+            return {
+                'requests': self.requests,
+                'rows': self.rows,
+                'errors': self.errors,
+                'uptime_seconds': time.monotonic() - self.started,
+                'latency': latency_summary(list(self.latencies)),
+                'batches': batches,
+                'mean_batch_seconds': self.batch_seconds / batches if batches else 0.0,
+                'mean_batch_size': self.batched_rows / batches if batches else 0.0,
+                'batch_size_histogram': {f"<={bucket}": count for bucket, count in sorted(self.batch_sizes.items())},
+            }
+
+
+class _Pending:
+    __slots__ = ('rows', 'enqueued', 'done', 'result', 'error')
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Coalesce concurrent requests into batches within a latency budget."""
+
+    def __init__(self, predict_fn, max_batch_size=64, max_latency_ms=5.0, stats=None):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency_ms / 1000.0
+        self.stats = stats
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self.thread.start()
+
+    def predict(self, rows):
+        """Queue rows for the next batch and block until they are scored."""
+        pending = _Pending(rows)
+        self.queue.put(pending)
+        pending.done.wait()
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        size = len(first.rows)
+        deadline = first.enqueued + self.max_latency
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # Past the deadline, still take whatever is already queued
+                pending = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is None:
+                self.queue.put(None)
+                break
+            batch.append(pending)
+            size += len(pending.rows)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+            batch = self._collect(first)
+            rows = [row for pending in batch for row in pending.rows]
+
+            start = time.perf_counter()
+            try:
+                predictions = self.predict_fn(rows)
+                offset = 0
+                for pending in batch:
+                    pending.result = predictions[offset:offset + len(pending.rows)]
+                    offset += len(pending.rows)
+            except Exception as e:
+                if len(batch) == 1:
+                    first.error = e
+                else:
+                    # Something validation did not catch; score each request
+                    # on its own so only the bad one fails
+                    for pending in batch:
+                        try:
+                            pending.result = self.predict_fn(pending.rows)
+                        except Exception as error:
+                            pending.error = error
+            if self.stats is not None:
+                self.stats.record_batch(len(rows), time.perf_counter() - start)
+            for pending in batch:
+                pending.done.set()
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps client connections open between requests
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with Nagle's algorithm the
+    # body would wait for the client's delayed ACK (~40 ms) on a kept-alive
+    # connection
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        if self.path == '/ping':
+            self._respond(200, {'status': 'ok'})
+        elif self.path == '/metrics':
+            self._respond(200, self.server.stats.snapshot())
+        else:
+            self._respond(404, {'error': f"Unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/invocations':
+            self._respond(404, {'error': f"Unknown path {self.path}"})
+            return
+        start = time.perf_counter()
+        num_rows = 0
+        try:
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            payload = json.loads(body)
+            rows = payload['instances'] if isinstance(payload, dict) else payload
+            validate_rows(rows, self.server.categories)
+            num_rows = len(rows)
+            predictions = self.server.predict(rows)
+        except (ValueError, KeyError, TypeError) as e:
+            self.server.stats.record_request(time.perf_counter() - start, num_rows, ok=False)
+            self._respond(400, {'error': str(e)})
+            return
+        except Exception as e:
+            self.server.stats.record_request(time.perf_counter() - start, num_rows, ok=False)
+            self._respond(500, {'error': str(e)})
+            return
+        self.server.stats.record_request(time.perf_counter() - start, num_rows)
+        self._respond(200, {'predictions': [float(p) for p in predictions]})
+
+    def _respond(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Per-request access logs would dominate the cost of small requests
+        pass
+
+
+class InferenceServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, predict, stats, categories=None):
+        super().__init__(address, InferenceHandler)
+        self.predict = predict
+        self.stats = stats
+        self.categories = categories or {}
+
+
+def main():
+    args = parse_args()
+
+    print(f"Loading model and preprocessor from {args.model_dir}...")
+    preprocessor, model = load_model(args.model_dir)
+    stats = ServerStats(window=args.window)
+
+    if args.no_batching:
+        predict_fn = make_single_predict(preprocessor, model)
+    else:
+        predict_fn = make_batch_predict(preprocessor, model)
+
+    # Run the model once before accepting traffic so the first request does
+    # not pay for tracing
+    predict_fn([dict(zip(FEATURE_COLUMNS, ['M', 0.5, 0.4, 0.1, 0.5, 0.2, 0.1, 0.15]))])
+
+    if args.no_batching:
+        predict = predict_fn
+        batcher = None
+        mode = "per-request model.predict"
+    else:
+        batcher = MicroBatcher(predict_fn, args.max_batch_size, args.max_latency_ms, stats=stats)
+        predict = batcher.predict
+        mode = f"micro-batching (max {args.max_batch_size} rows, {args.max_latency_ms:g} ms)"
+
+    server = InferenceServer((args.host, args.port), predict, stats, known_categories(preprocessor))
+    print(f"Serving on http://{args.host}:{args.port} with {mode}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if batcher is not None:
+            batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Streaming input pipeline for the abalone regressor.
+
+Fits the StandardScaler/OneHotEncoder statistics in a single chunked pass over
+the training channel and feeds model.fit from a prefetching, parallel-mapped
+tf.data pipeline. Memory is bounded by the chunk size and shuffle buffer, not
+by the dataset size.
+"""
+
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+SHARD_PATTERNS = ("*.data", "*.csv")
+
+# Rows are assigned to a split by hashing their content into 100 buckets, so
+# the assignment is identical on every pass without holding any index in memory
+HASH_BUCKETS = 100
+
+
+def list_shards(data_path):
+    """Return the sorted CSV shards found in the training channel."""
+    shards = set()
+    for pattern in SHARD_PATTERNS:
+        shards.update(glob.glob(os.path.join(data_path, pattern)))
+    return sorted(shards)
+
+
+def iter_chunks(shards, column_names, chunk_size):
+    """Yield DataFrame chunks of at most chunk_size rows across all shards."""
+    for shard in shards:
+        for chunk in pd.read_csv(shard, names=column_names, chunksize=chunk_size):
+            yield chunk
+
+
+def fit_preprocessor(shards, column_names, numerical_features, categorical_features, target, chunk_size):
+    """Fit the ColumnTransformer statistics in one chunked pass over the shards.
+
+    Returns the fitted preprocessor, the total row count and the first chunk,
+    which is kept as a bounded sample for visualizations and dataset logging.
+    """
+    scaler = StandardScaler()
+    categories = [set() for _ in categorical_features]
+    sample_df = None
+    num_rows = 0
+
+    for chunk in iter_chunks(shards, column_names, chunk_size):
+        if sample_df is None:
+            sample_df = chunk
+        scaler.partial_fit(chunk[numerical_features])
+        for seen, column in zip(categories, categorical_features):
+            seen.update(chunk[column].dropna().astype(str).unique())
+        num_rows += len(chunk)
+
+    if sample_df is None:
+        raise ValueError(f"No rows found in training shards: {shards}")
+
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), numerical_features),
+            ('cat', OneHotEncoder(categories=[sorted(seen) for seen in categories]), categorical_features)
+        ])
+
+    # Fit on the first chunk to build the column layout, then install the
+    # full-pass scaler statistics so the result matches a fit on all rows
+    preprocessor.fit(sample_df.drop(columns=[target]))
+    fitted_scaler = preprocessor.named_transformers_['num']
+    for attr in ('mean_', 'var_', 'scale_', 'n_samples_seen_'):
+        setattr(fitted_scaler, attr, getattr(scaler, attr))
+
+    return preprocessor, num_rows, sample_df
+
+
+def num_output_features(preprocessor):
+    """Return the width of the preprocessed feature matrix."""
+    encoder = preprocessor.named_transformers_['cat']
+    return len(preprocessor.named_transformers_['num'].mean_) + sum(len(c) for c in encoder.categories_)
+
+
+def build_dataset(shards, column_names, numerical_features, categorical_features, target,
+                  preprocessor, split, batch_size, shuffle_buffer=10000, parse_batch_size=4096,
+                  test_size=0.2, validation_size=0.2, seed=42):
+    """Build a tf.data pipeline yielding preprocessed (features, target) batches.
+
+    split is one of "train", "validation" or "test". test_size is the fraction
+    of all rows held out for testing and validation_size the fraction of the
+    remaining rows used for validation, mirroring train_test_split followed by
+    model.fit(validation_split=...).
+    """
+    scaler = preprocessor.named_transformers_['num']
+    encoder = preprocessor.named_transformers_['cat']
+    mean = tf.constant(scaler.mean_, dtype=tf.float32)
+    scale = tf.constant(scaler.scale_, dtype=tf.float32)
+    category_tables = [tf.constant(np.asarray(c).astype(str)) for c in encoder.categories_]
+
+    test_buckets = int(round(test_size * HASH_BUCKETS))
+    validation_buckets = test_buckets + int(round(validation_size * (HASH_BUCKETS - test_buckets)))
+    bucket_range = {
+        'test': (0, test_buckets),
+        'validation': (test_buckets, validation_buckets),
+        'train': (validation_buckets, HASH_BUCKETS),
+    }[split]
+
+    record_defaults = [
+        tf.constant([], dtype=tf.string) if name in categorical_features else tf.constant([], dtype=tf.float32)
+        for name in column_names
+    ]
+
+    def parse_and_transform(lines):
+        fields = dict(zip(column_names, tf.io.decode_csv(lines, record_defaults=record_defaults)))
+        bucket = tf.strings.to_hash_bucket_strong(lines, HASH_BUCKETS, key=[seed, 0])
+        keep = tf.logical_and(bucket >= bucket_range[0], bucket < bucket_range[1])
+
+        numeric = tf.stack([fields[name] for name in numerical_features], axis=1)
+        columns = [(numeric - mean) / scale]
+        for name, table in zip(categorical_features, category_tables):
+            columns.append(tf.cast(tf.equal(tf.expand_dims(fields[name], 1), table), tf.float32))
+        features = tf.concat(columns, axis=1)
+
+        return tf.boolean_mask(features, keep), tf.boolean_mask(fields[target], keep)
+
+    files = tf.data.Dataset.from_tensor_slices(shards)
+    if split == 'train':
+        files = files.shuffle(len(shards), seed=seed, reshuffle_each_iteration=True)
+
+    lines = files.interleave(
+        lambda path: tf.data.TextLineDataset(path).filter(lambda line: tf.strings.length(line) > 0),
+        cycle_length=min(len(shards), 8),
+        num_parallel_calls=tf.data.AUTOTUNE,
+        deterministic=split != 'train')
+
+    dataset = (lines
+               .batch(parse_batch_size)
+               .map(parse_and_transform, num_parallel_calls=tf.data.AUTOTUNE, deterministic=split != 'train')
+               .unbatch())
+    if split == 'train':
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def evaluate_streaming(model, dataset, max_points=10000):
+    """Stream predictions over a dataset.
+
+    Returns exact MSE/RMSE/MAE/R² accumulated batch by batch, plus at most
+    max_points (features, actual, predicted) rows for plots and signatures.
+    """
+    count = 0
+    sum_sq_err = 0.0
+    sum_abs_err = 0.0
+    sum_y = 0.0
+    sum_y_sq = 0.0
+    x_sample, y_sample, pred_sample = [], [], []
+    kept = 0
+
+    for x_batch, y_batch in dataset:
+        y_true = y_batch.numpy().astype(np.float64)
+        y_hat = np.asarray(model.predict_on_batch(x_batch)).reshape(-1).astype(np.float64)
+        errors = y_true - y_hat
+
+        count += len(y_true)
+        sum_sq_err += float(np.sum(errors ** 2))
+        sum_abs_err += float(np.sum(np.abs(errors)))
+        sum_y += float(np.sum(y_true))
+        sum_y_sq += float(np.sum(y_true ** 2))
+
+        if kept < max_points:
+            take = min(max_points - kept, len(y_true))
+            x_sample.append(x_batch.numpy()[:take])
+            y_sample.append(y_true[:take].astype(np.float32))
+            pred_sample.append(y_hat[:take].astype(np.float32))
+            kept += take
+
+    if count == 0:
+        raise ValueError("Evaluation dataset is empty")
+
+    mse = sum_sq_err / count
+    total_ss = sum_y_sq - sum_y ** 2 / count
+    metrics = {
+        'count': count,
+        'mse': mse,
+        'rmse': float(np.sqrt(mse)),
+        'mae': sum_abs_err / count,
+        'r2': 1 - sum_sq_err / total_ss if total_ss > 0 else 0.0,
+    }
+    return metrics, np.concatenate(x_sample), np.concatenate(y_sample), np.concatenate(pred_sample).reshape(-1, 1)
+
@@ -0,0 +1,382 @@
+"""
+Parallel hyperparameter sweep for train.py.
+
+Runs trials from a grid, random or successive-halving search over a search
+space, each as a separate train.py process pinned to its own set of CPU cores
+and thread budget. Trials are logged as nested MLflow runs under one parent
+run, and losing trials are stopped early: successive halving only promotes
+the best trials to larger epoch budgets, and the median stopping rule
+terminates running trials whose validation loss falls behind.
+
+Example:
+    python src/sweep.py --space space.json --strategy random --num-trials 16 --threads-per-trial 2
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import time
+
+TRAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'train.py')
+
+DEFAULT_SPACE = {
+    'learning_rate': [0.0003, 0.001, 0.003],
+    'batch_size': [32, 64, 128],
+    'dropout': [0.1, 0.2, 0.3],
+    'hidden_layers': ["64-32-16", "128-64-32"],
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep for the abalone regressor")
+    parser.add_argument('--space', type=str, default=None,
+                        help="Search space as a JSON file or inline JSON (default: built-in space)")
+    parser.add_argument('--strategy', choices=['grid', 'random', 'halving'], default='random')
+    parser.add_argument('--num-trials', type=int, default=8, help="Trials to sample for random and halving search")
+    parser.add_argument('--epochs', type=int, default=100, help="Maximum epochs per trial")
+    parser.add_argument('--min-epochs', type=int, default=5, help="Epoch budget of the first successive-halving rung")
+    parser.add_argument('--eta', type=int, default=3, help="Successive-halving reduction factor")
+    parser.add_argument('--threads-per-trial', type=int, default=2, help="CPU cores and TF threads per trial")
+    parser.add_argument('--max-parallel', type=int, default=None,
+                        help="Concurrent trials (default: available cores / threads per trial)")
+    parser.add_argument('--median-stopping', action='store_true',
+                        help="Stop trials whose best validation loss is worse than the median of other trials")
+    parser.add_argument('--grace-epochs', type=int, default=5, help="Epochs before the median stopping rule applies")
+    parser.add_argument('--output-dir', type=str, default=os.path.join(os.environ.get('SM_MODEL_DIR', '/opt/ml/model'), 'sweep'))
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-mlflow', action='store_true', help="Do not create a parent MLflow run")
+    # Anything after "--" is passed through to every train.py trial
+    argv = sys.argv[1:]
+    passthrough = []
+    if '--' in argv:
+        split = argv.index('--')
+        argv, passthrough = argv[:split], argv[split + 1:]
+    args = parser.parse_args(argv)
+    args.train_args = passthrough
+    return args
+
+
+def load_space(spec):
+    """Load a search space from a JSON file path or an inline JSON string."""
+    if spec is None:
+        return DEFAULT_SPACE
+    if os.path.exists(spec):
+        with open(spec) as f:
+            return json.load(f)
+    return json.loads(spec)
+
+
+def grid_trials(space):
+    """Every combination of the listed values; ranges are not allowed in a grid."""
+    for name, values in space.items():
+        if not isinstance(values, list):
+            raise ValueError(f"Grid search needs a list of values for '{name}'")
+    names = sorted(space)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(space[name] for name in names))]
+
+
+def sample_value(rng, values):
+    """Sample from a list of choices or a {"min", "max", "log", "int"} range."""
+    if isinstance(values, list):
+        return rng.choice(values)
+    low, high = values['min'], values['max']
+    if values.get('log'):
+        value = math.exp(rng.uniform(math.log(low), math.log(high)))
+    else:
+        value = rng.uniform(low, high)
+    return int(round(value)) if values.get('int') else value
+
+
+def random_trials(space, num_trials, seed):
+    rng = random.Random(seed)
+    return [{name: sample_value(rng, values) for name, values in sorted(space.items())} for _ in range(num_trials)]
+
+
+def cpu_slots(threads_per_trial, max_parallel=None):
+    """Split the cores available to this process into disjoint per-trial sets."""
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    threads = max(1, min(threads_per_trial, len(cpus)))
+    num_slots = max(1, len(cpus) // threads)
+    if max_parallel:
+        num_slots = min(num_slots, max_parallel)
+    return [cpus[i * threads:(i + 1) * threads] for i in range(num_slots)]
+
+
+class Trial:
+    def __init__(self, trial_id, params, epochs, output_dir):
+        self.trial_id = trial_id
+        self.params = params
+        self.epochs = epochs
+        self.dir = os.path.join(output_dir, f'trial-{trial_id:03d}-e{epochs}')
+        self.progress_path = os.path.join(self.dir, 'progress.jsonl')
+        self.process = None
+        self.slot = None
+        self.run_id = None
+        self.val_losses = []
+        self.final = None
+        self.status = 'pending'
+        self.progress_offset = 0
+
+    @property
+    def best_val_loss(self):
+        if self.final:
+            return self.final['best_val_loss']
+        return min(self.val_losses) if self.val_losses else float('inf')
+
+    def command(self, train_args):
+        cmd = [sys.executable, TRAIN_SCRIPT,
+               '--epochs', str(self.epochs),
+               '--threads', str(len(self.slot)),
+               '--run-name', f'trial-{self.trial_id:03d}-e{self.epochs}',
+               '--register-model', 'false',
+               '--progress-file', self.progress_path]
+        for name, value in self.params.items():
+            cmd += ['--' + name.replace('_', '-'), str(value)]
+        # Trials run side by side, so each keeps checkpoints in its own
+        # directory; a shared one would be pruned and resumed across trials
+        return cmd + list(train_args) + ['--checkpoint-dir', os.path.join(self.dir, 'checkpoints')]
+
+    def start(self, slot, train_args, parent_run_id):
+        self.slot = slot
+        os.makedirs(self.dir, exist_ok=True)
+        if os.path.exists(self.progress_path):
+            os.remove(self.progress_path)
+        env = dict(os.environ,
+                   SM_MODEL_DIR=self.dir,
+                   OMP_NUM_THREADS=str(len(slot)),
+                   TF_NUM_INTRAOP_THREADS=str(len(slot)),
+                   TF_NUM_INTEROP_THREADS='1')
+        if parent_run_id:
+            env['MLFLOW_PARENT_RUN_ID'] = parent_run_id
+
+        def pin_to_slot():
+            if hasattr(os, 'sched_setaffinity'):
+                os.sched_setaffinity(0, slot)
+
+        self.log_file = open(os.path.join(self.dir, 'train.log'), 'w')
+        self.process = subprocess.Popen(self.command(train_args), env=env, stdout=self.log_file,
+                                        stderr=subprocess.STDOUT, preexec_fn=pin_to_slot)
+        self.status = 'running'
+        print(f"Started trial {self.trial_id} ({self.epochs} epochs) on cores {slot}: {self.params}")
+
+    def read_progress(self):
+        """Consume new JSON lines written by train.py since the last poll."""
+        if not os.path.exists(self.progress_path):
+            return
+        with open(self.progress_path, 'rb') as f:
+            f.seek(self.progress_offset)
+            for line in f:
+                # A line without a newline is still being written
+                if not line.endswith(b'\n'):
+                    break
+                self.progress_offset += len(line)
+                record = json.loads(line)
+                if 'run_id' in record:
+                    self.run_id = record['run_id']
+                elif 'final' in record:
+                    self.final = record['final']
+                elif 'val_loss' in record:
+                    self.val_losses.append(record['val_loss'])
+
+    def stop(self):
+        self.process.send_signal(signal.SIGTERM)
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.status = 'stopped'
+
+    def finish(self):
+        self.log_file.close()
+        self.read_progress()
+        if self.status == 'running':
+            self.status = 'completed' if self.process.returncode == 0 and self.final else 'failed'
+
+    def summary(self):
+        return {
+            'trial_id': self.trial_id,
+            'params': self.params,
+            'epochs_budget': self.epochs,
+            'status': self.status,
+            'run_id': self.run_id,
+            'epochs_run': len(self.val_losses),
+            'best_val_loss': None if math.isinf(self.best_val_loss) else self.best_val_loss,
+            'final': self.final,
+        }
+
+
+def should_stop(trial, trials, grace_epochs, min_peers=2):
+    """Median stopping rule: stop if the trial's best loss so far is worse than
+    the median of other trials' best losses at the same epoch."""
+    epoch = len(trial.val_losses)
+    if epoch < grace_epochs:
+        return False
+    peers = [min(other.val_losses[:epoch]) for other in trials
+             if other is not trial and len(other.val_losses) >= epoch]
+    if len(peers) < min_peers:
+        return False
+    return min(trial.val_losses) > statistics.median(peers)
+
+
+def run_trials(trials, slots, train_args, parent_run_id, median_stopping=False, grace_epochs=5, poll_interval=1.0):
+    """Run trials with at most one trial per CPU slot, stopping losers early."""
+    pending = list(trials)
+    running = []
+    free_slots = list(slots)
+
+    while pending or running:
+        while pending and free_slots:
+            trial = pending.pop(0)
+            trial.start(free_slots.pop(0), train_args, parent_run_id)
+            running.append(trial)
+
+        time.sleep(poll_interval)
+
+        for trial in list(running):
+            trial.read_progress()
+            if trial.process.poll() is None and median_stopping and should_stop(trial, trials, grace_epochs):
+                print(f"Stopping trial {trial.trial_id} at epoch {len(trial.val_losses)}: "
+                      f"best val_loss {min(trial.val_losses):.4f} is worse than the median")
+                trial.stop()
+            if trial.process.poll() is not None:
+                trial.finish()
+                print(f"Trial {trial.trial_id} {trial.status}: best val_loss {trial.best_val_loss:.4f}")
+                running.remove(trial)
+                free_slots.append(trial.slot)
+    return trials
+
+
+def successive_halving(configs, args, slots, parent_run_id):
+    """Run every config on a small epoch budget and promote the best 1/eta to
+    eta times the budget until one config remains or the budget is exhausted."""
+    all_trials = []
+    survivors = list(enumerate(configs))
+    epochs = min(args.min_epochs, args.epochs)
+    rung = 0
+
+    while True:
+        print(f"\nRung {rung}: {len(survivors)} trial(s) at {epochs} epochs")
+        rung_trials = [Trial(trial_id, params, epochs, args.output_dir) for trial_id, params in survivors]
+        run_trials(rung_trials, slots, args.train_args, parent_run_id, args.median_stopping, args.grace_epochs)
+        all_trials += rung_trials
+
+        if len(survivors) == 1 or epochs >= args.epochs:
+            return all_trials
+
+        ranked = sorted((t for t in rung_trials if t.status == 'completed'), key=lambda t: t.best_val_loss)
+        keep = max(1, len(survivors) // args.eta)
+        survivors = [(t.trial_id, t.params) for t in ranked[:keep]]
+        if not survivors:
+            return all_trials
+        epochs = min(epochs * args.eta, args.epochs)
+        rung += 1
+
+
+def start_parent_run(args, space):
+    """Create the parent MLflow run the trials nest under, or return None."""
+    if args.no_mlflow:
+        return None
+    import mlflow
+    from tracking import setup_mlflow
+
+    if not setup_mlflow():
+        return None
+    run = mlflow.start_run(run_name=f"sweep-{args.strategy}-{int(time.time())}")
+    mlflow.log_params({
+        'sweep_strategy': args.strategy,
+        'sweep_num_trials': args.num_trials,
+        'sweep_threads_per_trial': args.threads_per_trial,
+        'sweep_median_stopping': args.median_stopping,
+    })
+    mlflow.log_dict(space, 'search_space.json')
+    return run.info.run_id
+
+
+def finish_parent_run(parent_run_id, trials, best, results_path):
+    import mlflow
+    from mlflow.tracking import MlflowClient
+
+    client = MlflowClient()
+    for trial in trials:
+        # Trials stopped early never end their own run
+        if trial.run_id and trial.status in ('stopped', 'failed'):
+            client.set_terminated(trial.run_id, status='KILLED' if trial.status == 'stopped' else 'FAILED')
+
+    if best is not None:
+        mlflow.log_params({f'best_{name}': value for name, value in best.params.items()})
+        # MLflow rejects None and non-numeric values
+        mlflow.log_metrics({f'best_{name}': value for name, value in best.final.items()
+                            if isinstance(value, (int, float)) and math.isfinite(value)})
+        if best.run_id:
+            mlflow.set_tag('best_trial_run_id', best.run_id)
+    mlflow.log_metrics({
+        'trials_completed': sum(t.status == 'completed' for t in trials),
+        'trials_stopped': sum(t.status == 'stopped' for t in trials),
+        'trials_failed': sum(t.status == 'failed' for t in trials),
+    })
+    mlflow.log_artifact(results_path)
+    mlflow.end_run()
+
+
+def main():
+    args = parse_args()
+    space = load_space(args.space)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    if args.strategy == 'grid':
+        configs = grid_trials(space)
+    else:
+        configs = random_trials(space, args.num_trials, args.seed)
+
+    slots = cpu_slots(args.threads_per_trial, args.max_parallel)
+    print(f"Sweep: {len(configs)} config(s), strategy={args.strategy}, "
+          f"{len(slots)} concurrent trial(s) x {len(slots[0])} core(s)")
+
+    parent_run_id = start_parent_run(args, space)
+    start_time = time.time()
+
+    if args.strategy == 'halving':
+        trials = successive_halving(configs, args, slots, parent_run_id)
+    else:
+        trials = [Trial(i, params, args.epochs, args.output_dir) for i, params in enumerate(configs)]
+        run_trials(trials, slots, args.train_args, parent_run_id, args.median_stopping, args.grace_epochs)
+
+    sweep_time = time.time() - start_time
+    completed = [t for t in trials if t.status == 'completed']
+    best = min(completed, key=lambda t: t.best_val_loss) if completed else None
+
+    results_path = os.path.join(args.output_dir, 'sweep_results.json')
+    with open(results_path, 'w') as f:
+        json.dump({
+            'strategy': args.strategy,
+            'space': space,
+            'sweep_time_seconds': sweep_time,
+            'best_trial': best.summary() if best else None,
+            'trials': [t.summary() for t in trials],
+        }, f, indent=2)
+
+    print(f"\nSweep finished in {sweep_time:.1f}s - results written to {results_path}")
+    for trial in sorted(trials, key=lambda t: t.best_val_loss):
+        print(f"  trial {trial.trial_id:3d} [{trial.status:9s}] e{trial.epochs:<4d} "
+              f"best val_loss={trial.best_val_loss:.4f} {trial.params}")
+    if best:
+        print(f"Best trial: {best.trial_id} {best.params} "
+              f"(val_loss={best.best_val_loss:.4f}, test_mae={best.final['test_mae']:.4f})")
+
+    if parent_run_id:
+        finish_parent_run(parent_run_id, trials, best, results_path)
+
+
+if __name__ == "__main__":
+    main()
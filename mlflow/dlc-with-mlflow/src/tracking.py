@@ -0,0 +1,75 @@
+"""
+MLflow tracking server connection shared by train.py and sweep.py.
+
+boto3 and mlflow are imported only when a connection is made. With
+start_tracking_resolution the imports and the DescribeMlflowTrackingServer call
+run on a background thread, so they overlap with data loading instead of
+adding to container start-up time.
+"""
+
+import concurrent.futures
+import time
+
+# Update with the name of your SageMaker MLflow tracking server
+TRACKING_SERVER_NAME = "Mlflow3"
+EXPERIMENT_NAME = "abalone-tensorflow-experiment"
+
+
+def resolve_tracking_server():
+    """Import boto3/mlflow and look up the tracking server, recording timings."""
+    start = time.perf_counter()
+    import boto3
+    import mlflow  # noqa: F401 - imported here so the cost overlaps with data loading
+    import_seconds = time.perf_counter() - start
+
+    # Get the MLflow tracking server URL from the ARN
+    start = time.perf_counter()
+    sagemaker_client = boto3.client('sagemaker', region_name='us-east-1')
+    response = sagemaker_client.describe_mlflow_tracking_server(
+        TrackingServerName=TRACKING_SERVER_NAME
+    )
+    return {
+        'tracking_server_url': response['TrackingServerArn'],
+        'import_seconds': import_seconds,
+        'resolve_seconds': time.perf_counter() - start,
+    }
+
+
+def start_tracking_resolution():
+    """Resolve the tracking server on a background thread; returns a Future."""
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='mlflow-resolve')
+    future = executor.submit(resolve_tracking_server)
+    executor.shutdown(wait=False)
+    return future
+
+
+# Connect to the MLflow tracking server
+def setup_mlflow(resolution=None, timeout=None):
+    """Configure MLflow, using a pending start_tracking_resolution() Future if given."""
+    try:
+        if resolution is not None:
+            tracking_server = resolution.result(timeout=timeout)
+        else:
+            tracking_server = resolve_tracking_server()
+        tracking_server_url = tracking_server['tracking_server_url']
+        print(f"MLflow tracking server URL: {tracking_server_url}")
+
+        # Set the tracking URI
+        import mlflow
+        mlflow.set_tracking_uri(tracking_server_url)
+
+        # Create or set the experiment
+        experiment_name = EXPERIMENT_NAME
+        mlflow.set_experiment(experiment_name)
+
+        print(f"Using experiment: {experiment_name}")
+        print("MLflow configured - autolog disabled, using custom callback")
+        return True
+    except concurrent.futures.TimeoutError:
+        print(f"Timed out after {timeout}s resolving the MLflow tracking server")
+        print("Continuing without MLflow tracking...")
+        return False
+    except Exception as e:
+        print(f"Error connecting to MLflow tracking server: {e}")
+        print("Continuing without MLflow tracking...")
+        return False
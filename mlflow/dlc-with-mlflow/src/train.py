@@ -1,62 +1,149 @@
 import os
 import gc
-import tensorflow as tf
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.compose import ColumnTransformer
+import argparse
+import json
 import time
-import boto3
-import mlflow
-import mlflow.tensorflow
-import joblib
-import mlflow.data
+from contextlib import contextmanager
+
+def str2bool(value):
+    return str(value).lower() in ('1', 'true', 'yes', 'y')
+
+# Runtime options, passed as hyperparameters by SageMaker or on the command line
+parser = argparse.ArgumentParser(description="Train the abalone TensorFlow regressor")
+parser.add_argument('--streaming', type=str2bool, nargs='?', const=True,
+                    default=str2bool(os.environ.get('STREAMING', 'false')),
+                    help="Stream the training channel through tf.data instead of loading it into memory")
+parser.add_argument('--chunk-size', type=int, default=100000,
+                    help="Rows per chunk when fitting preprocessing statistics in streaming mode")
+parser.add_argument('--shuffle-buffer', type=int, default=10000,
+                    help="Shuffle buffer size (rows) for the streaming training pipeline")
+parser.add_argument('--feature-cache', type=str2bool, nargs='?', const=True,
+                    default=str2bool(os.environ.get('FEATURE_CACHE', 'false')),
+                    help="Reuse preprocessed feature matrices cached by input content hash")
+parser.add_argument('--feature-cache-dir', type=str, default=None,
+                    help="Feature cache location (default: .feature_cache under the data dir)")
+parser.add_argument('--profile', type=str2bool, nargs='?', const=True,
+                    default=str2bool(os.environ.get('PROFILE', 'false')),
+                    help="Record per-step latency, throughput and data-wait vs compute time")
+parser.add_argument('--profile-trace-steps', type=str, default=None,
+                    help="Capture a tf.profiler trace for a step range, e.g. '10,20' (requires --profile)")
+parser.add_argument('--epochs', type=int, default=100, help="Maximum number of training epochs")
+parser.add_argument('--learning-rate', type=float, default=0.001, help="Adam learning rate")
+parser.add_argument('--batch-size', type=int, default=32, help="Training batch size")
+parser.add_argument('--dropout', type=float, default=0.2, help="Dropout rate after hidden layers")
+parser.add_argument('--hidden-layers', type=str, default="64-32-16",
+                    help="Hidden layer widths separated by '-', e.g. '64-32-16'")
+parser.add_argument('--threads', type=int, default=None,
+                    help="Pin TensorFlow to this many intra-op threads (set by sweep.py per trial)")
+parser.add_argument('--run-name', type=str, default=None, help="MLflow run name")
+parser.add_argument('--parent-run-id', type=str, default=os.environ.get('MLFLOW_PARENT_RUN_ID'),
+                    help="Log this run as a nested run under the given MLflow run")
+parser.add_argument('--register-model', type=str2bool, nargs='?', const=True, default=True,
+                    help="Register the trained model in the MLflow model registry")
+parser.add_argument('--progress-file', type=str, default=None,
+                    help="Append per-epoch validation loss and final metrics as JSON lines (used by sweep.py)")
+parser.add_argument('--fast-start', type=str2bool, nargs='?', const=True,
+                    default=str2bool(os.environ.get('FAST_START', 'false')),
+                    help="Import MLflow/boto3 lazily and resolve the tracking server while data loads")
+parser.add_argument('--tracking-timeout', type=float, default=30.0,
+                    help="Seconds to wait for the tracking server in fast-start mode before continuing without MLflow")
+parser.add_argument('--checkpoint-dir', type=str, default=None,
+                    help="Checkpoint directory (default: /opt/ml/checkpoints if present, else <model_dir>/checkpoints)")
+parser.add_argument('--keep-checkpoints', type=int, default=2, help="Number of most recent checkpoints to keep")
+parser.add_argument('--keep-best-checkpoints', type=int, default=1,
+                    help="Number of best checkpoints by validation loss to keep")
+parser.add_argument('--resume', type=str2bool, nargs='?', const=True, default=False,
+                    help="Resume training from the newest valid checkpoint, e.g. after a spot interruption")
+parser.add_argument('--quantize', type=str, default='',
+                    help="Comma-separated quantized formats to export and benchmark: "
+                         "tflite-dynamic, tflite-int8, onnx-dynamic (default: none)")
+parser.add_argument('--quantize-calibration-samples', type=int, default=500,
+                    help="Training rows used to calibrate int8 quantization")
+parser.add_argument('--quantize-tolerance', type=float, default=0.05,
+                    help="Largest MAE increase over the float32 model for a recommended quantized artifact")
+parser.add_argument('--distribute', choices=['none', 'mirrored', 'multi-worker'],
+                    default=os.environ.get('DISTRIBUTE', 'none'),
+                    help="Data-parallel strategy: none, mirrored (CPU logical devices) or multi-worker (TF_CONFIG/SM_HOSTS)")
+parser.add_argument('--cpu-devices', type=int, default=2,
+                    help="Logical CPU devices, one replica each, for --distribute mirrored")
+parser.add_argument('--dataset-digest', choices=['sampled', 'full'], default='sampled',
+                    help="How the training data is registered with mlflow.log_input: a constant-time sampled "
+                         "fingerprint, or MLflow's full DataFrame digest and profile (with --streaming, a "
+                         "digest of every shard file)")
+args, _ = parser.parse_known_args()
+if args.quantize_tolerance < 0:
+    parser.error("--quantize-tolerance must be zero or positive")
+
+# Import-time breakdown, reported once start-up is complete
+script_start = time.perf_counter()
+import_times = {}
+
+@contextmanager
+def import_timer(name):
+    start = time.perf_counter()
+    yield
+    import_times[name] = time.perf_counter() - start
+
+with import_timer('tensorflow'):
+    import tensorflow as tf
+with import_timer('pandas_numpy'):
+    import pandas as pd
+    import numpy as np
+with import_timer('sklearn_joblib'):
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler, OneHotEncoder
+    from sklearn.compose import ColumnTransformer
+    import joblib
+
+# In fast-start mode MLflow and boto3 are imported, and the tracking server
+# resolved, on a background thread that overlaps with data loading
+from tracking import setup_mlflow, start_tracking_resolution
+tracking_resolution = None
+if args.fast_start:
+    tracking_resolution = start_tracking_resolution()
+else:
+    with import_timer('mlflow'):
+        import mlflow
+        import mlflow.tensorflow
+        import mlflow.data
+
+# Thread pools must be sized before TensorFlow executes its first op
+if args.threads:
+    tf.config.threading.set_intra_op_parallelism_threads(args.threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+# Distribution strategies likewise have to be created before the first op
+import distributed
+strategy, worker = distributed.create_strategy(args.distribute, cpu_devices=args.cpu_devices)
 
 print("TensorFlow version:", tf.__version__)
-print("MLflow version:", mlflow.__version__)
+if not args.fast_start:
+    print("MLflow version:", mlflow.__version__)
+
+def write_progress(record):
+    # Progress records let sweep.py rank trials and stop losing ones early
+    if args.progress_file:
+        with open(args.progress_file, 'a') as f:
+            f.write(json.dumps(record) + "\n")
 
 # Set random seeds for reproducibility
 np.random.seed(42)
 tf.random.set_seed(42)
 
-# Connect to the MLflow tracking server
-def setup_mlflow():
-    # Get the MLflow tracking server URL from the ARN
-    sagemaker_client = boto3.client('sagemaker', region_name='us-east-1')
-    tracking_server_name = "Mlflow3"
-    try:
-        response = sagemaker_client.describe_mlflow_tracking_server(
-            TrackingServerName=tracking_server_name
-        )
-        tracking_server_url = response['TrackingServerArn']
-        print(f"MLflow tracking server URL: {tracking_server_url}")
-        
-        # Set the tracking URI
-        mlflow.set_tracking_uri(tracking_server_url)
-        
-        # Create or set the experiment
-        experiment_name = "abalone-tensorflow-experiment"
-        mlflow.set_experiment(experiment_name)
-        
-        print(f"Using experiment: {experiment_name}")
-        print("MLflow configured - autolog disabled, using custom callback")
-        return True
-    except Exception as e:
-        print(f"Error connecting to MLflow tracking server: {e}")
-        print("Continuing without MLflow tracking...")
-        return False
-
 # Create directories for model artifacts and plots
 model_dir = os.environ.get('SM_MODEL_DIR', '/opt/ml/model')
+model_dir = distributed.worker_model_dir(model_dir, worker)
 os.makedirs(model_dir, exist_ok=True)
 
 # Create a directory for plots
 plots_dir = os.path.join(model_dir, 'plots')
 os.makedirs(plots_dir, exist_ok=True)
 
+# Plots are rendered and artifacts uploaded by a background process, so the
+# training process never blocks on matplotlib or artifact I/O
+from artifact_worker import ArtifactWorker
+artifact_worker = ArtifactWorker(plots_dir)
+
 # Load the Abalone dataset from local file
 print("Loading Abalone dataset...")
 data_path = os.environ.get('SM_CHANNEL_TRAINING', '/opt/ml/data')
@@ -65,99 +152,186 @@ abalone_file = os.path.join(data_path, 'abalone.data')
 column_names = ["Sex", "Length", "Diameter", "Height", "Whole_weight", 
                 "Shucked_weight", "Viscera_weight", "Shell_weight", "Rings"]
 
-# Try to load from local file, fallback to download if needed
-try:
-    if os.path.exists(abalone_file):
-        print(f"Loading dataset from {abalone_file}")
-        abalone_df = pd.read_csv(abalone_file, names=column_names)
-    else:
-        print("Local dataset not found, downloading from UCI repository...")
-        url = "https://archive.ics.uci.edu/ml/machine-learning-databases/abalone/abalone.data"
-        abalone_df = pd.read_csv(url, names=column_names)
-        # Save for future use
-        abalone_df.to_csv(abalone_file, index=False, header=False)
-        print(f"Dataset saved to {abalone_file}")
-except Exception as e:
-    print(f"Error loading dataset: {e}")
-    print("Attempting to download from UCI repository...")
-    url = "https://archive.ics.uci.edu/ml/machine-learning-databases/abalone/abalone.data"
-    abalone_df = pd.read_csv(url, names=column_names)
-
-# Display basic information
-print("\nDataset Information:")
-print(f"Shape: {abalone_df.shape}")
-print("\nFirst 5 rows:")
-print(abalone_df.head())
-
-print("\nSummary statistics:")
-print(abalone_df.describe())
-
-# Check for missing values
-print("\nMissing values:")
-print(abalone_df.isnull().sum())
-
-# Data visualization
-print("\nCreating exploratory visualizations...")
-
-# Distribution of target variable
-plt.figure(figsize=(10, 6))
-sns.histplot(abalone_df['Rings'], kde=True)
-plt.title('Distribution of Abalone Rings (Age)')
-plt.xlabel('Rings')
-plt.ylabel('Count')
-plt.savefig(os.path.join(plots_dir, 'rings_distribution.png'))
-plt.close()  # Close the figure to free memory
-plt.clf()    # Clear the current figure
-
-# Correlation matrix
-plt.figure(figsize=(12, 10))
-numeric_df = abalone_df.select_dtypes(include=[np.number])
-correlation = numeric_df.corr()
-sns.heatmap(correlation, annot=True, cmap='coolwarm', fmt=".2f")
-plt.title('Correlation Matrix')
-plt.tight_layout()
-plt.savefig(os.path.join(plots_dir, 'correlation_matrix.png'))
-plt.close()  # Close the figure
-plt.clf()    # Clear the figure
-del correlation, numeric_df  # Delete variables to free memory
-
-# Data Preprocessing
-print("\nPreprocessing the data...")
-
-# The 'Rings' feature is the target variable (age = rings + 1.5)
-X = abalone_df.drop('Rings', axis=1)
-y = abalone_df['Rings'].values
-
 # Handle categorical feature (Sex: 'M', 'F', 'I')
 categorical_features = ['Sex']
 numerical_features = ['Length', 'Diameter', 'Height', 'Whole_weight', 
                       'Shucked_weight', 'Viscera_weight', 'Shell_weight']
 
-# Create preprocessing steps for numerical and categorical features
-preprocessor = ColumnTransformer(
-    transformers=[
-        ('num', StandardScaler(), numerical_features),
-        ('cat', OneHotEncoder(), categorical_features)
-    ])
-
-# Apply preprocessing
-X_processed = preprocessor.fit_transform(X)
-
-# Convert to a format suitable for TensorFlow
-X_processed = np.array(X_processed, dtype=np.float32)
-y = np.array(y, dtype=np.float32)
+# Preprocessing spec - any change here invalidates cached feature matrices
+preprocessing_spec = {
+    'column_names': column_names,
+    'numerical_features': numerical_features,
+    'categorical_features': categorical_features,
+    'target': 'Rings',
+    'transformers': ['StandardScaler', 'OneHotEncoder'],
+    'test_size': 0.2,
+    'random_state': 42,
+    'dtype': 'float32',
+}
+
+# Look up preprocessed features keyed by the input content hash
+cached_features = None
+feature_cache_key = None
+if args.feature_cache and not args.streaming:
+    import feature_cache
+
+    feature_cache_dir = args.feature_cache_dir or os.path.join(data_path, '.feature_cache')
+    if os.path.exists(abalone_file):
+        feature_cache_key = feature_cache.cache_key(abalone_file, preprocessing_spec)
+        cached_features = feature_cache.load(feature_cache_dir, feature_cache_key)
+        status = "hit" if cached_features is not None else "miss"
+        print(f"Feature cache {status} for key {feature_cache_key} in {feature_cache_dir}")
+
+if args.streaming:
+    import streaming
+
+    shards = streaming.list_shards(data_path)
+    if not shards:
+        raise FileNotFoundError(f"Streaming mode needs CSV shards in {data_path}")
+    print(f"Streaming {len(shards)} shard(s) from {data_path} in chunks of {args.chunk_size:,} rows")
+
+    # One pass over the shards fits the preprocessing statistics; only the
+    # first chunk is kept in memory as a sample for visualizations
+    preprocessor, dataset_rows, abalone_df = streaming.fit_preprocessor(
+        shards, column_names, numerical_features, categorical_features, 'Rings', args.chunk_size)
+    print(f"Fitted preprocessing statistics on {dataset_rows:,} rows "
+          f"(exploratory output below uses the first {len(abalone_df):,})")
+elif cached_features is not None:
+    print(f"Skipping dataset parsing, using cached features from {cached_features['dir']}")
+else:
+    # Try to load from local file, fallback to download if needed
+    try:
+        if os.path.exists(abalone_file):
+            print(f"Loading dataset from {abalone_file}")
+            abalone_df = pd.read_csv(abalone_file, names=column_names)
+        else:
+            print("Local dataset not found, downloading from UCI repository...")
+            url = "https://archive.ics.uci.edu/ml/machine-learning-databases/abalone/abalone.data"
+            abalone_df = pd.read_csv(url, names=column_names)
+            # Save for future use
+            abalone_df.to_csv(abalone_file, index=False, header=False)
+            print(f"Dataset saved to {abalone_file}")
+    except Exception as e:
+        print(f"Error loading dataset: {e}")
+        print("Attempting to download from UCI repository...")
+        url = "https://archive.ics.uci.edu/ml/machine-learning-databases/abalone/abalone.data"
+        abalone_df = pd.read_csv(url, names=column_names)
 
-# Split the data into training and testing sets
-X_train, X_test, y_train, y_test = train_test_split(
-    X_processed, y, test_size=0.2, random_state=42)
+if cached_features is not None:
+    # Exploratory plots were rendered on the run that populated the cache
+    restored_plots = feature_cache.restore_plots(cached_features, plots_dir)
+    print(f"\nRestored {len(restored_plots)} exploratory plot(s) from the feature cache")
+else:
+    # Display basic information
+    print("\nDataset Information:")
+    print(f"Shape: {abalone_df.shape}")
+    print("\nFirst 5 rows:")
+    print(abalone_df.head())
+
+    print("\nSummary statistics:")
+    print(abalone_df.describe())
+
+    # Check for missing values
+    print("\nMissing values:")
+    print(abalone_df.isnull().sum())
+
+    # Data visualization
+    print("\nCreating exploratory visualizations...")
+
+    # Distribution of target variable and correlation matrix; only compact
+    # snapshots are sent to the worker process
+    artifact_worker.plot('rings_distribution.png', 'rings_distribution',
+                         rings=abalone_df['Rings'].to_numpy())
+    correlation = abalone_df.select_dtypes(include=[np.number]).corr()
+    artifact_worker.plot('correlation_matrix.png', 'correlation_matrix', correlation=correlation)
+    del correlation  # Delete variables to free memory
 
-print(f"Training set shape: {X_train.shape}")
-print(f"Testing set shape: {X_test.shape}")
+# Data Preprocessing
+print("\nPreprocessing the data...")
 
-# Custom MLflow callback for detailed epoch logging
+# Each replica processes --batch-size rows per step, so the global batch grows
+# with the number of replicas
+batch_size = args.batch_size * strategy.num_replicas_in_sync
+if strategy.num_replicas_in_sync > 1:
+    print(f"{strategy.num_replicas_in_sync} replicas, global batch size {batch_size}")
+
+if args.streaming:
+    # Features are transformed inside the tf.data pipeline, batch by batch
+    pipeline_args = (shards, column_names, numerical_features, categorical_features, 'Rings', preprocessor)
+    train_ds = streaming.build_dataset(*pipeline_args, 'train', batch_size, shuffle_buffer=args.shuffle_buffer)
+    val_ds = streaming.build_dataset(*pipeline_args, 'validation', batch_size)
+    test_ds = streaming.build_dataset(*pipeline_args, 'test', batch_size)
+    if args.distribute == 'multi-worker':
+        train_ds = distributed.shard(train_ds, num_files=len(shards), num_workers=worker['num_workers'])
+        val_ds = distributed.shard(val_ds)
+        test_ds = distributed.shard(test_ds)
+    num_features = streaming.num_output_features(preprocessor)
+    print(f"Streaming pipeline ready: {num_features} features per row, batch size {batch_size}")
+elif cached_features is not None:
+    # Memory-mapped arrays: no parsing, no preprocessing, no copies
+    preprocessor = cached_features['preprocessor']
+    X_train = cached_features['X_train']
+    X_test = cached_features['X_test']
+    y_train = cached_features['y_train']
+    y_test = cached_features['y_test']
+
+    print(f"Training set shape: {X_train.shape}")
+    print(f"Testing set shape: {X_test.shape}")
+
+    num_features = X_train.shape[1]
+else:
+    # The 'Rings' feature is the target variable (age = rings + 1.5)
+    X = abalone_df.drop('Rings', axis=1)
+    y = abalone_df['Rings'].values
+
+    # Create preprocessing steps for numerical and categorical features
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), numerical_features),
+            ('cat', OneHotEncoder(), categorical_features)
+        ])
+
+    # Apply preprocessing
+    X_processed = preprocessor.fit_transform(X)
+
+    # Convert to a format suitable for TensorFlow
+    X_processed = np.array(X_processed, dtype=np.float32)
+    y = np.array(y, dtype=np.float32)
+
+    # Split the data into training and testing sets
+    X_train, X_test, y_train, y_test = train_test_split(
+        X_processed, y, test_size=0.2, random_state=42)
+
+    print(f"Training set shape: {X_train.shape}")
+    print(f"Testing set shape: {X_test.shape}")
+
+    # Get the number of features after preprocessing
+    num_features = X_train.shape[1]
+
+    if args.feature_cache and os.path.exists(abalone_file):
+        if feature_cache_key is None:
+            # The dataset was downloaded on this run, so it can be keyed now
+            feature_cache_key = feature_cache.cache_key(abalone_file, preprocessing_spec)
+        cache_entry_dir = feature_cache.save(
+            feature_cache_dir, feature_cache_key, preprocessor,
+            {'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test},
+            {'data_file': abalone_file, 'dataset_size': len(abalone_df), 'spec': preprocessing_spec})
+        print(f"Cached preprocessed features in {cache_entry_dir}")
+
+        # The exploratory plots are added to the entry once the artifact
+        # worker has rendered them, so training never waits on matplotlib
+        exploratory_plots = [os.path.join(plots_dir, name)
+                             for name in ('rings_distribution.png', 'correlation_matrix.png')]
+        artifact_worker.when_rendered(
+            [os.path.basename(path) for path in exploratory_plots],
+            lambda: feature_cache.add_plots(cache_entry_dir, exploratory_plots))
+
+# Custom MLflow callback for detailed epoch logging; values are handed to the
+# asynchronous logger so the training loop never waits on the tracking server
 class MLflowCallback(tf.keras.callbacks.Callback):
-    def __init__(self):
+    def __init__(self, logger):
         super().__init__()
+        self.logger = logger
         self.epoch_times = []
         
     def on_epoch_begin(self, epoch, logs=None):
@@ -171,118 +345,286 @@ class MLflowCallback(tf.keras.callbacks.Callback):
         
         print(f"Completed epoch {epoch + 1} in {epoch_duration:.2f}s")
         
-        if logs and mlflow_enabled:
+        if logs:
             # Log all training metrics
             for metric_name, metric_value in logs.items():
-                mlflow.log_metric(metric_name, metric_value, step=epoch)
+                self.logger.log_metric(metric_name, metric_value, step=epoch)
                 print(f"  {metric_name}: {metric_value:.4f}")
             
             # Log epoch timing
-            mlflow.log_metric("epoch_duration", epoch_duration, step=epoch)
-            mlflow.log_metric("avg_epoch_duration", np.mean(self.epoch_times), step=epoch)
+            self.logger.log_metric("epoch_duration", epoch_duration, step=epoch)
+            self.logger.log_metric("avg_epoch_duration", np.mean(self.epoch_times), step=epoch)
             
             # Log learning rate if available
             if hasattr(self.model.optimizer, 'learning_rate'):
                 current_lr = float(tf.keras.backend.get_value(self.model.optimizer.learning_rate))
-                mlflow.log_metric("learning_rate", current_lr, step=epoch)
+                self.logger.log_metric("learning_rate", current_lr, step=epoch)
                 print(f"  learning_rate: {current_lr}")
                 
     def on_train_end(self, logs=None):
-        if mlflow_enabled:
-            total_time = sum(self.epoch_times)
-            mlflow.log_metric("total_training_time", total_time)
-            mlflow.log_metric("final_avg_epoch_time", np.mean(self.epoch_times))
-            print(f"Training completed. Total time: {total_time:.2f}s, Avg epoch: {np.mean(self.epoch_times):.2f}s")
+        total_time = sum(self.epoch_times)
+        self.logger.log_metric("total_training_time", total_time)
+        self.logger.log_metric("final_avg_epoch_time", np.mean(self.epoch_times))
+        print(f"Training completed. Total time: {total_time:.2f}s, Avg epoch: {np.mean(self.epoch_times):.2f}s")
+
+        # Guarantee every epoch metric has reached the tracking server
+        self.logger.flush()
+        stats = self.logger.stats
+        print(f"MLflow logging: {stats['batches_sent']} batch(es), {stats['logging_seconds']:.2f}s in background, "
+              f"{stats['enqueue_wait_seconds']:.3f}s blocking the training loop")
 
 # Initialize MLflow tracking
-mlflow_enabled = setup_mlflow()
+# Only the chief logs to MLflow when training on several workers
+with import_timer('tracking_setup_wait'):
+    mlflow_enabled = worker['is_chief'] and setup_mlflow(tracking_resolution, timeout=args.tracking_timeout)
+
+if args.fast_start:
+    if mlflow_enabled:
+        # Already imported by the resolution thread; this only binds the names
+        with import_timer('mlflow'):
+            import mlflow
+            import mlflow.tensorflow
+            import mlflow.data
+        print("MLflow version:", mlflow.__version__)
+    if tracking_resolution.done() and tracking_resolution.exception() is None:
+        import_times['mlflow_boto3_background'] = tracking_resolution.result()['import_seconds']
+        import_times['tracking_resolution_background'] = tracking_resolution.result()['resolve_seconds']
+
+# Report where start-up time went
+startup_seconds = time.perf_counter() - script_start
+print(f"\nStart-up breakdown ({'fast-start' if args.fast_start else 'standard'} mode):")
+for name, seconds in import_times.items():
+    print(f"  {name:32s} {seconds:7.2f}s")
+print(f"  {'total until MLflow ready':32s} {startup_seconds:7.2f}s")
 
 # Start MLflow run
 if mlflow_enabled:
-    mlflow_run = mlflow.start_run()
+    mlflow_run = mlflow.start_run(run_name=args.run_name, parent_run_id=args.parent_run_id)
     run_id = mlflow_run.info.run_id
     print(f"MLflow run ID: {run_id}")
+    write_progress({'run_id': run_id})
+
+    # Params, metrics and artifacts are batched and sent from a background thread
+    from mlflow_logger import AsyncMLflowLogger
+    mlflow_logger = AsyncMLflowLogger(run_id)
+    mlflow_logger.log_param("fast_start", args.fast_start)
+    for name, seconds in import_times.items():
+        mlflow_logger.log_metric(f"startup_{name}_seconds", seconds)
+    mlflow_logger.log_metric("startup_seconds", startup_seconds)
     
-    # Log dataset info
-    dataset = mlflow.data.from_pandas(abalone_df, name="abalone.data")
-    mlflow.log_input(dataset, context="training")
-    mlflow.log_param("dataset_size", len(abalone_df))
-    mlflow.log_param("train_size", len(X_train))
-    mlflow.log_param("test_size", len(X_test))
+    # Log dataset info. The sampled fingerprint reads a fixed number of blocks
+    # per file (none at all when the cached fingerprint is still current),
+    # instead of hashing and profiling the whole DataFrame. In streaming mode
+    # only the first chunk is in memory, so a full digest hashes every shard
+    # file instead of that DataFrame.
+    data_files = shards if args.streaming else [abalone_file]
+    full_digest = args.dataset_digest == 'full'
+    if (args.streaming or not full_digest) and all(os.path.exists(path) for path in data_files):
+        import fingerprint
+
+        schema = fingerprint.dataframe_schema(abalone_df) if cached_features is None else None
+        dataset_fingerprint = fingerprint.fingerprint(data_files, schema=schema, full=full_digest)
+        print(f"Dataset fingerprint {dataset_fingerprint['digest']}: {dataset_fingerprint['num_files']} file(s), "
+              f"{dataset_fingerprint['bytes'] / 1e6:,.1f} MB, {dataset_fingerprint['rehashed_files']} re-sampled, "
+              f"{dataset_fingerprint['seconds'] * 1000:.1f} ms")
+        dataset = fingerprint.mlflow_dataset(dataset_fingerprint, data_path if args.streaming else abalone_file,
+                                             name="abalone.data")
+        mlflow.log_input(dataset, context="training")
+        mlflow_logger.log_metric("dataset_fingerprint_seconds", dataset_fingerprint['seconds'])
+    elif cached_features is None:
+        dataset = mlflow.data.from_pandas(abalone_df, name="abalone.data")
+        mlflow.log_input(dataset, context="training")
+    mlflow_logger.log_param("streaming", args.streaming)
+    if feature_cache_key is not None:
+        mlflow_logger.log_param("feature_cache_key", feature_cache_key)
+        mlflow_logger.log_param("feature_cache_hit", cached_features is not None)
+    if args.streaming:
+        mlflow_logger.log_param("dataset_size", dataset_rows)
+        mlflow_logger.log_param("chunk_size", args.chunk_size)
+    elif cached_features is not None:
+        mlflow_logger.log_param("dataset_size", cached_features['meta']['dataset_size'])
+        mlflow_logger.log_param("train_size", len(X_train))
+        mlflow_logger.log_param("test_size", len(X_test))
+    else:
+        mlflow_logger.log_param("dataset_size", len(abalone_df))
+        mlflow_logger.log_param("train_size", len(X_train))
+        mlflow_logger.log_param("test_size", len(X_test))
     
-    # Log dataset visualizations
-    mlflow.log_artifact(os.path.join(plots_dir, 'rings_distribution.png'))
-    mlflow.log_artifact(os.path.join(plots_dir, 'correlation_matrix.png'))
+    # Log dataset visualizations from the artifact worker once they are rendered
+    artifact_worker.set_run(mlflow.get_tracking_uri(), run_id)
+    artifact_worker.upload(os.path.join(plots_dir, 'rings_distribution.png'))
+    artifact_worker.upload(os.path.join(plots_dir, 'correlation_matrix.png'))
 
 # Model Definition
 print("\nDefining the TensorFlow model...")
 
-# Get the number of features after preprocessing
-num_features = X_train.shape[1]
-
-# Define a sequential model
-model = tf.keras.Sequential([
-    tf.keras.layers.Dense(64, activation='relu', input_shape=(num_features,)),
-    tf.keras.layers.BatchNormalization(),
-    tf.keras.layers.Dropout(0.2),
-    tf.keras.layers.Dense(32, activation='relu'),
-    tf.keras.layers.BatchNormalization(),
-    tf.keras.layers.Dropout(0.2),
-    tf.keras.layers.Dense(16, activation='relu'),
-    tf.keras.layers.Dense(1)  # Output layer for regression
-])
-
-# Compile the model
-model.compile(
-    optimizer=tf.keras.optimizers.Adam(learning_rate=0.001),
-    loss='mse',  # Mean Squared Error for regression
-    metrics=['mae']  # Mean Absolute Error
-)
+# Variables are created under the distribution strategy so they are mirrored
+# across replicas; with --distribute none this is the default strategy
+with strategy.scope():
+    # Define a sequential model; every hidden layer but the last is followed by
+    # batch normalization and dropout
+    hidden_units = [int(units) for units in args.hidden_layers.split('-')]
+    model_layers = []
+    for i, units in enumerate(hidden_units):
+        if i == 0:
+            model_layers.append(tf.keras.layers.Dense(units, activation='relu', input_shape=(num_features,)))
+        else:
+            model_layers.append(tf.keras.layers.Dense(units, activation='relu'))
+        if i < len(hidden_units) - 1:
+            model_layers.append(tf.keras.layers.BatchNormalization())
+            model_layers.append(tf.keras.layers.Dropout(args.dropout))
+    model_layers.append(tf.keras.layers.Dense(1))  # Output layer for regression
+    model = tf.keras.Sequential(model_layers)
+
+    # Compile the model
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=args.learning_rate),
+        loss='mse',  # Mean Squared Error for regression
+        metrics=['mae']  # Mean Absolute Error
+    )
 
 # Display model summary
 model.summary()
 
 # Log model parameters
 if mlflow_enabled:
-    mlflow.log_param("learning_rate", 0.001)
-    mlflow.log_param("batch_size", 32)
-    mlflow.log_param("dropout_rate", 0.2)
-    mlflow.log_param("hidden_layers", "64-32-16")
-    mlflow.log_param("activation", "relu")
-    mlflow.log_param("optimizer", "Adam")
-    mlflow.log_param("loss_function", "mse")
-    mlflow.log_param("total_params", model.count_params())
+    mlflow_logger.log_param("learning_rate", args.learning_rate)
+    mlflow_logger.log_param("batch_size", batch_size)
+    mlflow_logger.log_param("dropout_rate", args.dropout)
+    mlflow_logger.log_param("hidden_layers", args.hidden_layers)
+    mlflow_logger.log_param("epochs", args.epochs)
+    mlflow_logger.log_param("activation", "relu")
+    mlflow_logger.log_param("optimizer", "Adam")
+    mlflow_logger.log_param("loss_function", "mse")
+    mlflow_logger.log_param("total_params", model.count_params())
+
+# Checkpoints go to the SageMaker checkpoint directory when one is configured,
+# since that directory is synced to S3 and restored after a spot interruption
+from checkpointing import AsyncCheckpointCallback, best_checkpoint, latest_checkpoint, restore
+
+checkpoint_dir = args.checkpoint_dir
+if checkpoint_dir is None:
+    checkpoint_dir = '/opt/ml/checkpoints' if os.path.isdir('/opt/ml/checkpoints') else os.path.join(model_dir, 'checkpoints')
+
+initial_epoch = 0
+if args.resume:
+    checkpoint = latest_checkpoint(checkpoint_dir)
+    if checkpoint is not None:
+        with strategy.scope():
+            initial_epoch = restore(model, checkpoint)
+        print(f"Resuming from {checkpoint['weights_path']} after epoch {initial_epoch}")
+    else:
+        print(f"No valid checkpoint in {checkpoint_dir}; starting from scratch")
+if mlflow_enabled:
+    mlflow_logger.log_param("initial_epoch", initial_epoch)
+
+# A checkpoint of the last epoch means an earlier attempt finished training and
+# was interrupted afterwards, e.g. during export. fit() would run no epochs, so
+# it is skipped and the best checkpoint is used, as EarlyStopping would have.
+training_finished = initial_epoch >= args.epochs
+if training_finished:
+    best = best_checkpoint(checkpoint_dir, 'val_loss') or checkpoint
+    with strategy.scope():
+        restore(model, best)
+    print(f"Training already finished at epoch {initial_epoch}; "
+          f"skipping fit and using the best checkpoint (epoch {best['epoch']})")
 
 # Model Training
 print("\nTraining the model...")
 start_time = time.time()
 
-# Define callbacks
+# Define callbacks. Every worker resumes from the shared checkpoint directory,
+# but only the chief writes to it.
+checkpoint_callback = AsyncCheckpointCallback(
+    checkpoint_dir if worker['is_chief'] else os.path.join(model_dir, 'checkpoints'),
+    monitor='val_loss',
+    keep_last=args.keep_checkpoints,
+    keep_best=args.keep_best_checkpoints,
+    logger=mlflow_logger if mlflow_enabled else None)
 callbacks = [
     tf.keras.callbacks.EarlyStopping(
         monitor='val_loss', patience=10, restore_best_weights=True),
-    tf.keras.callbacks.ModelCheckpoint(
-        os.path.join(model_dir, 'checkpoint-{epoch}.keras'), 
-        save_best_only=True, 
-        monitor='val_loss')
+    checkpoint_callback
 ]
 
 # Add custom MLflow callback
 if mlflow_enabled:
-    callbacks.append(MLflowCallback())
-
-# Train the model
-history = model.fit(
-    X_train, y_train,
-    epochs=100,
-    batch_size=32,
-    validation_split=0.2,
-    callbacks=callbacks,
-    verbose=1
-)
+    callbacks.append(MLflowCallback(mlflow_logger))
+
+# Add per-step profiling callback
+if args.profile:
+    from profiling import StepProfilerCallback, parse_step_range
+
+    # The profiler times compute on one cached batch; only the streaming
+    # pipeline is also timed on its own, since fit() builds its own pipeline
+    # for in-memory arrays
+    if args.streaming:
+        profile_input = train_ds
+    else:
+        profile_input = tf.data.Dataset.from_tensor_slices((X_train, y_train)).batch(batch_size)
+    callbacks.append(StepProfilerCallback(
+        batch_size,
+        os.path.join(model_dir, 'step_profile.json'),
+        input_dataset=profile_input,
+        trace_steps=parse_step_range(args.profile_trace_steps),
+        trace_dir=os.path.join(model_dir, 'profiler'),
+        logger=mlflow_logger if mlflow_enabled else None,
+        time_input=args.streaming))
+
+# Report per-epoch validation loss to the sweep controller
+if args.progress_file:
+    callbacks.append(tf.keras.callbacks.LambdaCallback(
+        on_epoch_end=lambda epoch, logs: write_progress(
+            {'epoch': epoch, 'val_loss': float(logs['val_loss'])})))
+
+measure_throughput = args.streaming or args.distribute != 'none'
+if measure_throughput:
+    from profiling import ThroughputCallback
+
+    throughput_callback = ThroughputCallback(batch_size)
+    callbacks.append(throughput_callback)
+
+if training_finished:
+    history = None
+elif args.streaming:
+    # Train the model from the streaming pipeline
+    history = model.fit(
+        train_ds,
+        epochs=args.epochs,
+        initial_epoch=initial_epoch,
+        validation_data=val_ds,
+        callbacks=callbacks,
+        verbose=1
+    )
+elif args.distribute != 'none':
+    # Explicit datasets so each worker reads its own shard of every global batch
+    train_ds, val_ds = distributed.array_datasets(X_train, y_train, batch_size, validation_split=0.2)
+    history = model.fit(
+        train_ds,
+        epochs=args.epochs,
+        initial_epoch=initial_epoch,
+        validation_data=val_ds,
+        callbacks=callbacks,
+        verbose=1
+    )
+else:
+    # Train the model
+    history = model.fit(
+        X_train, y_train,
+        epochs=args.epochs,
+        initial_epoch=initial_epoch,
+        batch_size=batch_size,
+        validation_split=0.2,
+        callbacks=callbacks,
+        verbose=1
+    )
 
 training_time = time.time() - start_time
 print(f"\nTraining completed in {training_time:.2f} seconds")
+measure_throughput = measure_throughput and history is not None
+if measure_throughput:
+    samples_per_sec = float(np.mean(throughput_callback.samples_per_sec))
+    print(f"Average training throughput: {samples_per_sec:,.0f} samples/sec")
 
 # Clear TensorFlow backend session to free GPU/CPU memory
 tf.keras.backend.clear_session()
@@ -291,25 +633,42 @@ tf.keras.backend.clear_session()
 gc.collect()
 
 if mlflow_enabled:
-    mlflow.log_metric("training_time_seconds", training_time)
+    mlflow_logger.log_metric("training_time_seconds", training_time)
+    if measure_throughput:
+        mlflow_logger.log_metric("train_samples_per_sec", samples_per_sec)
+    mlflow_logger.log_param("distribute", args.distribute)
+    mlflow_logger.log_param("replicas", strategy.num_replicas_in_sync)
 
 # Model Evaluation
 print("\nEvaluating the model...")
 
-# Evaluate on test data
-test_loss, test_mae = model.evaluate(X_test, y_test, verbose=0)
-print(f"Test Mean Absolute Error: {test_mae:.4f}")
-print(f"Test Mean Squared Error: {test_loss:.4f}")
-print(f"Test Root Mean Squared Error: {np.sqrt(test_loss):.4f}")
-
-# Make predictions
-y_pred = model.predict(X_test)
-
-# Calculate additional metrics
-mse = np.mean((y_test - y_pred.flatten()) ** 2)
-rmse = np.sqrt(mse)
-mae = np.mean(np.abs(y_test - y_pred.flatten()))
-r2 = 1 - (np.sum((y_test - y_pred.flatten()) ** 2) / np.sum((y_test - np.mean(y_test)) ** 2))
+if args.streaming:
+    # Exact metrics are accumulated batch by batch; only a bounded sample of
+    # predictions is kept for the plots and the model signature
+    eval_start = time.time()
+    test_metrics, X_test, y_test, y_pred = streaming.evaluate_streaming(model, test_ds)
+    eval_time = time.time() - eval_start
+    print(f"Evaluated {test_metrics['count']:,} test rows in {eval_time:.2f}s "
+          f"({test_metrics['count'] / eval_time:,.0f} samples/sec)")
+    mse = test_metrics['mse']
+    rmse = test_metrics['rmse']
+    mae = test_metrics['mae']
+    r2 = test_metrics['r2']
+else:
+    # Evaluate on test data
+    test_loss, test_mae = model.evaluate(X_test, y_test, verbose=0)
+    print(f"Test Mean Absolute Error: {test_mae:.4f}")
+    print(f"Test Mean Squared Error: {test_loss:.4f}")
+    print(f"Test Root Mean Squared Error: {np.sqrt(test_loss):.4f}")
+
+    # Make predictions
+    y_pred = model.predict(X_test)
+
+    # Calculate additional metrics
+    mse = np.mean((y_test - y_pred.flatten()) ** 2)
+    rmse = np.sqrt(mse)
+    mae = np.mean(np.abs(y_test - y_pred.flatten()))
+    r2 = 1 - (np.sum((y_test - y_pred.flatten()) ** 2) / np.sum((y_test - np.mean(y_test)) ** 2))
 
 print(f"Mean Squared Error: {mse:.4f}")
 print(f"Root Mean Squared Error: {rmse:.4f}")
@@ -318,102 +677,162 @@ print(f"R² Score: {r2:.4f}")
 
 # Log metrics to MLflow
 if mlflow_enabled:
-    mlflow.log_metric("test_mse", mse)
-    mlflow.log_metric("test_rmse", rmse)
-    mlflow.log_metric("test_mae", mae)
-    mlflow.log_metric("test_r2", r2)
-    mlflow.log_metric("training_time_seconds", training_time)
-
-# Visualize Training History
-plt.figure(figsize=(12, 4))
-
-# Plot training & validation loss values
-plt.subplot(1, 2, 1)
-plt.plot(history.history['loss'])
-plt.plot(history.history['val_loss'])
-plt.title('Model Loss')
-plt.ylabel('Loss (MSE)')
-plt.xlabel('Epoch')
-plt.legend(['Train', 'Validation'], loc='upper right')
-
-# Plot training & validation metrics
-plt.subplot(1, 2, 2)
-plt.plot(history.history['mae'])
-plt.plot(history.history['val_mae'])
-plt.title('Model Mean Absolute Error')
-plt.ylabel('MAE')
-plt.xlabel('Epoch')
-plt.legend(['Train', 'Validation'], loc='upper right')
-
-plt.tight_layout()
-plt.savefig(os.path.join(plots_dir, 'training_history.png'))
-plt.close()  # Close the figure
-plt.clf()    # Clear the figure
-
-# Visualize Predictions vs Actual
-plt.figure(figsize=(10, 6))
-plt.scatter(y_test, y_pred, alpha=0.5)
-plt.plot([min(y_test), max(y_test)], [min(y_test), max(y_test)], 'r--')
-plt.xlabel('Actual Rings')
-plt.ylabel('Predicted Rings')
-plt.title('Predicted vs Actual Abalone Rings')
-plt.savefig(os.path.join(plots_dir, 'predictions.png'))
-plt.close()  # Close the figure
-plt.clf()    # Clear the figure
+    mlflow_logger.log_metric("test_mse", mse)
+    mlflow_logger.log_metric("test_rmse", rmse)
+    mlflow_logger.log_metric("test_mae", mae)
+    mlflow_logger.log_metric("test_r2", r2)
+    mlflow_logger.log_metric("training_time_seconds", training_time)
+
+if history is not None:
+    epochs_run = len(history.history['loss'])
+    best_val_loss = float(min(history.history['val_loss']))
+else:
+    # Nothing was trained on this attempt; report the checkpoint that was used
+    epochs_run = 0
+    best_val_loss = float(best['value']) if best.get('value') is not None else float('nan')
+
+write_progress({'final': {
+    'epochs_run': epochs_run,
+    'best_val_loss': best_val_loss,
+    'test_mse': float(mse),
+    'test_rmse': float(rmse),
+    'test_mae': float(mae),
+    'test_r2': float(r2),
+    'training_time_seconds': training_time,
+    'num_workers': worker['num_workers'],
+    'replicas': strategy.num_replicas_in_sync,
+    # Only present when throughput was measured, so every value is numeric
+    **({'samples_per_sec': samples_per_sec} if measure_throughput else {}),
+}})
+
+# Visualize Training History and Predictions vs Actual in the background
+if history is not None:
+    artifact_worker.plot('training_history.png', 'training_history', history=dict(history.history))
+artifact_worker.plot('predictions.png', 'predictions',
+                     y_true=np.asarray(y_test), y_pred=np.asarray(y_pred).reshape(-1))
 
 # Log additional visualizations to MLflow
 if mlflow_enabled:
-    mlflow.log_artifact(os.path.join(plots_dir, 'training_history.png'))
-    mlflow.log_artifact(os.path.join(plots_dir, 'predictions.png'))
+    if history is not None:
+        artifact_worker.upload(os.path.join(plots_dir, 'training_history.png'))
+    artifact_worker.upload(os.path.join(plots_dir, 'predictions.png'))
 
-# Save the model in the native Keras format (.keras)
-model_path = os.path.join(model_dir, 'abalone_model.keras')
-model.save(model_path)  # Native Keras format - no need to specify save_format
-print(f"\nModel saved to {model_path} in native Keras format")
+# Export the model and preprocessor, timing each format. The model formats are
+# written one after another, while the preprocessor is written in parallel.
+from export import export_model
 
-# Save the preprocessor
+model_path = os.path.join(model_dir, 'abalone_model.keras')
+saved_model_path = os.path.join(model_dir, 'saved_model')
 preprocessor_path = os.path.join(model_dir, 'preprocessor.pkl')
-joblib.dump(preprocessor, preprocessor_path)
-print(f"Preprocessor saved to {preprocessor_path}")
 
-# Optional: Save a TensorFlow SavedModel format for deployment compatibility
-saved_model_path = os.path.join(model_dir, 'saved_model')
-tf.saved_model.save(model, saved_model_path)
-print(f"SavedModel also saved to {saved_model_path} for deployment compatibility")
 
-# Log additional artifacts and model
-if mlflow_enabled:
-    # Log visualizations
-    mlflow.log_artifact(os.path.join(plots_dir, 'training_history.png'))
-    mlflow.log_artifact(os.path.join(plots_dir, 'predictions.png'))
-    
-    # Log the preprocessor
-    mlflow.log_artifact(preprocessor_path)
-    
-    # Create model signature and log model
+def log_mlflow_model():
+    # Create the model signature from the test predictions computed above
+    # instead of running the model again
     from mlflow.models.signature import infer_signature
-    sample_input = X_test[:5]
-    sample_output = model.predict(sample_input)
-    signature = infer_signature(sample_input, sample_output)
-    
+    signature = infer_signature(np.asarray(X_test[:5]), np.asarray(y_pred[:5]))
+
     # Log model with signature
     mlflow.tensorflow.log_model(
         model,
         name="model",
         signature=signature,
-        registered_model_name="abalone-tensorflow-custom-callback-model"
+        registered_model_name="abalone-tensorflow-custom-callback-model" if args.register_model else None
     )
-    
+
+
+export_report = export_model(model, preprocessor, model_path, saved_model_path, preprocessor_path,
+                             log_mlflow_model=log_mlflow_model if mlflow_enabled else None)
+print(f"\nModel saved to {model_path} in native Keras format")
+print(f"Preprocessor saved to {preprocessor_path}")
+print(f"SavedModel also saved to {saved_model_path} for deployment compatibility")
+
+print(f"Export finished in {export_report['total_seconds']:.2f}s:")
+for name, entry in export_report.items():
+    if name == 'total_seconds':
+        continue
+    size = f"{entry['bytes'] / 1024:,.1f} KiB" if entry['bytes'] is not None else "n/a"
+    print(f"  {name}: {entry['seconds']:.2f}s, {size}")
+
+export_report_path = os.path.join(model_dir, 'export_report.json')
+with open(export_report_path, 'w') as f:
+    json.dump(export_report, f, indent=2)
+
+# Optionally export quantized CPU artifacts and compare them with the float32 model
+if args.quantize and worker['is_chief']:
+    import quantize
+
+    quantize_formats = quantize.parse_formats(args.quantize)
+    num_calibration = args.quantize_calibration_samples
+    if args.streaming:
+        calibration_batches = -(-num_calibration // batch_size)
+        X_calibration = np.concatenate([x.numpy() for x, _ in train_ds.take(calibration_batches)])[:num_calibration]
+    else:
+        calibration_rows = np.random.default_rng(42).choice(
+            len(X_train), size=min(num_calibration, len(X_train)), replace=False)
+        X_calibration = np.asarray(X_train)[np.sort(calibration_rows)]
+
+    print(f"\nExporting quantized models ({', '.join(quantize_formats)}), "
+          f"calibrated on {len(X_calibration)} training rows...")
+    quantized_dir = os.path.join(model_dir, 'quantized')
+    quantize_rows, recommended_format = quantize.export_and_benchmark(
+        model, model_path, saved_model_path, quantized_dir, quantize_formats,
+        X_calibration, X_test, y_test, tolerance=args.quantize_tolerance)
+    print(quantize.format_table(quantize_rows))
+    print(f"Fastest artifact within MAE tolerance {args.quantize_tolerance}: {recommended_format}")
+
+    quantize_report_path = os.path.join(quantized_dir, 'quantization_benchmark.csv')
+    quantize.write_csv(quantize_rows, quantize_report_path)
+
+    if mlflow_enabled:
+        artifact_worker.upload(quantize_report_path)
+        for row in quantize_rows:
+            if 'path' in row:
+                artifact_worker.upload(row['path'], 'quantized')
+            prefix = f"quant_{row['format'].replace('-', '_')}"
+            for key in ('mae', 'mae_delta', 'single_row_ms', 'batch_rows_per_sec', 'bytes'):
+                mlflow_logger.log_metric(f"{prefix}_{key}", row[key])
+        mlflow_logger.set_tag("quantized_recommended", recommended_format)
+
+# Log additional artifacts and model
+if mlflow_enabled:
+    # Log the preprocessor and the export timings
+    artifact_worker.upload(preprocessor_path)
+    artifact_worker.upload(export_report_path)
+    mlflow_logger.log_metric("export_total_seconds", export_report['total_seconds'])
+    for name, entry in export_report.items():
+        if name == 'total_seconds':
+            continue
+        mlflow_logger.log_metric(f"export_{name}_seconds", entry['seconds'])
+        if entry['bytes'] is not None:
+            mlflow_logger.log_metric(f"export_{name}_bytes", entry['bytes'])
+
     print("Model and artifacts logged to MLflow")
     
+    # Wait for the artifact worker to finish rendering and uploading
+    artifact_worker.close()
+    print(f"Artifact worker uploaded {len(artifact_worker.uploaded)} artifact(s) "
+          f"with {len(artifact_worker.errors)} error(s)")
+
+    # Drain the background logger before closing the run
+    mlflow_logger.close()
+    stats = mlflow_logger.stats
+    print(f"MLflow logging totals: {stats['metrics_logged']} metrics, {stats['params_logged']} params, "
+          f"{stats['artifacts_logged']} artifacts in {stats['batches_sent']} batch(es); "
+          f"{stats['logging_seconds']:.2f}s in background, {stats['enqueue_wait_seconds']:.3f}s blocking, "
+          f"{stats['errors']} error(s)")
+
     # End the MLflow run
     mlflow.end_run()
     print(f"MLflow run {run_id} completed with custom callback")
 
+# Wait for any plots still rendering (no-op if the worker was already closed)
+artifact_worker.close()
+distributed.cleanup_worker_dir(model_dir, worker)
+
 print("\nTraining complete!")
 
 # Final memory cleanup
-plt.close('all')  # Close any remaining matplotlib figures
 tf.keras.backend.clear_session()  # Clear TensorFlow session
 gc.collect()  # Force garbage collection
 
@@ -0,0 +1,411 @@
+"""
+Load test for vLLM endpoints: replays a prompt set and measures latency.
+
+Requests are sent either at a fixed concurrency (each worker sends its next
+prompt as soon as the previous one finishes) or at a target request rate with
+Poisson arrivals, capped at the same concurrency. For every request it
+records:
+
+    ttft_ms         time to first token, from sending the request to the
+                    first streamed token
+    itl_ms          inter-token latency, the gaps between streamed tokens
+    e2e_ms          end-to-end latency of the whole completion
+    queue_ms        time a request waited for a free worker after its
+                    scheduled arrival (request rate only)
+    output_tokens   completion tokens, from the usage the server reports
+
+and summarizes them as p50/p90/p99 with the request and output token
+throughput. TTFT and ITL need a streamed response; they are left empty when
+whole completions are requested (stream=False).
+
+At a request rate, TTFT and end-to-end latency are timed from the scheduled
+arrival rather than from when a worker got to the request. Otherwise a
+saturated endpoint would hold back the requests behind it and never have
+their waiting time counted (coordinated omission).
+
+Both transports stream the server's server-sent events, which SSEParser
+splits into events however the bytes are chunked:
+    HTTPTransport       an OpenAI-compatible server such as vLLM or
+                        mock_server.py
+    SageMakerTransport  a SageMaker endpoint, through
+                        invoke_endpoint_with_response_stream
+"""
+
+import csv
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+DEFAULT_PROMPTS = [
+    "Write a python code to generate n prime numbers",
+    "Write a Python function to calculate fibonacci numbers",
+    "Explain machine learning",
+    "Summarize the causes of the French Revolution in three paragraphs",
+    "What is the difference between a process and a thread?",
+    "Write a haiku about autumn rain",
+    "Explain how a hash map handles collisions",
+    "Translate 'Where is the train station?' into French, German and Spanish",
+]
+
+
+def load_prompts(path=None):
+    """Prompts from a .jsonl file (strings or {"prompt": ...}) or one per line."""
+    if not path:
+        return list(DEFAULT_PROMPTS)
+    prompts = []
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                prompts.append(record if isinstance(record, str) else record["prompt"])
+            else:
+                prompts.append(line)
+    if not prompts:
+        raise ValueError(f"No prompts in {path}")
+    return prompts
+
+
+def build_payload(prompt, max_tokens, temperature, model=None, stream=False):
+    """Chat completion request with the sampling settings of invoke_endpoint."""
+    payload = {
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+        "top_p": 0.9,
+        "top_k": 50,
+    }
+    if model:
+        payload["model"] = model
+    if stream:
+        payload["stream"] = True
+        # Ask for the token count in a final chunk
+        payload["stream_options"] = {"include_usage": True}
+    return payload
+
+
+class SSEParser:
+    """Incremental server-sent events parser; feed() returns complete events' data."""
+
+    def __init__(self):
+        self.buffer = b""
+        self.data = []
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        events = []
+        # Only whole lines are decoded, so a character split across chunks
+        # waits for the rest of it
+        while True:
+            newline = self.buffer.find(b"\n")
+            if newline < 0:
+                break
+            line = self.buffer[:newline].rstrip(b"\r")
+            self.buffer = self.buffer[newline + 1 :]
+            if not line:
+                if self.data:
+                    events.append("\n".join(self.data))
+                    self.data = []
+            elif line.startswith(b"data:"):
+                self.data.append(line[5:].removeprefix(b" ").decode("utf-8"))
+        return events
+
+
+def iter_completion(chunks):
+    """(text, usage) for each event in a streamed completion, until [DONE]."""
+    parser = SSEParser()
+    done = False
+    # Chunks after [DONE] are still read, so a kept-alive connection ends the
+    # response cleanly
+    for chunk in chunks:
+        for data in parser.feed(chunk):
+            done = done or data == "[DONE]"
+            if done:
+                continue
+            event = json.loads(data)
+            if "error" in event:
+                raise RuntimeError(f"Server error: {event['error']}")
+            text = "".join(
+                (choice.get("delta") or {}).get("content") or choice.get("text") or ""
+                for choice in event.get("choices", [])
+            )
+            yield text, event.get("usage")
+
+
+def completion_tokens(response):
+    """Completion token count from a response's usage, if it reports one."""
+    return (response.get("usage") or {}).get("completion_tokens")
+
+
+class HTTPTransport:
+    """OpenAI-compatible server; a URL without a path uses /v1/chat/completions."""
+
+    def __init__(self, url, timeout=600):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port
+        self.https = parts.scheme == "https"
+        self.path = parts.path.rstrip("/") or "/v1/chat/completions"
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connection(self):
+        if getattr(self.local, "connection", None) is None:
+            if self.https:
+                cls = http.client.HTTPSConnection
+            else:
+                cls = http.client.HTTPConnection
+            self.local.connection = cls(self.host, self.port, timeout=self.timeout)
+        return self.local.connection
+
+    def _post(self, payload):
+        body = json.dumps(payload).encode()
+        headers = {"Content-Type": "application/json"}
+        # A kept-alive connection the server has since closed fails once;
+        # retry on a fresh one
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request("POST", self.path, body=body, headers=headers)
+                response = connection.getresponse()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                connection.close()
+                self.local.connection = None
+                if attempt:
+                    raise
+        if response.status != 200:
+            error = response.read()[:200].decode(errors="replace")
+            raise RuntimeError(f"Server returned {response.status}: {error}")
+        return response
+
+    def invoke(self, payload):
+        return json.loads(self._post(payload).read())
+
+    def stream(self, payload):
+        """Raw response bytes as they arrive."""
+        response = self._post(payload)
+        while True:
+            chunk = response.read1(65536)
+            if not chunk:
+                break
+            yield chunk
+
+
+class SageMakerTransport:
+    def __init__(self, endpoint_name, region=None, pool_size=10):
+        import boto3
+        from botocore.config import Config
+
+        self.endpoint_name = endpoint_name
+        self.client = boto3.client(
+            "sagemaker-runtime",
+            region_name=region,
+            config=Config(max_pool_connections=pool_size, read_timeout=600),
+        )
+
+    def invoke(self, payload):
+        response = self.client.invoke_endpoint(
+            EndpointName=self.endpoint_name,
+            ContentType="application/json",
+            Body=json.dumps(payload),
+        )
+        return json.loads(response["Body"].read())
+
+    def stream(self, payload):
+        """Raw response bytes as they arrive, one PayloadPart at a time."""
+        response = self.client.invoke_endpoint_with_response_stream(
+            EndpointName=self.endpoint_name,
+            ContentType="application/json",
+            Accept="text/event-stream",
+            Body=json.dumps(payload),
+        )
+        for event in response["Body"]:
+            if "PayloadPart" in event:
+                yield event["PayloadPart"]["Bytes"]
+            elif "ModelStreamError" in event or "InternalStreamFailure" in event:
+                error = event.get("ModelStreamError") or event["InternalStreamFailure"]
+                raise RuntimeError(f"Stream failed: {error.get('Message', error)}")
+
+
+def send_request(
+    transport, request_id, prompt, start_time, stream=True, scheduled=None, **options
+):
+    """Send one prompt and time it; failures are recorded, not raised.
+
+    With a scheduled arrival time, latencies include the wait for a worker.
+    """
+    sent = time.perf_counter()
+    if scheduled is None:
+        scheduled = sent
+    record = {
+        "request_id": request_id,
+        "start_s": sent - start_time,
+        "prompt_chars": len(prompt),
+        "output_tokens": None,
+        "queue_ms": (sent - scheduled) * 1000.0,
+        "ttft_ms": None,
+        "e2e_ms": None,
+        "tpot_ms": None,
+        "error": "",
+    }
+    itl = []
+    try:
+        if stream and hasattr(transport, "stream"):
+            payload = build_payload(prompt, stream=True, **options)
+            chunks, usage, last = 0, None, None
+            for text, event_usage in iter_completion(transport.stream(payload)):
+                usage = event_usage or usage
+                if not text:
+                    continue
+                now = time.perf_counter()
+                if last is None:
+                    record["ttft_ms"] = (now - scheduled) * 1000.0
+                else:
+                    itl.append((now - last) * 1000.0)
+                last = now
+                chunks += 1
+            # vLLM streams about one token per chunk; prefer the exact count
+            record["output_tokens"] = (usage or {}).get("completion_tokens") or chunks
+        else:
+            response = transport.invoke(build_payload(prompt, **options))
+            record["output_tokens"] = completion_tokens(response)
+        record["e2e_ms"] = (time.perf_counter() - scheduled) * 1000.0
+        tokens = record["output_tokens"]
+        if record["ttft_ms"] is not None and tokens and tokens > 1:
+            # Time per output token after the first
+            record["tpot_ms"] = (record["e2e_ms"] - record["ttft_ms"]) / (tokens - 1)
+    except Exception as e:
+        record["error"] = str(e) or type(e).__name__
+    return record, itl
+
+
+def percentiles(values, qs=(50, 90, 99)):
+    """Linearly interpolated percentiles; None for an empty list."""
+    values = sorted(values)
+    result = {}
+    for q in qs:
+        if not values:
+            result[q] = None
+            continue
+        rank = (len(values) - 1) * q / 100.0
+        low = int(rank)
+        high = min(low + 1, len(values) - 1)
+        result[q] = values[low] + (values[high] - values[low]) * (rank - low)
+    return result
+
+
+def run(
+    transport,
+    prompts,
+    num_requests=100,
+    concurrency=8,
+    request_rate=None,
+    stream=True,
+    seed=0,
+    **options,
+):
+    """Replay prompts against a transport; returns (summary, records).
+
+    options are passed to build_payload: max_tokens, temperature and model.
+    """
+    rng = random.Random(seed)
+    start_time = time.perf_counter()
+    futures = []
+    with ThreadPoolExecutor(concurrency, thread_name_prefix="bench") as pool:
+        next_send = start_time
+        for i in range(num_requests):
+            scheduled = None
+            if request_rate:
+                # Poisson arrivals; requests beyond the concurrency wait in the
+                # pool, and that wait counts towards their latency
+                next_send += rng.expovariate(request_rate)
+                delay = next_send - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                scheduled = next_send
+            prompt = prompts[i % len(prompts)]
+            futures.append(
+                pool.submit(
+                    send_request,
+                    transport,
+                    i,
+                    prompt,
+                    start_time,
+                    stream,
+                    scheduled,
+                    **options,
+                )
+            )
+        results = [future.result() for future in futures]
+    duration = time.perf_counter() - start_time
+
+    records = [record for record, _ in results]
+    completed = [record for record in records if not record["error"]]
+    output_tokens = sum(record["output_tokens"] or 0 for record in completed)
+    summary = {
+        "requests": num_requests,
+        "completed": len(completed),
+        "failed": num_requests - len(completed),
+        "concurrency": concurrency,
+        "request_rate": request_rate,
+        "duration_s": duration,
+        "requests_per_sec": len(completed) / duration if duration > 0 else 0.0,
+        "output_tokens": output_tokens,
+        "output_tokens_per_sec": output_tokens / duration if duration > 0 else 0.0,
+    }
+    metrics = {
+        "ttft": [r["ttft_ms"] for r in completed if r["ttft_ms"] is not None],
+        "itl": [gap for record, gaps in results if not record["error"] for gap in gaps],
+        "e2e": [r["e2e_ms"] for r in completed],
+        "queue": [r["queue_ms"] for r in completed],
+    }
+    for name, values in metrics.items():
+        for q, value in percentiles(values).items():
+            summary[f"{name}_p{q}_ms"] = value
+    return summary, records
+
+
+def format_summary(summary):
+    def ms(name):
+        values = [summary[f"{name}_p{q}_ms"] for q in (50, 90, 99)]
+        if values[0] is None:
+            return "n/a (needs a streamed response)"
+        return " / ".join(f"{value:,.1f}" for value in values) + " ms"
+
+    rate = summary["request_rate"]
+    return "\n".join(
+        [
+            f"Requests:            {summary['completed']:,} completed, "
+            f"{summary['failed']:,} failed in {summary['duration_s']:.1f} s "
+            f"(concurrency {summary['concurrency']}"
+            + (f", {rate:g} req/s offered)" if rate else ")"),
+            f"Throughput:          {summary['requests_per_sec']:,.2f} req/s, "
+            f"{summary['output_tokens_per_sec']:,.1f} output tokens/s",
+            f"TTFT p50/p90/p99:    {ms('ttft')}",
+            f"ITL p50/p90/p99:     {ms('itl')}",
+            f"E2E p50/p90/p99:     {ms('e2e')}",
+        ]
+        + ([f"Queue p50/p90/p99:   {ms('queue')}"] if rate else [])
+    )
+
+
+def write_report(path, summary, records, config=None):
+    """Per-request rows as CSV, or the summary and every request as JSON."""
+    if path.endswith(".csv"):
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(records[0]))
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        with open(path, "w") as f:
+            json.dump(
+                {"config": config or {}, "summary": summary, "requests": records},
+                f,
+                indent=2,
+            )
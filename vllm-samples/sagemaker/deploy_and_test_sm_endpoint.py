@@ -1,10 +1,11 @@
 import argparse
 import json
 import os
-import sagemaker
-from sagemaker.model import Model
-from sagemaker import serializers
-from sagemaker.predictor import Predictor
+import sys
+import time
+
+import benchmark
+from mock_server import MockServer, add_mock_arguments
 
 
 def deploy_endpoint(
@@ -12,6 +13,8 @@ def deploy_endpoint(
 ):
     """Deploy vLLM model to SageMaker endpoint"""
     try:
+        from sagemaker.model import Model
+
         print(f"Starting deployment of endpoint: {endpoint_name}")
         print(f"Using image: {container_uri}")
         print(f"Instance type: {instance_type}")
@@ -63,6 +66,9 @@ def cleanup_endpoint(endpoint_name):
 def invoke_endpoint(endpoint_name, prompt, max_tokens=2400, temperature=0.01):
     """Invoke SageMaker endpoint with vLLM model for text generation"""
     try:
+        from sagemaker import serializers
+        from sagemaker.predictor import Predictor
+
         predictor = Predictor(
             endpoint_name=endpoint_name,
             serializer=serializers.JSONSerializer(),
@@ -95,8 +101,160 @@ def invoke_endpoint(endpoint_name, prompt, max_tokens=2400, temperature=0.01):
         return None
 
 
+def invoke_endpoint_stream(
+    endpoint_name, prompt, max_tokens=2400, temperature=0.01, stats=None
+):
+    """Stream tokens from SageMaker endpoint as they are generated
+
+    stats, if given, is filled with ttft_ms, total_ms and output_tokens.
+    """
+    transport = benchmark.SageMakerTransport(endpoint_name)
+    payload = benchmark.build_payload(prompt, max_tokens, temperature, stream=True)
+    stats = {} if stats is None else stats
+    start = time.perf_counter()
+    chunks, usage = 0, None
+    for text, event_usage in benchmark.iter_completion(transport.stream(payload)):
+        usage = event_usage or usage
+        if not text:
+            continue
+        if chunks == 0:
+            stats["ttft_ms"] = (time.perf_counter() - start) * 1000.0
+        chunks += 1
+        yield text
+    stats["total_ms"] = (time.perf_counter() - start) * 1000.0
+    stats["output_tokens"] = (usage or {}).get("completion_tokens") or chunks
+
+
+def print_streamed_response(endpoint_name, prompt, max_tokens=2400, temperature=0.01):
+    """Print tokens as they arrive, then time to first token and total latency"""
+    stats = {}
+    try:
+        print("\nResponse from endpoint:")
+        for token in invoke_endpoint_stream(
+            endpoint_name, prompt, max_tokens, temperature, stats
+        ):
+            print(token, end="", flush=True)
+        print()
+    except Exception as e:
+        print(f"\nInference failed: {str(e)}")
+        return False
+
+    if "ttft_ms" not in stats:
+        print("No response received from the endpoint.")
+        return False
+    tokens = stats["output_tokens"]
+    decode_s = (stats["total_ms"] - stats["ttft_ms"]) / 1000.0
+    print(f"\nTime to first token: {stats['ttft_ms']:,.0f} ms")
+    print(f"Total latency: {stats['total_ms'] / 1000.0:,.2f} s for {tokens} tokens")
+    if tokens > 1 and decode_s > 0:
+        print(f"Decode rate: {(tokens - 1) / decode_s:,.1f} tokens/s")
+    return True
+
+
+def run_benchmark(argv):
+    """Load-test an endpoint, a URL or the bundled mock server"""
+    parser = argparse.ArgumentParser(
+        prog="deploy_and_test_sm_endpoint.py benchmark",
+        description="Replay prompts against a vLLM endpoint and report latency",
+    )
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--endpoint-name", help="Existing SageMaker endpoint")
+    target.add_argument("--url", help="OpenAI-compatible server, e.g. http://host:8000")
+    target.add_argument(
+        "--mock", action="store_true", help="Start the bundled mock server (offline)"
+    )
+    parser.add_argument("--region", default=None, help="AWS region of the endpoint")
+    parser.add_argument("--model", default=None, help="Model name sent with --url")
+    parser.add_argument(
+        "--prompts", default=None, help=".jsonl or one-per-line prompt file"
+    )
+    parser.add_argument("--num-requests", type=int, default=100)
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="Requests in flight at most"
+    )
+    parser.add_argument(
+        "--request-rate",
+        type=float,
+        default=None,
+        help="Requests/sec, Poisson arrivals (default: as fast as concurrency allows)",
+    )
+    parser.add_argument("--max-tokens", type=int, default=256, help="Maximum tokens")
+    parser.add_argument(
+        "--temperature", type=float, default=0.01, help="Sampling temperature"
+    )
+    parser.add_argument(
+        "--no-stream",
+        action="store_true",
+        help="Request whole completions (no TTFT or ITL)",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for arrival times")
+    parser.add_argument("--output", default=None, help="Write a .json or .csv report")
+    parser.add_argument(
+        "--cleanup", action="store_true", help="Delete --endpoint-name afterwards"
+    )
+    add_mock_arguments(parser, prefix="mock-")
+    args = parser.parse_args(argv)
+
+    mock = None
+    if args.mock:
+        mock = MockServer(
+            ttft_ms=args.mock_ttft_ms,
+            tokens_per_sec=args.mock_tokens_per_sec,
+            output_tokens=args.mock_output_tokens,
+            max_concurrency=args.mock_max_concurrency,
+            jitter=args.mock_jitter,
+        ).start()
+        print(f"Mock server listening at {mock.url}")
+        transport = benchmark.HTTPTransport(mock.url)
+    elif args.url:
+        transport = benchmark.HTTPTransport(args.url)
+    else:
+        transport = benchmark.SageMakerTransport(
+            args.endpoint_name, args.region, pool_size=args.concurrency
+        )
+
+    try:
+        prompts = benchmark.load_prompts(args.prompts)
+        print(
+            f"Sending {args.num_requests} requests ({len(prompts)} distinct prompts)..."
+        )
+        summary, records = benchmark.run(
+            transport,
+            prompts,
+            num_requests=args.num_requests,
+            concurrency=args.concurrency,
+            request_rate=args.request_rate,
+            stream=not args.no_stream,
+            seed=args.seed,
+            max_tokens=args.max_tokens,
+            temperature=args.temperature,
+            model=args.model,
+        )
+        print("\n" + benchmark.format_summary(summary))
+        errors = [record["error"] for record in records if record["error"]]
+        if errors:
+            print(f"First error: {errors[0]}")
+        if args.output:
+            benchmark.write_report(args.output, summary, records, vars(args))
+            print(f"Report written to {args.output}")
+    finally:
+        if mock is not None:
+            mock.stop()
+        if args.cleanup and args.endpoint_name:
+            print("\nCleaning up resources...")
+            cleanup_endpoint(args.endpoint_name)
+
+
 def main():
-    parser = argparse.ArgumentParser(description="SageMaker vLLM Inference")
+    # "benchmark" load-tests an endpoint instead of running the workflow
+    if len(sys.argv) > 1 and sys.argv[1] == "benchmark":
+        run_benchmark(sys.argv[2:])
+        return
+
+    parser = argparse.ArgumentParser(
+        description="SageMaker vLLM Inference",
+        epilog="Run with 'benchmark --help' for the load-test mode.",
+    )
     parser.add_argument(
         "--endpoint-name", required=True, help="SageMaker endpoint name"
     )
@@ -131,6 +289,16 @@ def main():
     parser.add_argument(
         "--temperature", type=float, default=0.01, help="Sampling temperature"
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print tokens as they arrive and report time to first token",
+    )
+    parser.add_argument(
+        "--keep-endpoint",
+        action="store_true",
+        help="Skip cleanup, e.g. to benchmark the endpoint afterwards",
+    )
 
     args = parser.parse_args()
 
@@ -151,23 +319,34 @@ def main():
 
     # Run inference
     print("\nSending request to endpoint...")
-    response = invoke_endpoint(
-        endpoint_name=args.endpoint_name,
-        prompt=args.prompt,
-        max_tokens=args.max_tokens,
-        temperature=args.temperature,
-    )
+    if args.stream:
+        print_streamed_response(
+            endpoint_name=args.endpoint_name,
+            prompt=args.prompt,
+            max_tokens=args.max_tokens,
+            temperature=args.temperature,
+        )
+    else:
+        response = invoke_endpoint(
+            endpoint_name=args.endpoint_name,
+            prompt=args.prompt,
+            max_tokens=args.max_tokens,
+            temperature=args.temperature,
+        )
 
-    if response:
-        print("\nResponse from endpoint:")
-        if isinstance(response, (dict, list)):
-            print(json.dumps(response, indent=2))
+        if response:
+            print("\nResponse from endpoint:")
+            if isinstance(response, (dict, list)):
+                print(json.dumps(response, indent=2))
+            else:
+                print(response)
         else:
-            print(response)
-    else:
-        print("No response received from the endpoint.")
+            print("No response received from the endpoint.")
 
     # Cleanup
+    if args.keep_endpoint:
+        print(f"\nKeeping endpoint {args.endpoint_name}; it is billed until deleted.")
+        return
     print("\nCleaning up resources...")
     cleanup_endpoint(args.endpoint_name)
 
@@ -0,0 +1,255 @@
+"""
+Local mock of an OpenAI-compatible vLLM server, for benchmarking offline.
+
+Serves POST /v1/chat/completions, /v1/completions and the SageMaker route
+/invocations, plus GET /ping and /health. Responses are made-up text, but
+their timing can be configured: the first token arrives after --ttft-ms and
+the rest follow at --tokens-per-sec per request. Requests with "stream": true
+get server-sent events in the OpenAI chunk format. At most --max-concurrency
+requests are served at once and the rest wait their turn, so time-to-first-
+token grows under load as it does on a saturated endpoint.
+
+    python mock_server.py --port 8000 --ttft-ms 150 --tokens-per-sec 40
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = (
+    "the quick brown fox jumps over a lazy dog while the model keeps on "
+    "generating tokens at a steady and configurable rate"
+).split()
+ROUTES = ("/v1/chat/completions", "/v1/completions", "/invocations")
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and each small SSE chunk are separate writes; with Nagle's
+    # algorithm they would wait for the client's delayed ACK and inflate TTFT
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path in ("/ping", "/health"):
+            self._send_json(200, {})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path not in ROUTES:
+            self._send_json(404, {"error": "Not found"})
+            return
+        try:
+            request = json.loads(body)
+        except json.JSONDecodeError as e:
+            self._send_json(400, {"error": f"Invalid JSON: {e}"})
+            return
+
+        chat = self.path != "/v1/completions" and "prompt" not in request
+        config = self.server.config
+        num_tokens = min(request.get("max_tokens") or 16, config["output_tokens"])
+        # Roughly one token per word
+        prompt = request.get("messages") or request.get("prompt", "")
+        prompt_tokens = len(json.dumps(prompt).split())
+        jitter = random.uniform(1 - config["jitter"], 1 + config["jitter"])
+
+        # Wait for a free slot, then prefill and decode
+        with self.server.slots:
+            time.sleep(config["ttft_ms"] / 1000.0 * jitter)
+            try:
+                if request.get("stream"):
+                    self._stream(request, chat, num_tokens, prompt_tokens)
+                else:
+                    time.sleep(max(0, num_tokens - 1) / config["tokens_per_sec"])
+                    text = "".join(_token(i) for i in range(num_tokens))
+                    choice = {"index": 0, "finish_reason": "length"}
+                    if chat:
+                        choice["message"] = {"role": "assistant", "content": text}
+                    else:
+                        choice["text"] = text
+                    usage = _usage(prompt_tokens, num_tokens)
+                    self._send_json(200, _response(request, chat, [choice], usage))
+            except (BrokenPipeError, ConnectionResetError):
+                # The client went away mid-response
+                self.close_connection = True
+
+    def _stream(self, request, chat, num_tokens, prompt_tokens):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        response_id = f"mock-{uuid.uuid4().hex}"
+        interval = 1.0 / self.server.config["tokens_per_sec"]
+        for i in range(num_tokens):
+            if i:
+                time.sleep(interval)
+            last = i == num_tokens - 1
+            choice = {"index": 0, "finish_reason": "length" if last else None}
+            if chat:
+                choice["delta"] = {"content": _token(i)}
+            else:
+                choice["text"] = _token(i)
+            self._event(_response(request, chat, [choice], chunk=True, id=response_id))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            usage = _usage(prompt_tokens, num_tokens)
+            self._event(_response(request, chat, [], usage, True, response_id))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _event(self, body):
+        self._write_chunk(f"data: {json.dumps(body)}\n\n".encode())
+
+
+def _token(i):
+    return WORDS[i % len(WORDS)] + " "
+
+
+def _usage(prompt_tokens, completion_tokens):
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _response(request, chat, choices, usage=None, chunk=False, id=None):
+    if chat:
+        kind = "chat.completion.chunk" if chunk else "chat.completion"
+    else:
+        kind = "text_completion"
+    body = {
+        "id": id or f"mock-{uuid.uuid4().hex}",
+        "object": kind,
+        "created": int(time.time()),
+        "model": request.get("model", "mock"),
+        "choices": choices,
+    }
+    if usage:
+        body["usage"] = usage
+    return body
+
+
+class MockServer:
+    """Serve the mock on a background thread; port 0 picks a free port."""
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        ttft_ms=150.0,
+        tokens_per_sec=40.0,
+        output_tokens=256,
+        max_concurrency=32,
+        jitter=0.1,
+    ):
+        self.server = ThreadingHTTPServer((host, port), MockHandler)
+        self.server.daemon_threads = True
+        self.server.slots = threading.BoundedSemaphore(max_concurrency)
+        self.server.config = {
+            "ttft_ms": ttft_ms,
+            "tokens_per_sec": tokens_per_sec,
+            "output_tokens": output_tokens,
+            "jitter": jitter,
+        }
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, name="mock-server", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_mock_arguments(parser, prefix=""):
+    """Mock server options; benchmark mode adds them with a "mock-" prefix."""
+    parser.add_argument(
+        f"--{prefix}ttft-ms", type=float, default=150.0, help="Time to first token"
+    )
+    parser.add_argument(
+        f"--{prefix}tokens-per-sec",
+        type=float,
+        default=40.0,
+        help="Decode rate of each request",
+    )
+    parser.add_argument(
+        f"--{prefix}output-tokens",
+        type=int,
+        default=256,
+        help="Longest completion, capped by max_tokens",
+    )
+    parser.add_argument(
+        f"--{prefix}max-concurrency",
+        type=int,
+        default=32,
+        help="Requests served at once; the rest queue",
+    )
+    parser.add_argument(
+        f"--{prefix}jitter",
+        type=float,
+        default=0.1,
+        help="Random +/- fraction applied to the TTFT",
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible vLLM server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    mock = MockServer(
+        args.host,
+        args.port,
+        args.ttft_ms,
+        args.tokens_per_sec,
+        args.output_tokens,
+        args.max_concurrency,
+        args.jitter,
+    )
+    print(f"Mock server listening at {mock.url}")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mock.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
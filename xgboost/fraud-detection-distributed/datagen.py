@@ -0,0 +1,146 @@
+"""
+Out-of-core synthetic fraud data generator.
+
+Produces the same kind of data as sklearn's make_classification (informative
+features drawn from Gaussian clusters on hypercube vertices, linear redundant
+features, noise features, 1% label noise), without ever holding the full
+dataset in memory:
+
+- The class structure (cluster centroids and covariance transforms, the
+  redundant-feature mix and the column order) is derived from the seed
+  alone, so every process generates from the same distribution.
+- Rows are generated in fixed blocks of BLOCK_ROWS, each seeded by (seed,
+  block index). Any row range can be produced independently and always comes
+  out identical, whatever the chunk size, partition count or number of
+  processes.
+- Each block contains exactly its share of positives, so every range has the
+  requested fraud rate, before label noise.
+
+write_partition turns one row range into a train and a validation file in any
+of the partition formats in formats.py, split 80/20 within each class, one
+chunk at a time. Peak memory per process is proportional to the chunk size.
+"""
+
+import numpy as np
+import pandas as pd
+
+import formats
+
+BLOCK_ROWS = 4096
+N_FEATURES = 30
+N_INFORMATIVE = 15
+N_REDUNDANT = 5
+N_CLUSTERS_PER_CLASS = 2
+CLASS_SEP = 1.0
+FLIP_Y = 0.01
+VALIDATION_FRACTION = 0.2
+
+
+def class_structure(seed):
+    """Cluster centroids and transforms shared by every block of a dataset."""
+    rng = np.random.default_rng([seed, 0xC1A55])
+    n_clusters = 2 * N_CLUSTERS_PER_CLASS
+
+    # Centroids on distinct vertices of a hypercube with side 2 * class_sep
+    vertices = rng.choice(2 ** N_INFORMATIVE, size=n_clusters, replace=False)
+    bits = (vertices[:, None] >> np.arange(N_INFORMATIVE)) & 1
+    centroids = bits * 2.0 * CLASS_SEP - CLASS_SEP
+
+    return {
+        "centroids": centroids,
+        # Random linear transform per cluster gives each its own covariance
+        "transforms": 2 * rng.uniform(size=(n_clusters, N_INFORMATIVE, N_INFORMATIVE)) - 1,
+        "redundant": 2 * rng.uniform(size=(N_INFORMATIVE, N_REDUNDANT)) - 1,
+        "permutation": rng.permutation(N_FEATURES),
+    }
+
+
+def positives_before(row, fraud_rate):
+    """Number of positives among the first `row` rows of the dataset."""
+    return int(round(row * fraud_rate))
+
+
+def generate_block(seed, block, num_samples, fraud_rate, structure):
+    """Rows of one block as (X float64 [n, 30], y int [n], validation mask [n])."""
+    start = block * BLOCK_ROWS
+    n = min(BLOCK_ROWS, num_samples - start)
+    n_pos = positives_before(start + n, fraud_rate) - positives_before(start, fraud_rate)
+    rng = np.random.default_rng([seed, block + 1])
+
+    y = np.zeros(n, dtype=np.int64)
+    y[:n_pos] = 1
+    rng.shuffle(y)
+
+    # Each class is a mix of its own clusters: class c owns clusters c, c + 2, ...
+    cluster = 2 * rng.integers(N_CLUSTERS_PER_CLASS, size=n) + y
+    X_informative = rng.standard_normal((n, N_INFORMATIVE))
+    for k, transform in enumerate(structure["transforms"]):
+        rows = cluster == k
+        X_informative[rows] = X_informative[rows] @ transform
+    X_informative += structure["centroids"][cluster]
+
+    X = np.empty((n, N_FEATURES))
+    X[:, :N_INFORMATIVE] = X_informative
+    X[:, N_INFORMATIVE:N_INFORMATIVE + N_REDUNDANT] = X_informative @ structure["redundant"]
+    X[:, N_INFORMATIVE + N_REDUNDANT:] = rng.standard_normal((n, N_FEATURES - N_INFORMATIVE - N_REDUNDANT))
+    X = X[:, structure["permutation"]]
+
+    # Stratified split: the same fraction of each class goes to validation.
+    # It is drawn before label noise, so the split follows the true classes
+    validation = np.zeros(n, dtype=bool)
+    for label in (0, 1):
+        rows = np.flatnonzero(y == label)
+        validation[rng.permutation(rows)[:int(round(len(rows) * VALIDATION_FRACTION))]] = True
+
+    flip = rng.uniform(size=n) < FLIP_Y
+    y[flip] = rng.integers(2, size=int(flip.sum()))
+    return X, y, validation
+
+
+def generate_range(seed, start, stop, num_samples, fraud_rate, structure=None):
+    """Rows [start, stop) of the dataset as (X, y, validation mask)."""
+    structure = structure or class_structure(seed)
+    first, last = start // BLOCK_ROWS, (stop - 1) // BLOCK_ROWS
+    parts = [generate_block(seed, block, num_samples, fraud_rate, structure) for block in range(first, last + 1)]
+    X, y, validation = (np.concatenate(arrays) for arrays in zip(*parts))
+    offset = start - first * BLOCK_ROWS
+    return X[offset:offset + stop - start], y[offset:offset + stop - start], validation[offset:offset + stop - start]
+
+
+def partition_range(partition, num_partitions, num_samples):
+    """Balanced global row range [start, stop) of one partition."""
+    return partition * num_samples // num_partitions, (partition + 1) * num_samples // num_partitions
+
+
+def write_partition(seed, num_samples, fraud_rate, partition, num_partitions, train_path, validation_path,
+                    chunk_rows=250_000, partition_format="csv", format_options=None):
+    """Generate one partition's rows chunk by chunk into train and validation files.
+
+    The label is the first column, as the SageMaker XGBoost container
+    expects. Returns row and positive counts per split.
+    """
+    structure = class_structure(seed)
+    start, stop = partition_range(partition, num_partitions, num_samples)
+    # Chunk boundaries fall on block boundaries so no block is generated twice
+    chunk_rows = max(BLOCK_ROWS, chunk_rows // BLOCK_ROWS * BLOCK_ROWS)
+    feature_names = [f"feature_{i}" for i in range(N_FEATURES)]
+    stats = {"partition": partition, "train_rows": 0, "train_positives": 0,
+             "validation_rows": 0, "validation_positives": 0}
+
+    format_options = format_options or {}
+    with formats.open_writer(partition_format, train_path, **format_options) as train_writer, \
+            formats.open_writer(partition_format, validation_path, **format_options) as validation_writer:
+        chunk_start = start
+        while chunk_start < stop:
+            chunk_stop = min((chunk_start // chunk_rows + 1) * chunk_rows, stop)
+            X, y, validation = generate_range(seed, chunk_start, chunk_stop, num_samples, fraud_rate, structure)
+            df = pd.DataFrame(X, columns=feature_names)
+            df.insert(0, "label", y)
+            for split_name, mask, writer in (("train", ~validation, train_writer),
+                                             ("validation", validation, validation_writer)):
+                writer.write(df[mask])
+                stats[f"{split_name}_rows"] += int(mask.sum())
+                stats[f"{split_name}_positives"] += int(y[mask].sum())
+            del X, y, validation, df
+            chunk_start = chunk_stop
+    return stats
@@ -0,0 +1,186 @@
+"""
+Local benchmark of the partition formats in formats.py.
+
+Generates one synthetic dataset with datagen.py, writes it as --partitions
+files in each format, and reports for each one:
+
+- bytes on disk and write time
+- the time to load every partition into an xgboost.DMatrix, as each node does
+  in single-node training
+- the time to build an xgboost.dask.DaskDMatrix over all partitions on a local
+  Dask cluster (needs dask[distributed]; libsvm has no Dask reader)
+
+Load times are the median of --repeats runs.
+
+    python format_benchmark.py --rows 1000000 --partitions 8 --dask-workers 4
+"""
+
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import datagen
+import formats
+
+# Compression Dask needs to be told about; it cannot split compressed files
+DASK_COMPRESSION = {"csv-gzip": "gzip", "csv-zstd": "zstd"}
+DASK_READABLE = {"csv", "parquet", *DASK_COMPRESSION}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare partition formats for XGBoost training")
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--fraud-rate", type=float, default=0.02)
+    parser.add_argument("--partitions", type=int, default=8)
+    parser.add_argument("--formats", type=str, default=",".join(formats.WRITERS),
+                        help="Comma-separated formats to compare")
+    parser.add_argument("--parquet-row-group-mb", type=int, default=64)
+    parser.add_argument("--dask-workers", type=int, default=2, help="Local Dask workers; 0 skips the Dask load")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, default="format_benchmark.csv")
+    return parser.parse_args()
+
+
+def make_frame(rows, fraud_rate, seed):
+    X, y, _ = datagen.generate_range(seed, 0, rows, rows, fraud_rate)
+    df = pd.DataFrame(X, columns=[f"feature_{i}" for i in range(X.shape[1])])
+    df.insert(0, "label", y)
+    return df
+
+
+def write_partitions(name, df, directory, num_partitions, format_options):
+    """Write df as num_partitions files; returns (paths, seconds)."""
+    extension = formats.get_writer(name).extension
+    paths = []
+    start = time.perf_counter()
+    for i, idx in enumerate(np.array_split(np.arange(len(df)), num_partitions)):
+        path = os.path.join(directory, f"part-{i:04d}{extension}")
+        formats.write_frame(name, df.iloc[idx], path, **format_options)
+        paths.append(path)
+    return paths, time.perf_counter() - start
+
+
+def load_dmatrix(name, path):
+    """Load one partition the way single-node XGBoost would."""
+    import xgboost as xgb
+
+    # XGBoost parses plain CSV and libsvm natively; the rest go through pandas
+    if name == "csv":
+        return xgb.DMatrix(f"{path}?format=csv&label_column=0")
+    if name == "libsvm":
+        return xgb.DMatrix(f"{path}?format=libsvm")
+    if name == "parquet":
+        df = pd.read_parquet(path)
+    else:
+        df = pd.read_csv(path, header=None)
+    return xgb.DMatrix(df.iloc[:, 1:], label=df.iloc[:, 0])
+
+
+def load_dask(client, name, paths):
+    """Build a DaskDMatrix over all partitions of a format in DASK_READABLE."""
+    import dask.dataframe as dd
+    from xgboost import dask as dxgb
+
+    if name == "parquet":
+        df = dd.read_parquet(paths)
+    elif name == "csv":
+        df = dd.read_csv(paths, header=None)
+    else:
+        df = dd.read_csv(paths, header=None, compression=DASK_COMPRESSION[name], blocksize=None)
+    # DaskDMatrix persists the partitions and waits for them
+    return dxgb.DaskDMatrix(client, df.iloc[:, 1:], df.iloc[:, 0])
+
+
+def median_seconds(fn, repeats):
+    times = []
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return float(np.median(times)), result
+
+
+def start_dask(num_workers):
+    if num_workers <= 0:
+        return None, None
+    try:
+        from dask.distributed import Client, LocalCluster
+    except ImportError as e:
+        print(f"Skipping DaskDMatrix loads: {e}. Install dask[distributed] to enable them.")
+        return None, None
+    cluster = LocalCluster(n_workers=num_workers, threads_per_worker=1)
+    return cluster, Client(cluster)
+
+
+def main():
+    args = parse_args()
+    names = [name.strip() for name in args.formats.split(",") if name.strip()]
+    for name in names:
+        formats.get_writer(name)
+
+    print(f"Generating {args.rows:,} rows...")
+    df = make_frame(args.rows, args.fraud_rate, args.seed)
+    cluster, client = start_dask(args.dask_workers)
+    tmp_dir = tempfile.mkdtemp(prefix="format-benchmark-")
+
+    rows = []
+    try:
+        for name in names:
+            directory = os.path.join(tmp_dir, name)
+            os.makedirs(directory)
+            format_options = {"row_group_mb": args.parquet_row_group_mb} if name == "parquet" else {}
+            try:
+                paths, write_seconds = write_partitions(name, df, directory, args.partitions, format_options)
+            except ImportError as e:
+                print(f"Skipping {name}: {e}")
+                continue
+
+            dmatrix_seconds, matrices = median_seconds(
+                lambda: [load_dmatrix(name, path) for path in paths], args.repeats)
+            loaded_rows = sum(matrix.num_row() for matrix in matrices)
+            if loaded_rows != len(df):
+                print(f"Warning: {name} loaded {loaded_rows:,} of {len(df):,} rows")
+
+            dask_seconds = None
+            if client is not None and name in DASK_READABLE:
+                dask_seconds, _ = median_seconds(lambda: load_dask(client, name, paths), args.repeats)
+
+            row = {
+                "format": name,
+                "bytes": sum(os.path.getsize(path) for path in paths),
+                "write_seconds": write_seconds,
+                "dmatrix_seconds": dmatrix_seconds,
+                "dask_dmatrix_seconds": dask_seconds,
+                "sagemaker_dask": formats.get_writer(name).dask,
+            }
+            rows.append(row)
+            print(f"{name}: {row['bytes'] / formats.MB:,.1f} MB")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if client is not None:
+            client.close()
+            cluster.close()
+
+    print(f"\n{'format':<10} {'MB':>9} {'write s':>8} {'DMatrix s':>10} {'DaskDMatrix s':>14} {'SageMaker Dask':>15}")
+    for row in rows:
+        dask = f"{row['dask_dmatrix_seconds']:.2f}" if row["dask_dmatrix_seconds"] is not None else "n/a"
+        print(f"{row['format']:<10} {row['bytes'] / formats.MB:>9,.1f} {row['write_seconds']:>8.2f} "
+              f"{row['dmatrix_seconds']:>10.2f} {dask:>14} {'yes' if row['sagemaker_dask'] else 'no':>15}")
+
+    with open(args.output, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["format"])
+        writer.writeheader()
+        writer.writerows(rows)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
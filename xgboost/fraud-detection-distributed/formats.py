@@ -0,0 +1,179 @@
+"""
+Partition writers for the XGBoost training channels.
+
+Every writer takes DataFrames with the label in the first column and appends
+them to one partition file, so the same writer serves both the in-memory
+generator (one frame per partition) and the chunked generator (one frame per
+chunk). Each format also knows the extension and content type SageMaker
+needs to read it back.
+
+    csv        headerless CSV, as the original tutorial wrote it
+    csv-gzip   headerless CSV, gzip-compressed
+    csv-zstd   headerless CSV, zstd-compressed (needs the zstandard package)
+    parquet    Parquet with float32 features and row groups of about
+               row_group_mb each (needs pyarrow)
+    libsvm     "label index:value ..." text, zero-based feature indices
+
+Only csv and parquet can be read by Dask training on SageMaker; the other
+formats are for single-node training, local use and the benchmark in
+format_benchmark.py.
+"""
+
+import gzip
+import io
+
+import numpy as np
+
+MB = 1024 * 1024
+
+
+class PartitionWriter:
+    """Headerless CSV; the base class for the other formats."""
+
+    extension = ".csv"
+    content_type = "text/csv"
+    dask = True
+
+    def __init__(self, path):
+        self.path = path
+        self.file = self._open(path)
+
+    def _open(self, path):
+        return open(path, "w")
+
+    def write(self, df):
+        df.to_csv(self.file, index=False, header=False)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GzipCSVWriter(PartitionWriter):
+    extension = ".csv.gz"
+    # SageMaker only decompresses Gzip channels in Pipe mode, and this
+    # tutorial trains in File mode, so these partitions are not trained on
+    dask = False
+
+    def _open(self, path):
+        return gzip.open(path, "wt", compresslevel=6)
+
+
+class ZstdCSVWriter(PartitionWriter):
+    extension = ".csv.zst"
+    # SageMaker has no zstd channel compression, so these partitions are for
+    # local use only
+    dask = False
+
+    def _open(self, path):
+        import zstandard
+
+        return io.TextIOWrapper(zstandard.ZstdCompressor(level=3).stream_writer(open(path, "wb")),
+                                encoding="utf-8")
+
+
+class ParquetWriter(PartitionWriter):
+    extension = ".parquet"
+    content_type = "application/x-parquet"
+
+    def __init__(self, path, row_group_mb=64):
+        self.row_group_mb = row_group_mb
+        self.buffer = []
+        self.buffered_rows = 0
+        self.row_group_rows = None
+        super().__init__(path)
+
+    def _open(self, path):
+        # The schema is only known once the first frame arrives
+        return None
+
+    def write(self, df):
+        import pyarrow as pa
+
+        # XGBoost trains on float32, so narrower features lose nothing and
+        # halve the file size
+        df = df.astype({column: np.float32 for column in df.columns[1:]})
+        if self.row_group_rows is None:
+            row_bytes = df.memory_usage(index=False).sum() / max(len(df), 1)
+            self.row_group_rows = max(1, int(self.row_group_mb * MB / row_bytes))
+        # Buffer small chunks so each row group reaches the target size
+        self.buffer.append(pa.Table.from_pandas(df, preserve_index=False))
+        self.buffered_rows += len(df)
+        if self.buffered_rows >= self.row_group_rows:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self.buffer:
+            return
+        table = pa.concat_tables(self.buffer)
+        if self.file is None:
+            self.file = pq.ParquetWriter(self.path, table.schema, compression="snappy")
+        self.file.write_table(table, row_group_size=self.row_group_rows)
+        self.buffer, self.buffered_rows = [], 0
+
+    def close(self):
+        self._flush()
+        if self.file is not None:
+            self.file.close()
+
+
+class LibSVMWriter(PartitionWriter):
+    extension = ".libsvm"
+    content_type = "text/libsvm"
+    dask = False
+
+    def _open(self, path):
+        # dump_svmlight_file writes bytes
+        return open(path, "wb")
+
+    def write(self, df):
+        from sklearn.datasets import dump_svmlight_file
+
+        values = df.to_numpy()
+        dump_svmlight_file(values[:, 1:], values[:, 0], self.file, zero_based=True)
+
+
+WRITERS = {
+    "csv": PartitionWriter,
+    "csv-gzip": GzipCSVWriter,
+    "csv-zstd": ZstdCSVWriter,
+    "parquet": ParquetWriter,
+    "libsvm": LibSVMWriter,
+}
+
+
+def get_writer(name):
+    if name not in WRITERS:
+        raise ValueError(f"Unknown partition format {name!r}; choose from {sorted(WRITERS)}")
+    return WRITERS[name]
+
+
+def open_writer(name, path, **options):
+    """Open a writer; options only apply to the formats that take them, such as row_group_mb."""
+    writer = get_writer(name)
+    if writer is ParquetWriter:
+        return writer(path, **options)
+    return writer(path)
+
+
+def write_frame(name, df, path, **options):
+    """Write one DataFrame as a complete partition file."""
+    with open_writer(name, path, **options) as writer:
+        writer.write(df)
+
+
+def training_input(name, s3_uri):
+    """A FullyReplicated TrainingInput with the content type and compression of the format."""
+    from sagemaker.inputs import TrainingInput
+
+    writer = get_writer(name)
+    return TrainingInput(s3_data=s3_uri, content_type=writer.content_type, compression=writer.compression,
+                         distribution="FullyReplicated")
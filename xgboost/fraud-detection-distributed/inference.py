@@ -0,0 +1,217 @@
+"""
+In-process inference for the fraud model, without an endpoint.
+
+InferenceEngine loads the booster from model.tar.gz and scores NumPy arrays
+or Arrow tables and record batches (a "label" column, if present, is ignored).
+Backends:
+
+    xgboost   Booster.inplace_predict, which scores the array directly
+              without building a DMatrix. By default a call uses all cores
+              through XGBoost's own threads. With parallel_rows set, each
+              call is single-threaded, and batches of at least parallel_rows
+              rows are split across a thread pool instead
+    treelite  the trees compiled to a shared library with treelite and
+              tl2cgen (needs both, and a C compiler). The library
+              parallelizes over rows itself
+
+Run as a script to benchmark rows/sec and single-row latency across backends,
+input types and batch sizes:
+
+    python inference.py --model local_data/model.tar.gz --batch-sizes 1,100,10000,100000
+"""
+
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from latency import latency_summary
+from model_artifact import load_booster
+from scoring import test_rows
+
+BACKENDS = ("xgboost", "treelite")
+
+
+def as_matrix(X):
+    """A C-contiguous float32 feature matrix from a NumPy array or an Arrow table or record batch."""
+    if hasattr(X, "schema") and hasattr(X, "column"):
+        columns = [np.asarray(X.column(i), dtype=np.float32)
+                   for i, name in enumerate(X.schema.names) if name != "label"]
+        return np.column_stack(columns) if columns else np.empty((X.num_rows, 0), dtype=np.float32)
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    return X.reshape(1, -1) if X.ndim == 1 else X
+
+
+class XGBoostBackend:
+    def __init__(self, booster, nthread=None):
+        self.booster = booster
+        if nthread:
+            self.booster.set_param({"nthread": nthread})
+
+    def predict(self, X):
+        return self.booster.inplace_predict(X)
+
+    def close(self):
+        pass
+
+
+class TreeliteBackend:
+    def __init__(self, booster, nthread=None):
+        import tl2cgen
+        import treelite
+
+        self.build_dir = tempfile.mkdtemp(prefix="treelite-")
+        libpath = os.path.join(self.build_dir, "model.so")
+        model = treelite.frontend.from_xgboost(booster)
+        tl2cgen.export_lib(model, toolchain="gcc", libpath=libpath, params={"parallel_comp": os.cpu_count() or 1})
+        self.predictor = tl2cgen.Predictor(libpath, nthread=nthread or os.cpu_count())
+        self.tl2cgen = tl2cgen
+
+    def predict(self, X):
+        # Shaped (rows, targets, classes); the model has one of each
+        return self.predictor.predict(self.tl2cgen.DMatrix(X)).reshape(-1)
+
+    def close(self):
+        shutil.rmtree(self.build_dir, ignore_errors=True)
+
+
+class InferenceEngine:
+    """Score batches with the chosen backend; see the module docstring."""
+
+    def __init__(self, booster, backend="xgboost", threads=None, parallel_rows=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}; choose from {list(BACKENDS)}")
+        self.threads = threads or os.cpu_count() or 1
+        self.parallel_rows = parallel_rows if backend == "xgboost" else None
+        self.pool = None
+        if self.parallel_rows:
+            self.pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="predict")
+            self.backend = XGBoostBackend(booster, nthread=1)
+        elif backend == "xgboost":
+            self.backend = XGBoostBackend(booster, nthread=self.threads)
+        else:
+            self.backend = TreeliteBackend(booster, nthread=self.threads)
+
+    @classmethod
+    def from_artifact(cls, path, **kwargs):
+        """Load from a local or s3:// model.tar.gz."""
+        return cls(load_booster(path), **kwargs)
+
+    def predict(self, X):
+        """Fraud probability of each row."""
+        X = as_matrix(X)
+        if self.pool is not None and len(X) >= self.parallel_rows:
+            chunks = np.array_split(X, min(self.threads, len(X)))
+            return np.concatenate(list(self.pool.map(self.backend.predict, chunks)))
+        return self.backend.predict(X)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+        self.backend.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _timings(fn, repeats):
+    fn()  # warm-up
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return np.array(times)
+
+
+def benchmark(engine, X, batch_sizes, single_repeats=2000, min_rows=200000, arrow=False):
+    """Rows/sec per batch size and single-row latency for one engine; returns a list of rows."""
+    results = []
+    inputs = X
+    if arrow:
+        import pyarrow as pa
+
+        inputs = pa.table({f"feature_{i}": X[:, i] for i in range(X.shape[1])})
+
+    single = latency_summary(_timings(lambda: engine.predict(inputs.slice(0, 1) if arrow else X[:1]), single_repeats))
+    for batch_size in batch_sizes:
+        batch = inputs.slice(0, batch_size) if arrow else X[:batch_size]
+        # Enough repeats to score at least min_rows rows
+        repeats = max(5, min_rows // batch_size)
+        seconds = float(np.median(_timings(lambda: engine.predict(batch), repeats)))
+        results.append({
+            "batch_rows": batch_size,
+            "rows_per_sec": batch_size / seconds if seconds > 0 else 0.0,
+            "batch_ms": seconds * 1000.0,
+            "single_row_p50_ms": single["p50_ms"],
+            "single_row_p99_ms": single["p99_ms"],
+        })
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark local inference backends for the fraud model")
+    parser.add_argument("--model", type=str, required=True, help="Local or s3:// path of model.tar.gz")
+    parser.add_argument("--backends", type=str, default="xgboost,xgboost-pool,treelite",
+                        help="Comma-separated: xgboost, xgboost-pool (thread pool over chunks), treelite")
+    parser.add_argument("--batch-sizes", type=str, default="1,100,1000,10000,100000")
+    parser.add_argument("--threads", type=int, default=None, help="Threads per engine (default: CPU count)")
+    parser.add_argument("--parallel-rows", type=int, default=10000,
+                        help="Smallest batch split across the thread pool by xgboost-pool")
+    parser.add_argument("--arrow", action="store_true", help="Also benchmark Arrow table input (needs pyarrow)")
+    parser.add_argument("--output", type=str, default=None, help="Also write the results as CSV")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    batch_sizes = [int(size) for size in args.batch_sizes.split(",")]
+    booster = load_booster(args.model)
+    X = as_matrix(test_rows(max(batch_sizes)))
+    reference = XGBoostBackend(booster.copy()).predict(X[:10000])
+
+    rows = []
+    for name in [name.strip() for name in args.backends.split(",") if name.strip()]:
+        backend = "treelite" if name == "treelite" else "xgboost"
+        parallel_rows = args.parallel_rows if name == "xgboost-pool" else None
+        try:
+            engine = InferenceEngine(booster.copy(), backend, args.threads, parallel_rows)
+        except ImportError as e:
+            print(f"Skipping {name}: {e}. Install treelite and tl2cgen to enable it.")
+            continue
+        except Exception as e:
+            # Compiling needs a working C toolchain
+            print(f"Skipping {name}: could not build it: {e}")
+            continue
+        with engine:
+            max_error = float(np.max(np.abs(engine.predict(X[:10000]) - reference)))
+            for arrow in ([False, True] if args.arrow else [False]):
+                for result in benchmark(engine, X, batch_sizes, arrow=arrow):
+                    result.update(backend=name, input="arrow" if arrow else "numpy", max_abs_error=max_error)
+                    rows.append(result)
+
+    print(f"\n{'backend':<13} {'input':<6} {'batch':>7} {'rows/s':>12} {'batch ms':>9} "
+          f"{'1-row p50 ms':>13} {'1-row p99 ms':>13} {'max err':>9}")
+    for row in rows:
+        print(f"{row['backend']:<13} {row['input']:<6} {row['batch_rows']:>7,} {row['rows_per_sec']:>12,.0f} "
+              f"{row['batch_ms']:>9.3f} {row['single_row_p50_ms']:>13.3f} {row['single_row_p99_ms']:>13.3f} "
+              f"{row['max_abs_error']:>9.2e}")
+
+    if args.output and rows:
+        with open(args.output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
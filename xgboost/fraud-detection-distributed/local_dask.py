@@ -0,0 +1,146 @@
+"""
+Local Dask training backend for run_tutorial.py.
+
+Trains with xgboost.dask on a dask.distributed LocalCluster of CPU worker
+processes, on the same partition files and hyperparameters as the SageMaker
+job, with gpu_hist replaced by hist on CPU. As in the SageMaker container,
+each partition file is one Dask partition.
+
+For each worker count it reports:
+
+- the time to build the training and validation matrices
+- training time and seconds per boosting round
+- the peak resident memory of each worker process
+- the final validation AUC
+
+It compares throughput with the smallest worker count, so the same data and
+settings give a reproducible scaling benchmark without an AWS account. It
+needs xgboost and dask[distributed]. Only csv and parquet partitions are
+read, as on SageMaker.
+"""
+
+import glob
+import json
+import os
+import time
+
+import formats
+from model_artifact import save_artifact
+
+# SageMaker-only hyperparameters that the xgboost.dask API does not take
+SAGEMAKER_ONLY = ("num_round", "use_dask_gpu_training")
+
+
+def xgboost_params(hyperparameters):
+    """Translate the SageMaker hyperparameters into xgboost.dask training params for CPU."""
+    params = {name: value for name, value in hyperparameters.items() if name not in SAGEMAKER_ONLY}
+    params.update(tree_method="hist", device="cpu")
+    return params
+
+
+def partition_paths(directory, partition_format):
+    paths = sorted(glob.glob(os.path.join(directory, f"*{formats.get_writer(partition_format).extension}")))
+    if not paths:
+        raise FileNotFoundError(f"No {partition_format} partitions in {directory}")
+    return paths
+
+
+def read_split(paths, partition_format):
+    """(features, label) Dask collections with one partition per file."""
+    import dask.dataframe as dd
+
+    if partition_format == "parquet":
+        df = dd.read_parquet(paths, split_row_groups=False)
+    elif partition_format == "csv":
+        df = dd.read_csv(paths, header=None, blocksize=None)
+    else:
+        raise ValueError(f"Dask training only reads csv and parquet partitions, not {partition_format}")
+    return df.iloc[:, 1:], df.iloc[:, 0]
+
+
+def _peak_rss_bytes():
+    import resource
+
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def train(train_dir, validation_dir, partition_format, hyperparameters, num_workers, threads_per_worker=1,
+          model_path=None):
+    """Train on a fresh LocalCluster of num_workers processes; returns the measurements.
+
+    With model_path, the booster is also saved there as a model.tar.gz.
+    """
+    from dask.distributed import Client, LocalCluster
+    from xgboost import dask as dxgb
+
+    num_round = int(hyperparameters["num_round"])
+    train_paths = partition_paths(train_dir, partition_format)
+    validation_paths = partition_paths(validation_dir, partition_format)
+
+    with LocalCluster(n_workers=num_workers, threads_per_worker=threads_per_worker, processes=True) as cluster, \
+            Client(cluster) as client:
+        start = time.perf_counter()
+        X_train, y_train = read_split(train_paths, partition_format)
+        X_val, y_val = read_split(validation_paths, partition_format)
+        dtrain = dxgb.DaskQuantileDMatrix(client, X_train, y_train)
+        dvalid = dxgb.DaskQuantileDMatrix(client, X_val, y_val, ref=dtrain)
+        dmatrix_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        output = dxgb.train(client, xgboost_params(hyperparameters), dtrain, num_boost_round=num_round,
+                            evals=[(dtrain, "train"), (dvalid, "validation")], verbose_eval=False)
+        train_seconds = time.perf_counter() - start
+
+        worker_memory = client.run(_peak_rss_bytes)
+        num_rows = len(y_train)
+
+    if model_path:
+        save_artifact(output["booster"], model_path)
+    return {
+        "workers": num_workers,
+        "threads_per_worker": threads_per_worker,
+        "train_partitions": len(train_paths),
+        "dmatrix_seconds": dmatrix_seconds,
+        "train_seconds": train_seconds,
+        "seconds_per_round": train_seconds / num_round,
+        "rows_per_sec": num_rows * num_round / train_seconds if train_seconds > 0 else 0.0,
+        "peak_worker_memory_mb": max(worker_memory.values()) / (1024 * 1024),
+        "worker_memory_mb": sorted(memory / (1024 * 1024) for memory in worker_memory.values()),
+        "validation_auc": output["history"]["validation"]["auc"][-1],
+    }
+
+
+def run_scaling(train_dir, validation_dir, partition_format, hyperparameters, worker_counts, threads_per_worker=1,
+                output_path=None, model_path=None):
+    """Train once per worker count and print speedup and efficiency against the smallest count.
+
+    With model_path, the model of the last run is saved there as a model.tar.gz.
+    """
+    results = []
+    for i, num_workers in enumerate(worker_counts):
+        print(f"\nTraining locally with {num_workers} Dask worker(s) x {threads_per_worker} thread(s)...")
+        result = train(train_dir, validation_dir, partition_format, hyperparameters, num_workers, threads_per_worker,
+                       model_path if i == len(worker_counts) - 1 else None)
+        print(f"{num_workers} worker(s): {result['seconds_per_round'] * 1000:,.1f} ms/round, "
+              f"peak worker memory {result['peak_worker_memory_mb']:,.0f} MB, "
+              f"validation AUC {result['validation_auc']:.4f}")
+        results.append(result)
+
+    base = results[0]
+    for result in results:
+        result["speedup"] = base["seconds_per_round"] / result["seconds_per_round"]
+        result["efficiency"] = result["speedup"] * base["workers"] / result["workers"]
+
+    print(f"\n{'workers':>8} {'DMatrix s':>10} {'ms/round':>9} {'speedup':>8} {'efficiency':>11} "
+          f"{'peak MB':>8} {'AUC':>7}")
+    for result in results:
+        print(f"{result['workers']:>8} {result['dmatrix_seconds']:>10.2f} {result['seconds_per_round'] * 1000:>9.1f} "
+              f"{result['speedup']:>7.2f}x {result['efficiency']:>10.0%} {result['peak_worker_memory_mb']:>8,.0f} "
+              f"{result['validation_auc']:>7.4f}")
+
+    if output_path:
+        with open(output_path, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {output_path}")
+    return results
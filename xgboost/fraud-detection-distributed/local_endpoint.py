@@ -0,0 +1,128 @@
+"""
+Local stand-in for the SageMaker XGBoost endpoint.
+
+Serves a trained model.tar.gz over HTTP with the same contract the hosted
+algorithm uses for CSV: POST /invocations with headerless text/csv rows (no
+label column), one score per line in the response, and GET /ping for health.
+Connections are kept alive (HTTP/1.1) and each one is handled on its own
+thread, so the scoring client can be tested offline against the real model.
+
+    python local_endpoint.py --model local_data/model.tar.gz --port 8080
+"""
+
+import argparse
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from model_artifact import load_booster
+
+
+def parse_csv(body):
+    """Headerless CSV rows as a float32 matrix."""
+    return pd.read_csv(io.BytesIO(body), header=None, dtype=np.float32).to_numpy()
+
+
+class EndpointHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # _send writes the headers and the body separately; with Nagle's algorithm
+    # the body waits for the client's delayed ACK on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="text/plain"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/ping":
+            self._send(200, b"")
+        else:
+            self._send(404, b"Not found")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path != "/invocations":
+            self._send(404, b"Not found")
+            return
+        if not self.headers.get("Content-Type", "text/csv").startswith("text/csv"):
+            self._send(415, b"Only text/csv is supported")
+            return
+        try:
+            X = parse_csv(body)
+        except (ValueError, pd.errors.ParserError) as e:
+            self._send(400, f"Invalid CSV: {e}".encode())
+            return
+        try:
+            scores = self.server.booster.inplace_predict(X)
+        except (ValueError, xgb.core.XGBoostError) as e:
+            # Well-formed CSV with the wrong number of features
+            self._send(400, f"Invalid input: {e}".encode())
+            return
+        except Exception as e:
+            self._send(500, f"Prediction failed: {e}".encode())
+            return
+        self._send(200, "\n".join(f"{score:.6f}" for score in scores).encode(), "text/csv")
+
+
+class LocalEndpoint:
+    """Serve a booster on a background thread; port 0 picks a free port."""
+
+    def __init__(self, booster, host="127.0.0.1", port=0):
+        self.server = ThreadingHTTPServer((host, port), EndpointHandler)
+        self.server.daemon_threads = True
+        self.server.booster = booster
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/invocations"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="local-endpoint", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serve a SageMaker XGBoost model.tar.gz locally")
+    parser.add_argument("--model", type=str, required=True, help="Local or s3:// path of model.tar.gz")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    endpoint = LocalEndpoint(load_booster(args.model), args.host, args.port)
+    print(f"Serving {args.model} at {endpoint.url}")
+    try:
+        endpoint.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        endpoint.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
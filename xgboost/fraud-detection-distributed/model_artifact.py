@@ -0,0 +1,64 @@
+"""
+Reading and writing the model.tar.gz artifact of the SageMaker XGBoost
+algorithm.
+
+The archive holds a single file named xgboost-model. Depending on the
+container version it is a pickled Booster or a model saved with
+Booster.save_model (JSON or UBJSON); load_booster accepts all three. The
+archive is read in memory and never extracted to disk, so member paths in it
+are never trusted.
+"""
+
+import io
+import os
+import pickle
+import tarfile
+import tempfile
+
+MODEL_FILENAME = "xgboost-model"
+
+
+def read_artifact(path):
+    """Bytes of the xgboost-model file in a local or s3:// model.tar.gz."""
+    if path.startswith("s3://"):
+        import boto3
+
+        bucket, _, key = path[len("s3://"):].partition("/")
+        with tempfile.TemporaryFile() as f:
+            boto3.client("s3").download_fileobj(bucket, key, f)
+            f.seek(0)
+            return _model_bytes(tarfile.open(fileobj=f, mode="r:gz"))
+    with tarfile.open(path, "r:gz") as archive:
+        return _model_bytes(archive)
+
+
+def _model_bytes(archive):
+    for member in archive.getmembers():
+        if member.isfile() and os.path.basename(member.name) == MODEL_FILENAME:
+            return archive.extractfile(member).read()
+    raise ValueError(f"No {MODEL_FILENAME} file in the model archive")
+
+
+def load_booster(path):
+    """Load the Booster from a local or s3:// model.tar.gz."""
+    import xgboost as xgb
+
+    data = read_artifact(path)
+    booster = xgb.Booster()
+    try:
+        booster.load_model(bytearray(data))
+    except xgb.core.XGBoostError:
+        # Older containers pickle the Booster
+        booster = pickle.loads(data)
+    return booster
+
+
+def save_artifact(booster, path):
+    """Write a Booster as a model.tar.gz in the container's layout."""
+    data = bytes(booster.save_raw(raw_format="json"))
+    info = tarfile.TarInfo(MODEL_FILENAME)
+    info.size = len(data)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with tarfile.open(tmp_path, "w:gz") as archive:
+        archive.addfile(info, io.BytesIO(data))
+    os.replace(tmp_path, path)
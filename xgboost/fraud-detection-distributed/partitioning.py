@@ -0,0 +1,117 @@
+"""
+Row-to-partition assignment and the per-partition stats manifest.
+
+    contiguous  np.array_split over the row order, as the tutorial always did.
+                Partitions have equal row counts, but with a 2% fraud rate
+                their positive counts can differ widely
+    stratified  each class is split separately and dealt out so partition
+                sizes differ by at most one row and positive counts by at
+                most one
+
+The chunked generator does not use either mode. Its partitions are
+contiguous runs of generator blocks, recorded as "blocks" in the manifest.
+Every block holds its exact share of positives, but label noise is applied
+afterwards, so partitions with few positives can still drift out of
+tolerance.
+
+The manifest records rows, positives and bytes for every uploaded partition.
+It also lists the partitions whose row count or positive rate is more than
+the tolerance away, relative to the split's mean row count and overall rate.
+"""
+
+import numpy as np
+
+MODES = ("contiguous", "stratified")
+# Manifest mode of the chunked generator's partitions
+BLOCKS = "blocks"
+
+
+def contiguous_partitions(num_rows, num_partitions):
+    return np.array_split(np.arange(num_rows), num_partitions)
+
+
+def stratified_partitions(labels, num_partitions, seed=42):
+    """Row indices of each partition, with every class spread evenly across them."""
+    rng = np.random.default_rng(seed)
+    parts = [[] for _ in range(num_partitions)]
+    offset = 0
+    for label in np.unique(labels):
+        rows = rng.permutation(np.flatnonzero(labels == label))
+        # array_split gives the remainder to the first chunks; starting each
+        # class where the previous one's remainder ended keeps the
+        # partition sizes within one row of each other
+        for i, chunk in enumerate(np.array_split(rows, num_partitions)):
+            parts[(i + offset) % num_partitions].append(chunk)
+        offset += len(rows) % num_partitions
+    return [np.sort(np.concatenate(part)) for part in parts]
+
+
+def split_partitions(mode, labels, num_partitions, seed=42):
+    if mode == "stratified":
+        return stratified_partitions(labels, num_partitions, seed)
+    if mode == "contiguous":
+        return contiguous_partitions(len(labels), num_partitions)
+    raise ValueError(f"Unknown partitioning mode {mode!r}; choose from {list(MODES)}")
+
+
+def imbalances(records, tolerance):
+    """Partitions whose rows or positive rate deviate from their split by more than tolerance."""
+    found = []
+    for split in sorted({record["split"] for record in records}):
+        split_records = [record for record in records if record["split"] == split]
+        rows = sum(record["rows"] for record in split_records)
+        mean_rows = rows / len(split_records)
+        rate = sum(record["positives"] for record in split_records) / rows if rows else 0.0
+        for record in split_records:
+            row_deviation = record["rows"] / mean_rows - 1 if mean_rows else 0.0
+            record_rate = record["positives"] / record["rows"] if record["rows"] else 0.0
+            rate_deviation = record_rate / rate - 1 if rate else 0.0
+            if abs(row_deviation) > tolerance or abs(rate_deviation) > tolerance:
+                found.append({"split": split, "partition": record["partition"],
+                              "row_deviation": row_deviation, "positive_rate_deviation": rate_deviation})
+    return found
+
+
+def build_manifest(records, mode, tolerance, sizes=None):
+    """The stats manifest for records of {split, partition, key, rows, positives}.
+
+    sizes maps each key to its uploaded size in bytes.
+    """
+    sizes = sizes or {}
+    partitions = []
+    for record in sorted(records, key=lambda record: (record["split"], record["partition"])):
+        partitions.append(dict(record, bytes=sizes.get(record["key"]),
+                               positive_rate=record["positives"] / record["rows"] if record["rows"] else 0.0))
+
+    splits = {}
+    for record in partitions:
+        split = splits.setdefault(record["split"], {"partitions": 0, "rows": 0, "positives": 0, "bytes": 0})
+        split["partitions"] += 1
+        split["rows"] += record["rows"]
+        split["positives"] += record["positives"]
+        split["bytes"] += record["bytes"] or 0
+    for split in splits.values():
+        split["positive_rate"] = split["positives"] / split["rows"] if split["rows"] else 0.0
+
+    return {
+        "partitioning": mode,
+        "tolerance": tolerance,
+        "splits": splits,
+        "partitions": partitions,
+        "imbalanced": imbalances(partitions, tolerance),
+    }
+
+
+def format_summary(manifest):
+    """One line per split: row and positive-rate ranges across partitions."""
+    lines = []
+    for name, split in manifest["splits"].items():
+        records = [record for record in manifest["partitions"] if record["split"] == name]
+        rows = [record["rows"] for record in records]
+        rates = [record["positive_rate"] for record in records]
+        lines.append(f"{name}: {split['partitions']} partitions, rows {min(rows):,}-{max(rows):,}, "
+                     f"positive rate {min(rates):.2%}-{max(rates):.2%} (overall {split['positive_rate']:.2%})")
+    imbalanced = manifest["imbalanced"]
+    if imbalanced:
+        lines.append(f"{len(imbalanced)} partition(s) outside the {manifest['tolerance']:.0%} tolerance")
+    return "\n".join(lines)
@@ -0,0 +1,219 @@
+"""
+Partition planner for Dask XGBoost training.
+
+Dask runs one worker per GPU, and each worker trains on whole partition files.
+The plan picks a partition count that:
+
+- gives every worker at least two partitions, and never fewer than 8 in total
+- keeps each partition near --target-partition-mb on disk, so large datasets
+  are not split into a few huge files
+- is a multiple of the worker count, so with equal-sized partitions every
+  worker gets the same number of rows and none becomes a straggler
+
+It also estimates each worker's training memory and warns when it will not
+fit. The instance catalog covers the G4dn, G5, G6, P4d/P4de and P5 families.
+Other types can be added with register_instance or a JSON file passed to
+load_catalog. Unknown types raise an error rather than being assumed to have
+one GPU.
+
+Run as a script to inspect a plan without generating anything:
+
+    python planner.py --instance-type ml.p4d.24xlarge --instance-count 2 --num-samples 100000000
+"""
+
+import argparse
+import json
+import math
+import os
+import tempfile
+
+import datagen
+import formats
+
+MB = 1024 * 1024
+GB = 1024 * MB
+
+# Instance type: (GPUs, GPU memory per GPU in GiB, vCPUs, host memory in GiB)
+INSTANCE_CATALOG = {
+    "ml.g4dn.xlarge": (1, 16, 4, 16),
+    "ml.g4dn.2xlarge": (1, 16, 8, 32),
+    "ml.g4dn.4xlarge": (1, 16, 16, 64),
+    "ml.g4dn.8xlarge": (1, 16, 32, 128),
+    "ml.g4dn.12xlarge": (4, 16, 48, 192),
+    "ml.g4dn.16xlarge": (1, 16, 64, 256),
+    "ml.g5.xlarge": (1, 24, 4, 16),
+    "ml.g5.2xlarge": (1, 24, 8, 32),
+    "ml.g5.4xlarge": (1, 24, 16, 64),
+    "ml.g5.8xlarge": (1, 24, 32, 128),
+    "ml.g5.12xlarge": (4, 24, 48, 192),
+    "ml.g5.16xlarge": (1, 24, 64, 256),
+    "ml.g5.24xlarge": (4, 24, 96, 384),
+    "ml.g5.48xlarge": (8, 24, 192, 768),
+    "ml.g6.xlarge": (1, 24, 4, 16),
+    "ml.g6.2xlarge": (1, 24, 8, 32),
+    "ml.g6.4xlarge": (1, 24, 16, 64),
+    "ml.g6.8xlarge": (1, 24, 32, 128),
+    "ml.g6.12xlarge": (4, 24, 48, 192),
+    "ml.g6.16xlarge": (1, 24, 64, 256),
+    "ml.g6.24xlarge": (4, 24, 96, 384),
+    "ml.g6.48xlarge": (8, 24, 192, 768),
+    "ml.p4d.24xlarge": (8, 40, 96, 1152),
+    "ml.p4de.24xlarge": (8, 80, 96, 1152),
+    "ml.p5.48xlarge": (8, 80, 192, 2048),
+}
+
+MIN_PARTITIONS = 8
+MIN_PARTITIONS_PER_WORKER = 2
+# GPU memory per row of training data relative to its float32 size: the raw
+# partitions, the quantized matrix and gradient buffers live side by side
+TRAINING_MEMORY_FACTOR = 3
+# Fraction of worker memory the estimate may use before the plan warns
+MEMORY_HEADROOM = 0.8
+
+
+def register_instance(name, gpus, gpu_memory_gb, vcpus, memory_gb):
+    """Add or replace an instance type in the catalog."""
+    INSTANCE_CATALOG[name] = (gpus, gpu_memory_gb, vcpus, memory_gb)
+
+
+def load_catalog(path):
+    """Register instance types from a JSON file such as
+    {"ml.g6e.12xlarge": {"gpus": 4, "gpu_memory_gb": 48, "vcpus": 48, "memory_gb": 384}}."""
+    with open(path) as f:
+        for name, spec in json.load(f).items():
+            register_instance(name, spec["gpus"], spec["gpu_memory_gb"], spec["vcpus"], spec["memory_gb"])
+
+
+def instance_spec(instance_type):
+    if instance_type not in INSTANCE_CATALOG:
+        raise ValueError(f"Unknown instance type {instance_type!r}. Add it with --instance-catalog; "
+                         f"known GPU types: {', '.join(sorted(INSTANCE_CATALOG))}")
+    gpus, gpu_memory_gb, vcpus, memory_gb = INSTANCE_CATALOG[instance_type]
+    return {"gpus": gpus, "gpu_memory_gb": gpu_memory_gb, "vcpus": vcpus, "memory_gb": memory_gb}
+
+
+def sample_bytes_per_row(partition_format="csv", format_options=None, fraud_rate=0.02, sample_rows=16384):
+    """Measure on-disk bytes per row by writing a sample of generated rows."""
+    import pandas as pd
+
+    X, y, _ = datagen.generate_range(0, 0, sample_rows, sample_rows, fraud_rate)
+    df = pd.DataFrame(X, columns=[f"feature_{i}" for i in range(X.shape[1])])
+    df.insert(0, "label", y)
+    fd, path = tempfile.mkstemp(suffix=formats.get_writer(partition_format).extension)
+    os.close(fd)
+    try:
+        formats.write_frame(partition_format, df, path, **(format_options or {}))
+        return os.path.getsize(path) / sample_rows
+    finally:
+        os.remove(path)
+
+
+def plan_partitions(num_rows, dataset_bytes, instance_type, instance_count, worker_memory_gb=None,
+                    target_partition_mb=256, num_features=datagen.N_FEATURES):
+    """Choose the partition layout for a dataset of num_rows rows and dataset_bytes on disk.
+
+    worker_memory_gb is the memory of one Dask worker, by default the GPU
+    memory of the instance type. Returns the plan as a dict.
+    """
+    spec = instance_spec(instance_type)
+    workers = spec["gpus"] * instance_count
+    worker_memory_gb = worker_memory_gb or spec["gpu_memory_gb"]
+
+    by_size = math.ceil(dataset_bytes / (target_partition_mb * MB))
+    num_partitions = max(MIN_PARTITIONS, workers * MIN_PARTITIONS_PER_WORKER, by_size)
+    # Equal partitions per worker; a worker with one extra partition finishes
+    # every boosting round last
+    num_partitions = math.ceil(num_partitions / workers) * workers
+    # Never more partitions than rows
+    num_partitions = max(1, min(num_partitions, num_rows))
+
+    rows_per_partition = num_rows / num_partitions
+    rows_per_worker = math.ceil(num_partitions / workers) * math.ceil(rows_per_partition)
+    worker_bytes = rows_per_worker * (num_features + 1) * 4 * TRAINING_MEMORY_FACTOR
+
+    warnings = []
+    if worker_bytes > worker_memory_gb * GB * MEMORY_HEADROOM:
+        needed = math.ceil(instance_count * worker_bytes / (worker_memory_gb * GB * MEMORY_HEADROOM))
+        warnings.append(f"Estimated {worker_bytes / GB:.1f} GiB of training memory per worker exceeds "
+                        f"{MEMORY_HEADROOM:.0%} of {worker_memory_gb} GiB; use about {needed} instances")
+    if num_partitions % workers:
+        warnings.append(f"{num_partitions} partitions cannot be spread evenly over {workers} workers")
+
+    return {
+        "instance_type": instance_type,
+        "instance_count": instance_count,
+        "gpus_per_instance": spec["gpus"],
+        "workers": workers,
+        "worker_memory_gb": worker_memory_gb,
+        "num_rows": num_rows,
+        "dataset_bytes": int(dataset_bytes),
+        "num_partitions": num_partitions,
+        "partitions_per_worker": num_partitions / workers,
+        "rows_per_partition": int(math.ceil(rows_per_partition)),
+        "partition_bytes": int(dataset_bytes / num_partitions),
+        "estimated_worker_memory_bytes": int(worker_bytes),
+        "warnings": warnings,
+    }
+
+
+
+def plan_dataset(num_samples, fraud_rate, instance_type, instance_count, partition_format="csv",
+                 format_options=None, target_partition_mb=256, worker_memory_gb=None):
+    """Plan the partitions of a generated dataset of num_samples rows.
+
+    Only the training split is planned, since the Dask workers train on it;
+    validation uses the same partition count.
+    """
+    bytes_per_row = sample_bytes_per_row(partition_format, format_options, fraud_rate)
+    train_rows = int(num_samples * (1 - datagen.VALIDATION_FRACTION))
+    return plan_partitions(train_rows, train_rows * bytes_per_row, instance_type, instance_count,
+                           worker_memory_gb, target_partition_mb)
+
+
+def format_plan(plan):
+    """Render a plan as text for inspection."""
+    lines = [
+        f"Instances:          {plan['instance_count']} x {plan['instance_type']} "
+        f"({plan['gpus_per_instance']} GPU(s) each, {plan['workers']} Dask workers)",
+        f"Dataset:            {plan['num_rows']:,} rows, {plan['dataset_bytes'] / MB:,.1f} MB",
+        f"Partitions:         {plan['num_partitions']} ({plan['partitions_per_worker']:g} per worker)",
+        f"Partition size:     ~{plan['rows_per_partition']:,} rows, ~{plan['partition_bytes'] / MB:,.1f} MB",
+        f"Worker memory:      ~{plan['estimated_worker_memory_bytes'] / GB:,.2f} GiB "
+        f"of {plan['worker_memory_gb']} GiB",
+    ]
+    lines.extend(f"Warning: {warning}" for warning in plan["warnings"])
+    return "\n".join(lines)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Plan Dask XGBoost partitions for a dataset and cluster")
+    parser.add_argument("--instance-type", type=str, default="ml.g5.12xlarge")
+    parser.add_argument("--instance-count", type=int, default=1)
+    parser.add_argument("--num-samples", type=int, default=500000)
+    parser.add_argument("--fraud-rate", type=float, default=0.02)
+    parser.add_argument("--partition-format", choices=sorted(formats.WRITERS), default="csv")
+    parser.add_argument("--target-partition-mb", type=int, default=256)
+    parser.add_argument("--worker-memory-gb", type=float, default=None,
+                        help="Memory per Dask worker (default: GPU memory of the instance type)")
+    parser.add_argument("--instance-catalog", type=str, default=None,
+                        help="JSON file of extra instance types")
+    parser.add_argument("--output", type=str, default=None, help="Also write the plan as JSON")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.instance_catalog:
+        load_catalog(args.instance_catalog)
+    plan = plan_dataset(args.num_samples, args.fraud_rate, args.instance_type, args.instance_count,
+                        args.partition_format, target_partition_mb=args.target_partition_mb,
+                        worker_memory_gb=args.worker_memory_gb)
+    print(format_plan(plan))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(plan, f, indent=2)
+        print(f"\nPlan written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
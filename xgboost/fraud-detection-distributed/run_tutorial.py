@@ -6,37 +6,42 @@ using distributed multi-GPU XGBoost (Algorithm mode), deploys, and tests.
 """
 
 import argparse
+import json
 import os
+import shutil
+import tempfile
 import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 
 import boto3
 import numpy as np
 import pandas as pd
 import sagemaker
+import sklearn
 from sagemaker import image_uris
 from sagemaker.estimator import Estimator
-from sagemaker.inputs import TrainingInput
 from sklearn.datasets import make_classification
 from sklearn.model_selection import train_test_split
 
-# GPU counts per instance type for partition calculation
-GPUS_PER_INSTANCE = {
-    "ml.g5.xlarge": 1,
-    "ml.g5.2xlarge": 1,
-    "ml.g5.4xlarge": 1,
-    "ml.g5.8xlarge": 1,
-    "ml.g5.12xlarge": 4,
-    "ml.g5.24xlarge": 4,
-    "ml.g5.48xlarge": 8,
-    "ml.g4dn.xlarge": 1,
-    "ml.g4dn.12xlarge": 4,
-}
+import datagen
+import formats
+import local_dask
+import partitioning
+import planner
+import scoring
+from explain import Explainer, format_explanation
+from local_endpoint import LocalEndpoint
+from model_artifact import load_booster
+from upload_cache import MANIFEST_NAME, UploadCache, recipe_digest
+from uploader import MB, DirectoryUploader, PartitionUploader
 
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Distributed XGBoost Fraud Detection on SageMaker")
-    parser.add_argument("--role", type=str, required=True, help="SageMaker execution role ARN")
-    parser.add_argument("--bucket", type=str, required=True, help="S3 bucket")
+    parser.add_argument("--role", type=str, default=None, help="SageMaker execution role ARN (required for SageMaker)")
+    parser.add_argument("--bucket", type=str, default=None, help="S3 bucket (required for SageMaker)")
+    parser.add_argument("--backend", choices=["sagemaker", "local"], default="sagemaker",
+                        help="Train on SageMaker GPUs, or on a local Dask CPU cluster with local partitions")
     parser.add_argument("--region", type=str, default="us-west-2")
     parser.add_argument("--image-uri", type=str, default=None, help="XGBoost container image URI (default: auto-generated for region)")
     parser.add_argument("--instance-type", type=str, default="ml.g5.12xlarge")
@@ -44,15 +49,78 @@ def parse_args():
     parser.add_argument("--deploy-instance-type", type=str, default="ml.m5.large")
     parser.add_argument("--num-samples", type=int, default=500000, help="Number of synthetic transactions")
     parser.add_argument("--fraud-rate", type=float, default=0.02, help="Fraction of fraudulent transactions")
+    parser.add_argument("--generator", choices=["in-memory", "chunked"], default="in-memory",
+                        help="Generate all data in memory, or out of core in chunks on a process pool")
+    parser.add_argument("--chunk-rows", type=int, default=250000, help="Rows per chunk for --generator chunked")
+    parser.add_argument("--generator-workers", type=int, default=None,
+                        help="Processes for --generator chunked (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for --generator chunked")
+    parser.add_argument("--partition-format", choices=sorted(formats.WRITERS), default="csv",
+                        help="File format of the train and validation partitions")
+    parser.add_argument("--parquet-row-group-mb", type=int, default=64,
+                        help="Target uncompressed row group size for --partition-format parquet")
+    parser.add_argument("--partitioning", choices=partitioning.MODES, default=None,
+                        help="How rows are assigned to partitions by the in-memory generator (default: contiguous)")
+    parser.add_argument("--balance-tolerance", type=float, default=0.05,
+                        help="Allowed relative deviation of partition rows and positive rate from the split")
+    parser.add_argument("--target-partition-mb", type=int, default=256,
+                        help="Target on-disk size of each training partition")
+    parser.add_argument("--worker-memory-gb", type=float, default=None,
+                        help="Memory per Dask worker for the partition plan (default: GPU memory of the instance type)")
+    parser.add_argument("--instance-catalog", type=str, default=None,
+                        help="JSON file of instance types to add to the planner's catalog")
+    parser.add_argument("--plan-only", action="store_true", help="Print the partition plan and exit")
     parser.add_argument("--num-round", type=int, default=200)
     parser.add_argument("--max-depth", type=int, default=8)
+    parser.add_argument("--endpoint-url", type=str, default=os.environ.get("S3_ENDPOINT_URL"),
+                        help="S3 endpoint for uploads, e.g. a local MinIO server (default: AWS S3)")
+    parser.add_argument("--upload-workers", type=int, default=8, help="Concurrent partition uploads")
+    parser.add_argument("--multipart-threshold-mb", type=int, default=64,
+                        help="Partitions at least this large are uploaded in parts")
+    parser.add_argument("--no-upload-cache", action="store_true",
+                        help="Regenerate and upload every partition, even if it is unchanged in S3")
+    parser.add_argument("--skip-training", action="store_true", help="Stop after generating and uploading data")
+    parser.add_argument("--local-data-dir", type=str, default="local_data",
+                        help="Where --backend local writes the partitions")
+    parser.add_argument("--local-workers", type=str, default="1,2,4",
+                        help="Comma-separated Dask worker counts to train with for --backend local")
+    parser.add_argument("--local-threads-per-worker", type=int, default=1)
+    parser.add_argument("--local-output", type=str, default="local_dask_results.json",
+                        help="Where --backend local writes the scaling results")
+    parser.add_argument("--score-rows", type=int, default=20000,
+                        help="Rows to score in batches after deployment, or locally with --backend local (0 skips)")
+    parser.add_argument("--score-batch-size", type=int, default=500, help="Initial rows per scoring payload")
+    parser.add_argument("--score-concurrency", type=int, default=4, help="Scoring payloads in flight")
+    parser.add_argument("--score-target-latency-ms", type=float, default=200,
+                        help="Adapt the scoring batch size to this payload latency (0 keeps it fixed)")
+    parser.add_argument("--explain-top-k", type=int, default=3,
+                        help="Features to show behind each sample prediction (0 skips explanations)")
     parser.add_argument("--skip-deploy", action="store_true")
     parser.add_argument("--skip-cleanup", action="store_true")
-    return parser.parse_args()
-
-
-def generate_and_upload(bucket, region, num_samples, fraud_rate, instance_type, instance_count):
-    """Generate synthetic fraud data, partition for Dask, upload to S3."""
+    args = parser.parse_args()
+    if args.backend == "sagemaker" and not args.plan_only and not (args.bucket and (args.role or args.skip_training)):
+        parser.error("--role and --bucket are required for the SageMaker backend")
+    if args.generator == "chunked" and args.partitioning:
+        parser.error("--partitioning only applies to --generator in-memory; "
+                     "chunked partitions are always whole generator blocks")
+    args.partitioning = args.partitioning or "contiguous"
+    if not formats.get_writer(args.partition_format).dask and not args.skip_training:
+        parser.error(f"Dask training only reads csv and parquet partitions; "
+                     f"use --skip-training to only upload {args.partition_format} partitions")
+    return args
+
+
+def partition_key(s3_prefix, split_name, partition, extension):
+    return f"{s3_prefix}/{split_name}/part-{partition:04d}{extension}"
+
+
+def upload_in_memory(uploader, s3_prefix, num_samples, fraud_rate, num_partitions, partition_format, format_options,
+                     mode="contiguous", tolerance=0.05, current=frozenset()):
+    """Generate the whole dataset in memory with make_classification and upload it.
+
+    Partitions whose keys are in current are already in S3 and are skipped.
+    Returns the {split, partition, key, rows, positives} record of each partition.
+    """
     print(f"Generating {num_samples:,} synthetic transactions ({fraud_rate:.0%} fraud rate)...")
     X, y = make_classification(
         n_samples=num_samples,
@@ -71,23 +139,184 @@ def generate_and_upload(bucket, region, num_samples, fraud_rate, instance_type,
     print(f"Train: {len(train_df):,}, Validation: {len(val_df):,}")
     print(f"Fraud count (train): {train_df['label'].sum():,} / {len(train_df):,}")
 
-    # Partition for Dask: more files than total GPUs
-    gpus = GPUS_PER_INSTANCE.get(instance_type, 1)
-    total_gpus = gpus * instance_count
-    num_partitions = max(total_gpus * 2, 8)
-    print(f"Total GPUs: {total_gpus}, creating {num_partitions} partitions")
+    # Assign every row first, so an unattainable balance fails before any upload
+    records, parts = [], []
+    for split_name, split_df in [("train", train_df), ("validation", val_df)]:
+        labels = split_df["label"].to_numpy()
+        for i, idx in enumerate(partitioning.split_partitions(mode, labels, num_partitions)):
+            key = partition_key(s3_prefix, split_name, i, formats.get_writer(partition_format).extension)
+            records.append({"split": split_name, "partition": i, "key": key,
+                            "rows": len(idx), "positives": int(labels[idx].sum())})
+            parts.append((key, split_df, idx))
+    imbalanced = partitioning.imbalances(records, tolerance)
+    if mode == "stratified" and imbalanced:
+        raise ValueError(f"{len(imbalanced)} partition(s) are outside the {tolerance:.0%} balance tolerance even "
+                         f"when stratified; use fewer partitions or a larger --balance-tolerance")
+
+    # Train and validation partitions are rendered and uploaded concurrently.
+    # Rows are sliced out by the upload worker, so only partitions in flight
+    # are copied
+    for key, split_df, idx in parts:
+        if key in current:
+            continue
+        uploader.submit(key, lambda path, split_df=split_df, idx=idx: formats.write_frame(
+            partition_format, split_df.iloc[idx], path, **format_options))
+    print(f"Queued {len(parts) - len(current)} {mode} partitions for upload")
+    return records
+
+
+def upload_chunked(uploader, s3_prefix, num_samples, fraud_rate, num_partitions, chunk_rows, workers, seed,
+                   partition_format, format_options, tolerance=0.05, current=frozenset()):
+    """Generate partitions chunk by chunk on a process pool and upload each as it is written.
+
+    Partitions whose train and validation keys are both in current are
+    already in S3 and are not generated. Returns the {split, partition, key,
+    rows, positives} record of each generated partition.
+    """
+    workers = workers or os.cpu_count() or 1
+    print(f"Generating {num_samples:,} synthetic transactions ({fraud_rate:.0%} fraud rate) "
+          f"in chunks of {chunk_rows:,} rows on {workers} processes...")
+    tmp_dir = tempfile.mkdtemp(prefix="fraud-partitions-")
+    totals = {"train_rows": 0, "train_positives": 0, "validation_rows": 0, "validation_positives": 0}
+    records = []
+    extension = formats.get_writer(partition_format).extension
+
+    def paths(i):
+        return (os.path.join(tmp_dir, f"train-{i:04d}{extension}"),
+                os.path.join(tmp_dir, f"validation-{i:04d}{extension}"))
+
+    def upload_finished(futures):
+        for future in futures:
+            stats = future.result()
+            i = stats["partition"]
+            train_path, val_path = paths(i)
+            for split_name, path in (("train", train_path), ("validation", val_path)):
+                key = partition_key(s3_prefix, split_name, i, extension)
+                uploader.submit_file(key, path)
+                records.append({"split": split_name, "partition": i, "key": key,
+                                "rows": stats[f"{split_name}_rows"], "positives": stats[f"{split_name}_positives"]})
+            for name in totals:
+                totals[name] += stats[name]
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # A bounded window of partitions in flight keeps local disk use
+            # proportional to the worker count rather than the dataset
+            pending = set()
+            for i in range(num_partitions):
+                if all(partition_key(s3_prefix, split_name, i, extension) in current
+                       for split_name in ("train", "validation")):
+                    continue
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    upload_finished(done)
+                pending.add(pool.submit(datagen.write_partition, seed, num_samples, fraud_rate,
+                                        i, num_partitions, *paths(i), chunk_rows,
+                                        partition_format, format_options))
+            upload_finished(wait(pending).done)
+        # Wait for the uploads before removing the directory they read from
+        uploader.executor.shutdown(wait=True)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    print(f"Train: {totals['train_rows']:,}, Validation: {totals['validation_rows']:,}")
+    print(f"Fraud count (train): {totals['train_positives']:,} / {totals['train_rows']:,}")
+
+    # Partitions are only known once written, so balance is checked after
+    # the upload rather than before it as for the in-memory generator
+    imbalanced = partitioning.imbalances(records, tolerance)
+    if imbalanced:
+        print(f"Warning: {len(imbalanced)} partition(s) are outside the {tolerance:.0%} balance tolerance; "
+              f"use fewer partitions or a larger --balance-tolerance")
+    return records
+
+
+def plan_partitions(num_samples, fraud_rate, instance_type, instance_count, partition_format="csv",
+                    format_options=None, target_partition_mb=256, worker_memory_gb=None):
+    """Plan the training partitions for the cluster; validation uses the same count."""
+    plan = planner.plan_dataset(num_samples, fraud_rate, instance_type, instance_count, partition_format,
+                                format_options, target_partition_mb, worker_memory_gb)
+    print(planner.format_plan(plan))
+    return plan
+
+
+def generate_and_upload(bucket, region, num_samples, fraud_rate, num_partitions, endpoint_url=None,
+                        upload_workers=8, multipart_threshold_mb=64, generator="in-memory", chunk_rows=250000,
+                        generator_workers=None, seed=42, partition_format="csv", format_options=None,
+                        mode="contiguous", tolerance=0.05, use_cache=True, local_dir=None):
+    """Generate synthetic fraud data, partition for Dask, upload to S3, or write it under local_dir."""
+    print(f"Creating {num_partitions} {partition_format} partitions per split")
+    format_options = format_options or {}
 
     s3_prefix = "xgboost-fraud-distributed"
-    s3_client = boto3.client("s3", region_name=region)
-
-    for split_name, split_df in [("train", train_df), ("validation", val_df)]:
-        indices = np.array_split(np.arange(len(split_df)), num_partitions)
-        for i, idx in enumerate(indices):
-            part = split_df.iloc[idx]
-            key = f"{s3_prefix}/{split_name}/part-{i:04d}.csv"
-            csv_body = part.to_csv(index=False, header=False)
-            s3_client.put_object(Bucket=bucket, Key=key, Body=csv_body)
-        print(f"Uploaded {num_partitions} {split_name} partitions to s3://{bucket}/{s3_prefix}/{split_name}/")
+    if local_dir:
+        return write_local(local_dir, s3_prefix, num_samples, fraud_rate, num_partitions, upload_workers,
+                           generator, chunk_rows, generator_workers, seed, partition_format, format_options,
+                           mode, tolerance)
+    s3_client = boto3.client("s3", region_name=region, endpoint_url=endpoint_url)
+    extension = formats.get_writer(partition_format).extension
+    keys = {(split_name, i): partition_key(s3_prefix, split_name, i, extension)
+            for split_name in ("train", "validation") for i in range(num_partitions)}
+
+    cache, recipes, current = None, {}, set()
+    if use_cache:
+        cache = UploadCache(s3_client, bucket, s3_prefix).load()
+        params = {"generator": generator, "num_samples": num_samples, "fraud_rate": fraud_rate,
+                  "format": partition_format, "format_options": format_options,
+                  "num_partitions": num_partitions, "numpy": np.__version__}
+        if generator == "chunked":
+            params["seed"] = seed
+        else:
+            params.update(partitioning=mode, sklearn=sklearn.__version__)
+        recipes = {key: recipe_digest(dict(params, split=split_name, partition=i))
+                   for (split_name, i), key in keys.items()}
+        current = {key for key, recipe in recipes.items() if cache.is_current(key, recipe)}
+        print(f"{len(current)} of {len(keys)} partitions are unchanged in S3")
+
+    uploader = PartitionUploader(s3_client, bucket, max_workers=upload_workers,
+                                 multipart_threshold=multipart_threshold_mb * MB, cache=cache)
+    if len(current) == len(keys):
+        records = []
+    elif generator == "chunked":
+        records = upload_chunked(uploader, s3_prefix, num_samples, fraud_rate, num_partitions,
+                                 chunk_rows, generator_workers, seed, partition_format, format_options, tolerance,
+                                 current)
+    else:
+        records = upload_in_memory(uploader, s3_prefix, num_samples, fraud_rate, num_partitions,
+                                   partition_format, format_options, mode, tolerance, current)
+
+    stats = uploader.close()
+    print(f"Uploaded {stats['objects']} partitions ({stats['bytes'] / MB:,.1f} MB, {stats['multipart']} multipart) "
+          f"in {stats['seconds']:.1f}s: {stats['mb_per_sec']:,.1f} MB/s, {stats['retries']} retries")
+    print(f"Partitions: s3://{bucket}/{s3_prefix}/train/, s3://{bucket}/{s3_prefix}/validation/")
+
+    sizes = uploader.sizes
+    if cache is not None:
+        if stats["unchanged"]:
+            print(f"Skipped {stats['unchanged']} regenerated partitions with identical content")
+        cache.refresh()
+        orphans = cache.orphans(keys.values())
+        if orphans:
+            cache.delete(orphans)
+            print(f"Deleted {len(orphans)} partitions that are no longer part of the dataset")
+        # Unchanged partitions keep their previous manifest entry
+        generated = {record["key"] for record in records}
+        records += [cache.previous[key] for key in keys.values() if key not in generated]
+        for record in records:
+            record.update(recipe=recipes[record["key"]],
+                          md5=uploader.digests.get(record["key"]) or record.get("md5"),
+                          etag=cache.remote[record["key"]]["etag"])
+        sizes = {key: remote["size"] for key, remote in cache.remote.items()}
+
+    # The manifest sits next to the channel prefixes, not inside them, so
+    # training never reads it as data
+    manifest = partitioning.build_manifest(records, partitioning.BLOCKS if generator == "chunked" else mode,
+                                           tolerance, sizes)
+    print(partitioning.format_summary(manifest))
+    manifest_key = f"{s3_prefix}/{MANIFEST_NAME}"
+    s3_client.put_object(Bucket=bucket, Key=manifest_key, Body=json.dumps(manifest, indent=2).encode(),
+                         ContentType="application/json")
+    print(f"Partition manifest: s3://{bucket}/{manifest_key}")
 
     train_s3 = f"s3://{bucket}/{s3_prefix}/train/"
     val_s3 = f"s3://{bucket}/{s3_prefix}/validation/"
@@ -95,7 +324,50 @@ def generate_and_upload(bucket, region, num_samples, fraud_rate, instance_type,
     return train_s3, val_s3, scale_pos_weight
 
 
-def train_model(role, bucket, region, instance_type, instance_count, train_s3, val_s3, scale_pos_weight, num_round, max_depth, image_uri=None):
+def write_local(local_dir, s3_prefix, num_samples, fraud_rate, num_partitions, workers, generator, chunk_rows,
+                generator_workers, seed, partition_format, format_options, mode, tolerance):
+    """Write the partitions under local_dir/<prefix>/ for the local backend; returns the split directories."""
+    data_dir = os.path.join(local_dir, s3_prefix)
+    # Partitions from an earlier run with more partitions would be read too
+    for split_name in ("train", "validation"):
+        shutil.rmtree(os.path.join(data_dir, split_name), ignore_errors=True)
+
+    writer = DirectoryUploader(local_dir, max_workers=workers)
+    if generator == "chunked":
+        records = upload_chunked(writer, s3_prefix, num_samples, fraud_rate, num_partitions,
+                                 chunk_rows, generator_workers, seed, partition_format, format_options, tolerance)
+    else:
+        records = upload_in_memory(writer, s3_prefix, num_samples, fraud_rate, num_partitions,
+                                   partition_format, format_options, mode, tolerance)
+    stats = writer.close()
+    print(f"Wrote {stats['objects']} partitions ({stats['bytes'] / MB:,.1f} MB) in {stats['seconds']:.1f}s "
+          f"to {data_dir}")
+
+    manifest = partitioning.build_manifest(records, partitioning.BLOCKS if generator == "chunked" else mode,
+                                           tolerance, writer.sizes)
+    print(partitioning.format_summary(manifest))
+    with open(os.path.join(data_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    scale_pos_weight = (1 - fraud_rate) / fraud_rate
+    return os.path.join(data_dir, "train"), os.path.join(data_dir, "validation"), scale_pos_weight
+
+
+def training_hyperparameters(num_round, max_depth, scale_pos_weight):
+    """Hyperparameters shared by the SageMaker job and the local backend."""
+    return {
+        "objective": "binary:logistic",
+        "num_round": num_round,
+        "max_depth": max_depth,
+        "eta": 0.1,
+        "tree_method": "gpu_hist",
+        "scale_pos_weight": round(scale_pos_weight, 1),
+        "eval_metric": "auc",
+        "use_dask_gpu_training": "true",
+    }
+
+
+def train_model(role, bucket, region, instance_type, instance_count, train_s3, val_s3, scale_pos_weight, num_round, max_depth, image_uri=None, partition_format="csv"):
     """Launch distributed GPU training with Dask."""
     session = sagemaker.Session(boto_session=boto3.Session(region_name=region))
 
@@ -109,28 +381,38 @@ def train_model(role, bucket, region, instance_type, instance_count, train_s3, v
         instance_type=instance_type,
         sagemaker_session=session,
         output_path=f"s3://{bucket}/xgboost-fraud-distributed/output",
-        hyperparameters={
-            "objective": "binary:logistic",
-            "num_round": num_round,
-            "max_depth": max_depth,
-            "eta": 0.1,
-            "tree_method": "gpu_hist",
-            "scale_pos_weight": round(scale_pos_weight, 1),
-            "eval_metric": "auc",
-            "use_dask_gpu_training": "true",
-        },
+        hyperparameters=training_hyperparameters(num_round, max_depth, scale_pos_weight),
     )
 
     # FullyReplicated — Dask handles distribution internally
-    train_input = TrainingInput(s3_data=train_s3, content_type="text/csv", distribution="FullyReplicated")
-    val_input = TrainingInput(s3_data=val_s3, content_type="text/csv", distribution="FullyReplicated")
+    train_input = formats.training_input(partition_format, train_s3)
+    val_input = formats.training_input(partition_format, val_s3)
 
     estimator.fit({"train": train_input, "validation": val_input})
     print(f"Training complete. Model: {estimator.model_data}")
     return estimator
 
 
-def deploy_and_test(estimator, deploy_instance_type):
+def score_in_batches(transport, num_rows, batch_size, concurrency, target_latency_ms):
+    """Score generated rows in concurrent multi-row payloads and print throughput and latency."""
+    print(f"\n--- Batch scoring {num_rows:,} rows ---")
+    _, report = scoring.score(transport, scoring.test_rows(num_rows), batch_size, concurrency,
+                              target_latency_ms or None)
+    print(scoring.format_report("Batched", report))
+    return report
+
+
+def load_explainer(model_data, top_k):
+    """An Explainer for the trained model, or None if xgboost is not installed locally."""
+    try:
+        return Explainer(load_booster(model_data), top_k=top_k)
+    except ImportError as e:
+        print(f"Skipping explanations: {e}. Install xgboost to see the features behind each score.")
+        return None
+
+
+def deploy_and_test(estimator, deploy_instance_type, score_rows=0, score_batch_size=500, score_concurrency=4,
+                    score_target_latency_ms=None, explain_top_k=3):
     """Deploy to a CPU endpoint and run test inferences."""
     endpoint_name = f"xgb-fraud-{int(time.time())}"
     predictor = estimator.deploy(
@@ -144,13 +426,22 @@ def deploy_and_test(estimator, deploy_instance_type):
     # Generate a few test samples
     rng = np.random.RandomState(99)
     test_features = rng.randn(5, 30)
+    explainer = load_explainer(estimator.model_data, explain_top_k) if explain_top_k else None
+    explanations = explainer.explain(test_features) if explainer else [None] * len(test_features)
     print("\n--- Sample Predictions ---")
-    for i, row in enumerate(test_features):
+    for i, (row, explanation) in enumerate(zip(test_features, explanations)):
         csv_line = ",".join(f"{v:.6f}" for v in row)
         result = predictor.predict(csv_line)
         score = float(result[0][0]) if isinstance(result[0], list) else float(result[0])
         label = "FRAUD" if score > 0.5 else "legit"
         print(f"  Transaction {i+1}: score={score:.4f} → {label}")
+        if explanation:
+            print(f"    top features (log-odds): {format_explanation(explanation)}")
+
+    if score_rows:
+        transport = scoring.SageMakerTransport(endpoint_name, estimator.sagemaker_session.boto_region_name,
+                                               pool_size=score_concurrency)
+        score_in_batches(transport, score_rows, score_batch_size, score_concurrency, score_target_latency_ms)
 
     return predictor, endpoint_name
 
@@ -158,20 +449,61 @@ def deploy_and_test(estimator, deploy_instance_type):
 def main():
     args = parse_args()
 
-    print("=== Step 1: Generating and uploading data ===")
+    if args.instance_catalog:
+        planner.load_catalog(args.instance_catalog)
+    format_options = {"row_group_mb": args.parquet_row_group_mb} if args.partition_format == "parquet" else {}
+
+    print("=== Partition plan ===")
+    plan = plan_partitions(
+        args.num_samples, args.fraud_rate, args.instance_type, args.instance_count,
+        args.partition_format, format_options, args.target_partition_mb, args.worker_memory_gb,
+    )
+    if args.plan_only:
+        return
+
+    print("\n=== Step 1: Generating and uploading data ===")
     train_s3, val_s3, scale_pos_weight = generate_and_upload(
-        args.bucket, args.region, args.num_samples, args.fraud_rate, args.instance_type, args.instance_count
+        args.bucket, args.region, args.num_samples, args.fraud_rate, plan["num_partitions"],
+        args.endpoint_url, args.upload_workers, args.multipart_threshold_mb,
+        args.generator, args.chunk_rows, args.generator_workers, args.seed,
+        args.partition_format, format_options, args.partitioning, args.balance_tolerance,
+        not args.no_upload_cache, args.local_data_dir if args.backend == "local" else None,
     )
 
+    if args.skip_training:
+        print(f"\nSkipped training. Data: {train_s3}, {val_s3}")
+        return
+
+    if args.backend == "local":
+        print("\n=== Step 2: Local Dask CPU training ===")
+        model_path = os.path.join(args.local_data_dir, "model.tar.gz")
+        local_dask.run_scaling(
+            train_s3, val_s3, args.partition_format,
+            training_hyperparameters(args.num_round, args.max_depth, scale_pos_weight),
+            [int(count) for count in args.local_workers.split(",")], args.local_threads_per_worker,
+            args.local_output, model_path,
+        )
+        print(f"Model: {model_path}")
+        if args.score_rows and not args.skip_deploy:
+            print("\n=== Step 3: Scoring against a local stand-in endpoint ===")
+            with LocalEndpoint(load_booster(model_path)) as endpoint:
+                score_in_batches(scoring.HTTPTransport(endpoint.url), args.score_rows, args.score_batch_size,
+                                 args.score_concurrency, args.score_target_latency_ms)
+        return
+
     print(f"\n=== Step 2: Distributed GPU training ({args.instance_count}× {args.instance_type}) ===")
     estimator = train_model(
         args.role, args.bucket, args.region, args.instance_type, args.instance_count,
         train_s3, val_s3, scale_pos_weight, args.num_round, args.max_depth, args.image_uri,
+        args.partition_format,
     )
 
     if not args.skip_deploy:
         print("\n=== Step 3: Deploying and testing ===")
-        predictor, endpoint_name = deploy_and_test(estimator, args.deploy_instance_type)
+        predictor, endpoint_name = deploy_and_test(
+            estimator, args.deploy_instance_type, args.score_rows, args.score_batch_size,
+            args.score_concurrency, args.score_target_latency_ms, args.explain_top_k,
+        )
 
         if not args.skip_cleanup:
             print(f"\n=== Step 4: Cleaning up endpoint {endpoint_name} ===")
@@ -0,0 +1,233 @@
+"""
+Batched, concurrent scoring client for the fraud endpoint.
+
+Sending one CSV row per request measures per-request overhead: the HTTP round
+trip, SageMaker's routing and the container's request handling. score()
+instead packs many rows into one multi-line text/csv payload and keeps
+--concurrency payloads in flight over reused connections. It reports rows/sec
+and the p50/p90/p99 latency of payloads.
+
+With a latency target, the batch size adapts as payloads complete. It grows
+while latency is well under the target and is cut back as soon as a payload
+goes over it, so the client finds the largest batch that still meets the
+target.
+
+Transports:
+    SageMakerTransport  invoke_endpoint through one boto3 client whose
+                        connection pool holds a connection per concurrent
+                        payload
+    HTTPTransport       plain HTTP/1.1 with one keep-alive connection per
+                        thread, for local_endpoint.py or any compatible server
+
+Offline, against a trained model served by local_endpoint.py:
+
+    python scoring.py --model local_data/model.tar.gz --rows 200000 --target-latency-ms 50 --compare-serial
+"""
+
+import argparse
+import http.client
+import io
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import numpy as np
+
+import datagen
+from latency import latency_summary
+
+
+def encode_csv(X):
+    """Rows as a headerless multi-line CSV payload."""
+    buf = io.StringIO()
+    np.savetxt(buf, X, fmt="%.6g", delimiter=",")
+    return buf.getvalue().encode()
+
+
+def parse_scores(body):
+    """Scores from a CSV response; containers separate them by newlines or commas."""
+    return np.array([float(value) for value in re.split(r"[,\s]+", body.decode().strip()) if value])
+
+
+class SageMakerTransport:
+    def __init__(self, endpoint_name, region=None, pool_size=10):
+        import boto3
+        from botocore.config import Config
+
+        self.endpoint_name = endpoint_name
+        self.client = boto3.client("sagemaker-runtime", region_name=region, config=Config(
+            max_pool_connections=pool_size, retries={"max_attempts": 5, "mode": "adaptive"}))
+
+    def __call__(self, payload):
+        response = self.client.invoke_endpoint(EndpointName=self.endpoint_name, ContentType="text/csv",
+                                               Accept="text/csv", Body=payload)
+        return response["Body"].read()
+
+
+class HTTPTransport:
+    def __init__(self, url, timeout=60):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port
+        self.path = parts.path or "/invocations"
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connection(self):
+        if getattr(self.local, "connection", None) is None:
+            self.local.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        return self.local.connection
+
+    def __call__(self, payload):
+        headers = {"Content-Type": "text/csv", "Accept": "text/csv"}
+        # A kept-alive connection the server has since closed fails once;
+        # retry on a fresh one
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request("POST", self.path, body=payload, headers=headers)
+                response = connection.getresponse()
+                body = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                connection.close()
+                self.local.connection = None
+                if attempt:
+                    raise
+        if response.status != 200:
+            raise RuntimeError(f"Endpoint returned {response.status}: {body[:200].decode(errors='replace')}")
+        return body
+
+
+class AdaptiveBatchSize:
+    """Grows the batch while latency is under the target, shrinks it when over."""
+
+    def __init__(self, initial, target_latency_ms=None, min_size=1, max_size=20000):
+        self.size = initial
+        self.target_latency_ms = target_latency_ms
+        self.min_size = min_size
+        self.max_size = max_size
+        self.lock = threading.Lock()
+
+    def update(self, latency_ms):
+        if not self.target_latency_ms:
+            return
+        with self.lock:
+            if latency_ms > self.target_latency_ms:
+                self.size = max(self.min_size, int(self.size * 0.7))
+            elif latency_ms < self.target_latency_ms * 0.7:
+                self.size = min(self.max_size, int(self.size * 1.25) + 1)
+
+
+def score(transport, X, batch_size=500, concurrency=4, target_latency_ms=None, max_batch_size=20000):
+    """Score every row of X; returns (scores, report)."""
+    scores = np.empty(len(X))
+    sizer = AdaptiveBatchSize(batch_size, target_latency_ms, max_size=max_batch_size)
+    latencies, sizes = [], []
+
+    def send(start, stop):
+        payload = encode_csv(X[start:stop])
+        t0 = time.perf_counter()
+        body = transport(payload)
+        latency = time.perf_counter() - t0
+        result = parse_scores(body)
+        if len(result) != stop - start:
+            raise RuntimeError(f"Sent {stop - start} rows but got {len(result)} scores back")
+        scores[start:stop] = result
+        return stop - start, latency
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="score") as pool:
+        pending, cursor = set(), 0
+        while cursor < len(X) or pending:
+            # Each payload is cut with the batch size current at submit time
+            while cursor < len(X) and len(pending) < concurrency:
+                stop = min(cursor + sizer.size, len(X))
+                pending.add(pool.submit(send, cursor, stop))
+                cursor = stop
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                rows, latency = future.result()
+                latencies.append(latency)
+                sizes.append(rows)
+                sizer.update(latency * 1000.0)
+    seconds = time.perf_counter() - start_time
+
+    report = {
+        "rows": len(X),
+        "payloads": len(latencies),
+        "concurrency": concurrency,
+        "mean_batch_rows": float(np.mean(sizes)) if sizes else 0.0,
+        "final_batch_rows": sizer.size,
+        "seconds": seconds,
+        "rows_per_sec": len(X) / seconds if seconds > 0 else 0.0,
+    }
+    report.update(latency_summary(latencies))
+    return scores, report
+
+
+def score_serially(transport, X):
+    """One row per request, one request at a time: the per-request overhead baseline."""
+    return score(transport, X, batch_size=1, concurrency=1)
+
+
+def format_report(name, report):
+    return (f"{name}: {report['rows']:,} rows in {report['payloads']:,} payloads "
+            f"(mean {report['mean_batch_rows']:,.0f} rows, concurrency {report['concurrency']}): "
+            f"{report['rows_per_sec']:,.0f} rows/s, latency p50 {report.get('p50_ms', 0):.1f} ms, "
+            f"p99 {report.get('p99_ms', 0):.1f} ms")
+
+
+def test_rows(num_rows, fraud_rate=0.02, seed=7):
+    """Feature rows from the same distribution as the training data."""
+    X, _, _ = datagen.generate_range(seed, 0, num_rows, num_rows, fraud_rate)
+    return X
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Batched, concurrent scoring against the fraud endpoint")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--endpoint-name", type=str, help="SageMaker endpoint to score against")
+    target.add_argument("--url", type=str, help="URL of a compatible /invocations endpoint")
+    target.add_argument("--model", type=str, help="model.tar.gz to serve locally and score against (offline)")
+    parser.add_argument("--region", type=str, default=None)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows per payload (initial, if adaptive)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Payloads in flight")
+    parser.add_argument("--target-latency-ms", type=float, default=None,
+                        help="Adapt the batch size to keep payload latency under this target")
+    parser.add_argument("--compare-serial", type=int, nargs="?", const=1000, default=0,
+                        help="Also score this many rows one per request, serially (default: 1000)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    endpoint = None
+    if args.model:
+        from local_endpoint import LocalEndpoint
+        from model_artifact import load_booster
+
+        endpoint = LocalEndpoint(load_booster(args.model)).start()
+        print(f"Serving {args.model} at {endpoint.url}")
+        transport = HTTPTransport(endpoint.url)
+    elif args.url:
+        transport = HTTPTransport(args.url)
+    else:
+        transport = SageMakerTransport(args.endpoint_name, args.region, pool_size=args.concurrency)
+
+    try:
+        X = test_rows(args.rows)
+        if args.compare_serial:
+            _, report = score_serially(transport, X[:args.compare_serial])
+            print(format_report("Serial, 1 row per request", report))
+        _, report = score(transport, X, args.batch_size, args.concurrency, args.target_latency_ms)
+        print(format_report("Batched", report))
+    finally:
+        if endpoint is not None:
+            endpoint.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Incremental uploads of training partitions.
+
+The partition manifest from the previous run (partition_manifest.json next to
+the channel prefixes) records, for every partition key:
+
+- recipe  a hash of everything the partition's content depends on: generator,
+          sample count, fraud rate, seed, partitioning, format, partition
+          count, split and index, and library versions
+- md5     the MD5 of the uploaded file
+- etag    the ETag S3 reported for it, and its size in bytes
+
+A partition is current when its recipe is unchanged and the S3 listing still
+shows the recorded ETag and size. Current partitions are neither generated nor
+uploaded. A partition that is regenerated but comes out byte-identical (same
+MD5, object unchanged in S3) is not uploaded again. Objects under the channel
+prefixes that are no longer part of the dataset, such as partitions from a
+run with a larger partition count or another format, are deleted.
+
+An unchanged dataset therefore costs one manifest read and one listing.
+"""
+
+import hashlib
+import json
+
+from botocore.exceptions import ClientError
+
+MANIFEST_NAME = "partition_manifest.json"
+CACHE_VERSION = 1
+
+
+def recipe_digest(params):
+    """Stable hash of the parameters a partition's content depends on."""
+    content = json.dumps(dict(params, cache_version=CACHE_VERSION), sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+
+def file_md5(path, block_size=8 * 1024 * 1024):
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class UploadCache:
+    """Previous manifest and current S3 listing of the channel prefixes."""
+
+    def __init__(self, s3_client, bucket, prefix, channels=("train", "validation")):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.channels = channels
+        self.manifest_key = f"{prefix}/{MANIFEST_NAME}"
+        self.previous = {}
+        self.remote = {}
+
+    def load(self):
+        try:
+            body = self.s3_client.get_object(Bucket=self.bucket, Key=self.manifest_key)["Body"].read()
+            manifest = json.loads(body)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") not in ("NoSuchKey", "404"):
+                raise
+            manifest = {}
+        except ValueError:
+            manifest = {}
+        self.previous = {record["key"]: record for record in manifest.get("partitions", [])}
+        self.refresh()
+        return self
+
+    def refresh(self):
+        """List the channel prefixes again, e.g. after uploading."""
+        remote = {}
+        paginator = self.s3_client.get_paginator("list_objects_v2")
+        for channel in self.channels:
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{self.prefix}/{channel}/"):
+                for obj in page.get("Contents", []):
+                    remote[obj["Key"]] = {"etag": obj["ETag"].strip('"'), "size": obj["Size"]}
+        self.remote = remote
+
+    def _unchanged_in_s3(self, key):
+        entry, remote = self.previous.get(key), self.remote.get(key)
+        return (entry is not None and remote is not None
+                and entry.get("etag") == remote["etag"] and entry.get("bytes") == remote["size"])
+
+    def is_current(self, key, recipe):
+        """Whether the uploaded partition was generated from the same recipe and is untouched."""
+        return self._unchanged_in_s3(key) and self.previous[key].get("recipe") == recipe
+
+    def same_content(self, key, md5):
+        """Whether S3 already holds exactly this content under key."""
+        return self._unchanged_in_s3(key) and self.previous[key].get("md5") == md5
+
+    def orphans(self, keys):
+        """Objects under the channel prefixes that are not in keys."""
+        return sorted(set(self.remote) - set(keys))
+
+    def delete(self, keys):
+        for i in range(0, len(keys), 1000):
+            batch = [{"Key": key} for key in keys[i:i + 1000]]
+            response = self.s3_client.delete_objects(Bucket=self.bucket, Delete={"Objects": batch, "Quiet": True})
+            if response.get("Errors"):
+                error = response["Errors"][0]
+                raise RuntimeError(f"Could not delete {len(response['Errors'])} object(s), "
+                                   f"e.g. {error['Key']}: {error.get('Message')}")
+        for key in keys:
+            self.remote.pop(key, None)
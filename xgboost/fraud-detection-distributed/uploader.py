@@ -0,0 +1,160 @@
+"""
+Concurrent S3 uploader for training partitions.
+
+Each partition is rendered to a temporary file by a worker thread and then
+streamed from disk to S3, so no partition is held in memory as one string.
+Large files are sent as multipart uploads by the boto3 transfer manager. Whole
+uploads are retried with exponential backoff and jitter. The number of
+partitions waiting to be uploaded is bounded, so rendering never runs far
+ahead of the network.
+
+The S3 client is passed in, so the uploader works the same against AWS, a
+MinIO-compatible server (boto3.client("s3", endpoint_url=...)) or moto.
+
+Given an UploadCache, each rendered file is hashed first and not uploaded if
+S3 already holds identical content under its key.
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from boto3.exceptions import S3UploadFailedError
+from boto3.s3.transfer import TransferConfig
+from botocore.exceptions import BotoCoreError, ClientError
+
+from upload_cache import file_md5
+
+MB = 1024 * 1024
+
+# Errors that no retry will fix
+PERMANENT_ERROR_CODES = ("AccessDenied", "NoSuchBucket", "InvalidAccessKeyId", "SignatureDoesNotMatch",
+                         "AllAccessDisabled", "InvalidBucketName")
+
+
+def is_retryable(error):
+    """Whether an upload error may be transient."""
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") not in PERMANENT_ERROR_CODES
+    if isinstance(error, S3UploadFailedError):
+        # The transfer manager wraps the ClientError; only its message is left
+        return not any(code in str(error) for code in PERMANENT_ERROR_CODES)
+    return True
+
+
+class PartitionUploader:
+    """Render and upload partitions on a bounded thread pool."""
+
+    def __init__(self, s3_client, bucket, max_workers=8, multipart_threshold=64 * MB,
+                 multipart_chunksize=16 * MB, max_attempts=5, backoff=0.5, tmp_dir=None, cache=None):
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.tmp_dir = tmp_dir
+        self.cache = cache
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=4,
+        )
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload")
+        # At most two partitions per worker are rendered or waiting at a time
+        self.slots = threading.BoundedSemaphore(max_workers * 2)
+        self.lock = threading.Lock()
+        self.futures = []
+        self.stats = {"objects": 0, "bytes": 0, "retries": 0, "multipart": 0, "unchanged": 0}
+        # Size and, with a cache, MD5 of each key
+        self.sizes = {}
+        self.digests = {}
+        self.start_time = None
+
+    def submit(self, key, write_fn):
+        """Upload s3://bucket/key with the body written by write_fn(path)."""
+        return self._submit(self._render_and_upload, key, write_fn)
+
+    def submit_file(self, key, path):
+        """Upload an existing local file to s3://bucket/key and delete it afterwards."""
+        return self._submit(self._upload_and_remove, key, path)
+
+    def _submit(self, fn, *args):
+        if self.start_time is None:
+            self.start_time = time.perf_counter()
+        self.slots.acquire()
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(lambda _: self.slots.release())
+        self.futures.append(future)
+        return future
+
+    def close(self):
+        """Wait for all uploads, raise the first failure, and return throughput stats."""
+        self.executor.shutdown(wait=True)
+        for future in self.futures:
+            future.result()
+        seconds = time.perf_counter() - self.start_time if self.start_time else 0.0
+        return dict(self.stats, seconds=seconds,
+                    mb_per_sec=self.stats["bytes"] / MB / seconds if seconds > 0 else 0.0)
+
+    def _render_and_upload(self, key, write_fn):
+        fd, path = tempfile.mkstemp(prefix="part-", dir=self.tmp_dir)
+        os.close(fd)
+        try:
+            write_fn(path)
+        except BaseException:
+            os.remove(path)
+            raise
+        return self._upload_and_remove(key, path)
+
+    def _upload_and_remove(self, key, path):
+        digest = None
+        try:
+            size = os.path.getsize(path)
+            if self.cache is not None:
+                digest = file_md5(path)
+            unchanged = digest is not None and self.cache.same_content(key, digest)
+            if not unchanged:
+                self._upload_with_retries(path, key)
+        finally:
+            os.remove(path)
+        with self.lock:
+            self.sizes[key] = size
+            self.digests[key] = digest
+            if unchanged:
+                self.stats["unchanged"] += 1
+                return key, size
+            self.stats["objects"] += 1
+            self.stats["bytes"] += size
+            if size >= self.transfer_config.multipart_threshold:
+                self.stats["multipart"] += 1
+        return key, size
+
+    def _upload_with_retries(self, path, key):
+        for attempt in range(self.max_attempts):
+            try:
+                self.s3_client.upload_file(path, self.bucket, key, Config=self.transfer_config)
+                return
+            except (BotoCoreError, ClientError, S3UploadFailedError) as e:
+                if not is_retryable(e) or attempt == self.max_attempts - 1:
+                    raise
+                delay = self.backoff * (2 ** attempt) * (1 + random.random())
+                with self.lock:
+                    self.stats["retries"] += 1
+                print(f"Upload of {key} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+
+class DirectoryUploader(PartitionUploader):
+    """Writes partitions under a local directory instead of S3, keyed the same way."""
+
+    def __init__(self, root, max_workers=8):
+        super().__init__(None, None, max_workers=max_workers)
+        self.root = root
+
+    def _upload_with_retries(self, path, key):
+        target = os.path.join(self.root, key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(path, target)